@@ -0,0 +1,32 @@
+-- Bài tập code tự chấm bằng test case
+-- Chạy: psql -U elearn -d elearning -f database/add_auto_grading.sql
+ALTER TABLE bai_tap
+ADD COLUMN IF NOT EXISTS ngon_ngu VARCHAR(20);
+
+CREATE TABLE IF NOT EXISTS test_case_bai_tap (
+    id SERIAL PRIMARY KEY,
+    bai_tap_id INTEGER NOT NULL REFERENCES bai_tap(id) ON DELETE CASCADE,
+    du_lieu_vao TEXT DEFAULT '',
+    ket_qua_mong_doi TEXT NOT NULL,
+    che_do_so_sanh VARCHAR(20) DEFAULT 'exact',
+    sai_so DOUBLE PRECISION DEFAULT 0.000001,
+    trong_so NUMERIC(5, 2) DEFAULT 1,
+    is_hidden BOOLEAN DEFAULT TRUE,
+    thu_tu INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_test_case_bai_tap_bai_tap_id ON test_case_bai_tap(bai_tap_id);
+
+CREATE TABLE IF NOT EXISTS ket_qua_test_case (
+    id SERIAL PRIMARY KEY,
+    nop_bai_id INTEGER NOT NULL REFERENCES nop_bai(id) ON DELETE CASCADE,
+    test_case_id INTEGER NOT NULL REFERENCES test_case_bai_tap(id) ON DELETE CASCADE,
+    ket_qua VARCHAR(30) NOT NULL,
+    thoi_gian DOUBLE PRECISION,
+    bo_nho_kb INTEGER,
+    output TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ket_qua_test_case_nop_bai_id ON ket_qua_test_case(nop_bai_id);
@@ -0,0 +1,25 @@
+-- Tìm kiếm toàn văn khóa học (core/course_search.py)
+-- Chạy: psql -U elearn -d elearning -f database/add_course_search.sql
+-- Cấu hình "vietnamese": bỏ dấu (unaccent, gồm cả đ -> d) rồi chuyển chữ thường (simple),
+-- nên "lap trinh" khớp "Lập trình" và ts_headline vẫn tô sáng được văn bản gốc có dấu
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'vietnamese') THEN
+        CREATE TEXT SEARCH CONFIGURATION public.vietnamese (COPY = pg_catalog.simple);
+        ALTER TEXT SEARCH CONFIGURATION public.vietnamese
+            ALTER MAPPING FOR word, hword, hword_part, numword, numhword, hword_numpart
+            WITH unaccent, simple;
+    END IF;
+END $$;
+
+-- Cột sinh tự động khi insert/update: tiêu đề trọng số A, mô tả trọng số B
+ALTER TABLE khoa_hoc
+ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('public.vietnamese'::regconfig, coalesce(tieu_de, '')), 'A') ||
+    setweight(to_tsvector('public.vietnamese'::regconfig, coalesce(mo_ta, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_khoa_hoc_search_vector
+    ON khoa_hoc USING GIN (search_vector);
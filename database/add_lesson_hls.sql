@@ -0,0 +1,13 @@
+-- Đóng gói HLS nhiều mức bitrate cho video bài học
+-- Chạy: psql -U elearn -d elearning -f database/add_lesson_hls.sql
+-- hls_status: NULL (chưa/không đóng gói), pending, processing, ready, failed
+ALTER TABLE chi_tiet_khoa_hoc
+ADD COLUMN IF NOT EXISTS hls_status VARCHAR(20),
+ADD COLUMN IF NOT EXISTS hls_path VARCHAR(500),
+ADD COLUMN IF NOT EXISTS hls_renditions JSONB,
+ADD COLUMN IF NOT EXISTS hls_claimed_at TIMESTAMP WITH TIME ZONE;  -- Lúc một worker nhận đóng gói (processing)
+
+-- Bài học còn chờ đóng gói được nạp lại khi khởi động
+CREATE INDEX IF NOT EXISTS idx_chi_tiet_khoa_hoc_hls_status
+ON chi_tiet_khoa_hoc(hls_status)
+WHERE hls_status IN ('pending', 'processing');
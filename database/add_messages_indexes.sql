@@ -0,0 +1,7 @@
+-- Index cho danh sách cuộc trò chuyện và đếm tin nhắn chưa đọc
+-- Chạy: psql -U elearn -d elearning -f database/add_messages_indexes.sql
+CREATE INDEX IF NOT EXISTS idx_messages_sender_receiver_created
+    ON messages(sender_id, receiver_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_messages_receiver_da_doc
+    ON messages(receiver_id, da_doc);
@@ -0,0 +1,6 @@
+-- Metadata video bài học đọc từ file MP4 khi upload (core/mp4.py)
+-- Chạy: psql -U elearn -d elearning -f database/add_video_metadata.sql
+ALTER TABLE chi_tiet_khoa_hoc
+ADD COLUMN IF NOT EXISTS video_width INTEGER,
+ADD COLUMN IF NOT EXISTS video_height INTEGER,
+ADD COLUMN IF NOT EXISTS video_bitrate INTEGER;
@@ -0,0 +1,31 @@
+-- Thống kê đánh giá mỗi khóa học (số đánh giá, tổng điểm, số đánh giá theo từng mức sao)
+-- Chạy: psql -U elearn -d elearning -f database/create_course_ratings_table.sql
+-- Được cập nhật cùng transaction với insert/update/delete danh_gia_khoa_hoc (core/course_ratings.py)
+CREATE TABLE IF NOT EXISTS course_ratings (
+    khoa_hoc_id INTEGER PRIMARY KEY REFERENCES khoa_hoc(id) ON DELETE CASCADE,
+    total_reviews INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    star_1 INTEGER NOT NULL DEFAULT 0,
+    star_2 INTEGER NOT NULL DEFAULT 0,
+    star_3 INTEGER NOT NULL DEFAULT 0,
+    star_4 INTEGER NOT NULL DEFAULT 0,
+    star_5 INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Backfill từ đánh giá hiện có (chạy lại an toàn; tương đương scripts/rebuild_course_ratings.py)
+INSERT INTO course_ratings (khoa_hoc_id, total_reviews, rating_sum, star_1, star_2, star_3, star_4, star_5)
+SELECT khoa_hoc_id, COUNT(*), SUM(diem),
+       COUNT(*) FILTER (WHERE diem = 1), COUNT(*) FILTER (WHERE diem = 2), COUNT(*) FILTER (WHERE diem = 3),
+       COUNT(*) FILTER (WHERE diem = 4), COUNT(*) FILTER (WHERE diem = 5)
+FROM danh_gia_khoa_hoc
+GROUP BY khoa_hoc_id
+ON CONFLICT (khoa_hoc_id) DO UPDATE SET
+    total_reviews = EXCLUDED.total_reviews,
+    rating_sum = EXCLUDED.rating_sum,
+    star_1 = EXCLUDED.star_1,
+    star_2 = EXCLUDED.star_2,
+    star_3 = EXCLUDED.star_3,
+    star_4 = EXCLUDED.star_4,
+    star_5 = EXCLUDED.star_5,
+    updated_at = CURRENT_TIMESTAMP;
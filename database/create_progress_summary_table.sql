@@ -0,0 +1,26 @@
+-- Tóm tắt tiến độ mỗi (user, khóa học): số bài đã hoàn thành và tổng số bài
+-- Chạy: psql -U elearn -d elearning -f database/create_progress_summary_table.sql
+-- Được cập nhật cùng transaction với progress/chi_tiet_khoa_hoc (core/progress_summary.py)
+CREATE TABLE IF NOT EXISTS progress_summary (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES khoa_hoc(id) ON DELETE CASCADE,
+    completed_lessons INTEGER NOT NULL DEFAULT 0,
+    total_lessons INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, course_id)
+);
+
+-- Cập nhật tổng số bài cho mọi học viên của một khóa học khi thêm/xóa bài
+CREATE INDEX IF NOT EXISTS idx_progress_summary_course ON progress_summary(course_id);
+
+-- Backfill từ progress hiện có (chạy lại an toàn; tương đương scripts/progress_summary.py backfill)
+INSERT INTO progress_summary (user_id, course_id, completed_lessons, total_lessons)
+SELECT p.user_id, p.course_id,
+       COUNT(*) FILTER (WHERE p.completed AND p.lesson_id IS NOT NULL),
+       (SELECT COUNT(*) FROM chi_tiet_khoa_hoc c WHERE c.khoa_hoc_id = p.course_id)
+FROM progress p
+GROUP BY p.user_id, p.course_id
+ON CONFLICT (user_id, course_id) DO UPDATE SET
+    completed_lessons = EXCLUDED.completed_lessons,
+    total_lessons = EXCLUDED.total_lessons,
+    updated_at = CURRENT_TIMESTAMP;
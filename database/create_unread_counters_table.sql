@@ -0,0 +1,9 @@
+-- Bộ đếm tin nhắn/thông báo chưa đọc cho mỗi user
+-- Chạy: psql -U elearn -d elearning -f database/create_unread_counters_table.sql
+-- Không cần backfill: dòng của mỗi user được tạo (bằng COUNT) ở lần đọc đầu tiên
+CREATE TABLE IF NOT EXISTS unread_counters (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    messages INTEGER NOT NULL DEFAULT 0,
+    notifications INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
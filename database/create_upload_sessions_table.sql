@@ -0,0 +1,15 @@
+-- Phiên upload video nối tiếp được (PATCH từng chunk, có thể gửi lại khi mất kết nối)
+-- Chạy: psql -U elearn -d elearning -f database/create_upload_sessions_table.sql
+CREATE TABLE IF NOT EXISTS phien_upload (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    chi_tiet_id INTEGER NOT NULL REFERENCES chi_tiet_khoa_hoc(id) ON DELETE CASCADE,
+    ten_file VARCHAR(255) NOT NULL,
+    kich_thuoc BIGINT NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_phien_upload_user_id ON phien_upload(user_id);
+CREATE INDEX IF NOT EXISTS idx_phien_upload_expires_at ON phien_upload(expires_at);
@@ -0,0 +1,13 @@
+-- Thời gian xem video mỗi (user, bài học): các đoạn đã xem (đã gộp), tổng giây đã xem, vị trí xem tiếp
+-- Chạy: psql -U elearn -d elearning -f database/create_watch_progress_table.sql
+-- Được ghi hàng loạt (một câu INSERT ... ON CONFLICT) từ bộ đệm heartbeat (core/watch_time.py)
+CREATE TABLE IF NOT EXISTS watch_progress (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    lesson_id INTEGER NOT NULL REFERENCES chi_tiet_khoa_hoc(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES khoa_hoc(id) ON DELETE CASCADE,
+    watched_intervals JSONB NOT NULL DEFAULT '[]'::jsonb,
+    watched_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_position DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, lesson_id)
+);
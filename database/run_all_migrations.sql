@@ -15,6 +15,11 @@
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/create_payment_table.sql
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/create_deposit_transactions.sql
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/create_messages_table.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/create_unread_counters_table.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/create_upload_sessions_table.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/create_course_ratings_table.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/create_progress_summary_table.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/create_watch_progress_table.sql
 
 -- ========================================
 -- 3. Thêm các cột
@@ -26,6 +31,11 @@
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/add_discussion_parent_id.sql
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/add_deposit_fields.sql
 \i D:/aWebhoctructuyen/Webhoctructuyen/database/add_user_balance.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/add_messages_indexes.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/add_auto_grading.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/add_lesson_hls.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/add_video_metadata.sql
+\i D:/aWebhoctructuyen/Webhoctructuyen/database/add_course_search.sql
 
 -- ========================================
 -- 4. Fix các bảng (nếu cần)
@@ -0,0 +1,159 @@
+"""
+Danh sách khóa học (/courses, /admin/courses/pending, /teachers/me/courses/with-stats):
+sparse fieldset và phân trang keyset theo kiểu sắp xếp.
+
+- fields=id,tieu_de,gia: chỉ SELECT các cột đó (load_only) và chỉ serialize chúng; id luôn có.
+- Phân trang khi có limit: keyset trên (giá trị sắp xếp, id) nên trang sau không chậm dần như OFFSET.
+  Cursor trang kế (opaque) nằm trong header X-Next-Cursor, gửi lại bằng cursor=; không còn trang thì không có header.
+- X-Total-Count: COUNT(*) cùng bộ lọc, không ORDER BY, chỉ tính ở trang đầu (không có cursor);
+  không phân trang thì là số dòng trả về.
+- Không có limit/cursor: trả toàn bộ như trước (client cũ).
+"""
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Double, cast, func, tuple_
+from sqlalchemy.orm import load_only
+
+from ..core.course_search import rank_expression
+from ..models.course import Course
+from .pagination import NEXT_CURSOR_HEADER
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+
+def _money(value) -> Optional[float]:
+    return float(value) if value else None
+
+
+# Tên trường -> (cột, cách serialize)
+COURSE_FIELDS: dict[str, tuple] = {
+    "id": (Course.id, lambda c: c.id),
+    "tieu_de": (Course.tieu_de, lambda c: c.tieu_de),
+    "mo_ta": (Course.mo_ta, lambda c: c.mo_ta),
+    "cap_do": (Course.cap_do, lambda c: c.cap_do),
+    "hinh_anh": (Course.hinh_anh, lambda c: c.hinh_anh),
+    "gia": (Course.gia, lambda c: _money(c.gia) or 0.0),
+    "gia_goc": (Course.gia_goc, lambda c: _money(c.gia_goc)),
+    "so_buoi": (Course.so_buoi, lambda c: c.so_buoi or 0),
+    "thoi_luong": (Course.thoi_luong, lambda c: c.thoi_luong),
+    "hinh_thuc": (Course.hinh_thuc, lambda c: c.hinh_thuc.value if c.hinh_thuc else "online"),
+    "trang_thai": (Course.trang_thai, lambda c: c.trang_thai.value if c.trang_thai else "active"),
+    "teacher_id": (Course.teacher_id, lambda c: c.teacher_id),
+    "created_at": (Course.created_at, lambda c: c.created_at.isoformat() if c.created_at else None),
+    # Subquery theo khóa chính vào course_ratings
+    "average_rating": (Course.average_rating, lambda c: float(c.average_rating or 0)),
+    "total_reviews": (Course.total_reviews, lambda c: c.total_reviews or 0),
+}
+# Các trường CourseOut (mặc định của /courses và /admin/courses/pending)
+DEFAULT_FIELDS = ("id", "tieu_de", "mo_ta", "cap_do", "hinh_anh", "gia", "gia_goc", "so_buoi",
+                  "thoi_luong", "hinh_thuc", "teacher_id", "average_rating", "total_reviews")
+
+
+def parse_fields(fields: Optional[str], default: tuple[str, ...], extra: tuple[str, ...] = ()) -> tuple[str, ...]:
+    """Danh sách trường từ tham số fields= (giữ thứ tự, bỏ trùng); extra là trường tính thêm ngoài cột"""
+    if not fields:
+        return default
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in COURSE_FIELDS and name not in extra]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Trường không hợp lệ: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *names]))
+
+
+def load_fields(fields: tuple[str, ...]):
+    """Option load_only cho select(Course): chỉ nạp cột được yêu cầu"""
+    return load_only(*(COURSE_FIELDS[name][0] for name in fields if name in COURSE_FIELDS), raiseload=True)
+
+
+def serialize(course: Course, fields: tuple[str, ...]) -> dict:
+    return {name: COURSE_FIELDS[name][1](course) for name in fields if name in COURSE_FIELDS}
+
+
+class SortKey:
+    def __init__(self, expression, ascending: bool, parse: Callable[[str], object]):
+        self.expression = expression
+        self.ascending = ascending
+        self.parse = parse
+
+
+SORTS = {
+    "newest": SortKey(Course.created_at, False, datetime.fromisoformat),
+    # Giá NULL coi như 0 để keyset không lệch
+    "price_asc": SortKey(func.coalesce(Course.gia, 0), True, Decimal),
+    "price_desc": SortKey(func.coalesce(Course.gia, 0), False, Decimal),
+}
+
+
+def relevance_key(q: Optional[str], dialect_name: str) -> Optional[SortKey]:
+    """Sắp xếp theo ts_rank giảm dần; None nếu không xếp hạng được (không có từ tìm / không phải PostgreSQL)"""
+    rank = rank_expression(q, dialect_name)
+    if rank is None:
+        return None
+    # ts_rank trả về real (float4) còn cursor bind float8: so sánh (rank, id) < (:v, :id) trên real
+    # bỏ sót hoặc lặp các dòng cùng rank. Ép double precision cho cả ORDER BY lẫn cursor.
+    return SortKey(cast(rank, Double), False, float)
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    text = value.isoformat() if isinstance(value, datetime) else str(value)
+    raw = f"{sort}|{text}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, parse: Callable[[str], object]) -> tuple[object, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        return parse(value), int(row_id)
+    except (ValueError, InvalidOperation, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor không hợp lệ")
+
+
+def keyset_page(query, sort: str, key: SortKey, cursor: Optional[str], limit: Optional[int]):
+    """
+    Sắp xếp theo (key, id) và áp dụng cursor/limit cho select(Course, ...).
+    Thêm cột sort_value để lấy cursor trang kế; đọc thêm 1 dòng để biết còn trang sau không.
+    """
+    if cursor and not limit:
+        limit = DEFAULT_LIMIT
+    ordered = tuple_(key.expression, Course.id)
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, key.parse)
+        bound = tuple_(value, row_id)
+        query = query.where(ordered > bound if key.ascending else ordered < bound)
+    if key.ascending:
+        query = query.order_by(key.expression.asc(), Course.id.asc())
+    else:
+        query = query.order_by(key.expression.desc(), Course.id.desc())
+    query = query.add_columns(key.expression.label("sort_value"))
+    if limit:
+        query = query.limit(limit + 1)
+    return query, limit
+
+
+def page_headers(rows: list, sort: str, limit: Optional[int], total: Optional[int] = None) -> tuple[list, dict]:
+    """Cắt dòng đọc thêm, trả về (rows của trang, header X-Next-Cursor/X-Total-Count)"""
+    headers = {}
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, last.sort_value, last.Course.id)
+    if total is None and not limit:
+        total = len(rows)  # Không phân trang: tổng chính là số dòng
+    if total is not None:
+        headers[TOTAL_COUNT_HEADER] = str(total)
+    return rows, headers
+
+
+def count_query(query):
+    """COUNT(*) cùng điều kiện WHERE của select(Course) (bỏ ORDER BY/LIMIT)"""
+    return query.with_only_columns(func.count(Course.id), maintain_column_froms=True).order_by(None)
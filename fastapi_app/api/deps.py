@@ -1,8 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from typing import Optional
 
-from ..core.security import oauth2_scheme, decode_token
-from ..db.session import get_db
+from ..core.security import oauth2_scheme, optional_oauth2_scheme, decode_token
+from ..db.session import get_db, get_async_db
 from ..models.user import User
 
 
@@ -28,3 +29,66 @@ def get_current_admin_user(current_user: User = Depends(get_current_active_user)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
     return current_user
 
+
+async def get_current_user_async(db=Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> User:
+    """Giống get_current_user nhưng dùng session async, không chiếm worker threadpool"""
+    user_id = decode_token(token)
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+
+    user = await db.get(User, int(user_id))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)) -> User:
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return current_user
+
+
+async def get_optional_user_async(
+    db=Depends(get_async_db), token: Optional[str] = Depends(optional_oauth2_scheme)
+) -> Optional[User]:
+    """Người dùng hiện tại nếu có token hợp lệ, khách thì None (không raise 401)"""
+    if not token:
+        return None
+    try:
+        user_id = decode_token(token)
+    except HTTPException:
+        return None
+    if not user_id:
+        return None
+
+    user = await db.get(User, int(user_id))
+    if not user or not user.is_active:
+        return None
+    return user
+
+
+def bearer_or_query_token(request_headers, token: Optional[str]) -> Optional[str]:
+    """Trình duyệt không gắn được header cho WebSocket/EventSource nên cho phép ?token="""
+    auth = request_headers.get("authorization")
+    if auth and auth.lower().startswith("bearer "):
+        return auth[7:]
+    return token
+
+
+async def get_user_from_token_async(token: Optional[str]) -> Optional[User]:
+    """Dùng cho WebSocket/SSE: trả None thay vì raise khi token không hợp lệ"""
+    if not token:
+        return None
+    try:
+        user_id = decode_token(token)
+    except HTTPException:
+        return None
+    if not user_id:
+        return None
+
+    user = None
+    async for db in get_async_db():
+        user = await db.get(User, int(user_id))
+    if not user or not user.is_active:
+        return None
+    return user
@@ -0,0 +1,70 @@
+"""
+Phân trang keyset (cursor) trên cặp (created_at, id).
+
+Cursor là chuỗi opaque (base64 của "created_at|id"); client chỉ cần gửi lại nguyên văn.
+Kết quả luôn theo thứ tự mới nhất trước; cursor trang kế nằm trong header
+X-Next-Cursor (cũ hơn, dùng với before=) và X-Prev-Cursor (mới hơn, dùng với after=).
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor không hợp lệ")
+
+
+def keyset_paginate(query, created_col, id_col, before: Optional[str], after: Optional[str], limit: int):
+    """
+    Áp dụng điều kiện keyset + order + limit cho select()/Query.
+    Trả về (query, reversed): reversed=True nghĩa là kết quả đang theo thứ tự cũ trước,
+    cần đảo lại (xem keyset_rows).
+    """
+    if before and after:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chỉ dùng một trong before/after")
+
+    key = tuple_(created_col, id_col)
+    if after:
+        query = query.where(key > tuple_(*decode_cursor(after)))
+        return query.order_by(created_col.asc(), id_col.asc()).limit(limit), True
+
+    if before:
+        query = query.where(key < tuple_(*decode_cursor(before)))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit), False
+
+
+def keyset_rows(rows, reversed_order: bool, limit: int, response: Response, before: Optional[str] = None,
+                after: Optional[str] = None):
+    """Đưa kết quả về thứ tự mới nhất trước và gắn header cursor cho trang kế"""
+    rows = list(rows)
+    if reversed_order:
+        rows.reverse()
+    if rows:
+        first, last = rows[0], rows[-1]
+        # Còn bản ghi cũ hơn nếu trang đầy, hoặc nếu đang đi về phía mới hơn (after=)
+        if len(rows) == limit or after:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+        response.headers[PREV_CURSOR_HEADER] = encode_cursor(first.created_at, first.id)
+    elif before:
+        # Trang rỗng: giữ cursor đã gửi để client quay lại được
+        response.headers[PREV_CURSOR_HEADER] = before
+    elif after:
+        response.headers[NEXT_CURSOR_HEADER] = after
+    return rows
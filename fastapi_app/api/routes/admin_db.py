@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ...api.deps import get_current_admin_user
+from ...core.catalog_cache import catalog_cache
+from ...core.config import settings
+from ...core.uploads import collect_upload_garbage
+from ...db.pool import pool_status
+from ...db import session as db_session
+from ...db.session import get_db
+from ...models.user import User
+
+router = APIRouter()
+
+
+@router.get("/db/pool")
+def get_pool_stats(admin: User = Depends(get_current_admin_user)):
+    """Thống kê connection pool của worker hiện tại (checked-out, overflow, thời gian chờ)"""
+    engines = {"sync": db_session.engine}
+    if db_session.async_engine is not None:
+        engines["async"] = db_session.async_engine.sync_engine
+
+    return {
+        "config": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pgbouncer": settings.db_pgbouncer,
+        },
+        "pools": {
+            name: pool_status(eng.pool, db_session.pool_metrics[name])
+            for name, eng in engines.items()
+        },
+    }
+
+
+@router.get("/cache/catalog")
+def get_catalog_cache_stats(admin: User = Depends(get_current_admin_user)):
+    """Cache danh sách khóa học của worker hiện tại: số entry, hit/miss"""
+    return {"ttl_seconds": catalog_cache.ttl_seconds, **catalog_cache.stats()}
+
+
+@router.post("/uploads/gc")
+def collect_uploads(
+    dry_run: bool = True,
+    include_legacy: bool = False,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin_user),
+):
+    """Dọn file upload không còn được tham chiếu; dry_run (mặc định) chỉ báo cáo.
+    include_legacy: xét cả file tên cũ (trước kho theo nội dung) ở cấp đầu thư mục upload"""
+    report = collect_upload_garbage(db, dry_run=dry_run, include_legacy=include_legacy)
+    return {**report._asdict(), "reclaimed_mb": round(report.reclaimed_bytes / (1024 * 1024), 2)}
@@ -1,24 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
-import os
-import uuid
 
 from ...db.session import get_db
-from ...models.assignment import Assignment, Submission
+from ...core.grading import MAX_TEST_CASES, grader
+from ...core.uploads import ASSIGNMENT_FILE, SUBMISSION, store_upload
+from ...models.assignment import Assignment, Submission, TestCase, TestCaseResult
 from ...models.course import Course
-from ...schemas.assignment import AssignmentCreate, AssignmentOut, SubmissionCreate, SubmissionOut
+from ...schemas.assignment import (
+    AssignmentCreate, AssignmentOut, SubmissionCreate, SubmissionOut,
+    AutoGradingUpdate, TestCaseCreate, TestCaseOut, TestCaseResultOut,
+)
 from ...api.deps import get_current_active_user
 from ...models.user import User, UserRole
 
 router = APIRouter()
 
-UPLOAD_DIR = "static/uploads/assignments"
-ASSIGNMENT_FILES_DIR = "static/uploads/assignment_files"  # File đính kèm bài tập
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(ASSIGNMENT_FILES_DIR, exist_ok=True)
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+AUTO_GRADING_LANGUAGES = ("python", "javascript", "cpp")
 
 
 def _ensure_course(db: Session, course_id: int) -> Course:
@@ -35,6 +35,30 @@ def _ensure_assignment(db: Session, assignment_id: int) -> Assignment:
     return assignment
 
 
+def _ensure_teacher(current_user: User, detail: str = "Chỉ giáo viên mới có thể quản lý test case"):
+    if current_user.role not in [UserRole.teacher, UserRole.admin]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+def _validate_language(ngon_ngu: Optional[str]) -> Optional[str]:
+    if not ngon_ngu:
+        return None
+    ngon_ngu = ngon_ngu.lower()
+    if ngon_ngu not in AUTO_GRADING_LANGUAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ngôn ngữ tự chấm không hợp lệ. Hỗ trợ: {', '.join(AUTO_GRADING_LANGUAGES)}"
+        )
+    return ngon_ngu
+
+
+def _is_auto_graded(db: Session, assignment: Assignment) -> bool:
+    # Grader tắt (GRADING_ENABLED=false) hoặc sandbox không chạy: bài nộp để giáo viên chấm tay
+    if not assignment.ngon_ngu or not grader.accepts(assignment.ngon_ngu):
+        return False
+    return db.query(TestCase.id).filter(TestCase.bai_tap_id == assignment.id).first() is not None
+
+
 @router.get("/courses/{course_id}/assignments", response_model=list[AssignmentOut])
 def list_assignments(course_id: int, db: Session = Depends(get_db)):
     try:
@@ -57,6 +81,7 @@ def list_assignments(course_id: int, db: Session = Depends(get_db)):
                 is_required=a.is_required,
                 diem_toi_da=float(a.diem_toi_da) if a.diem_toi_da else 10.0,
                 file_path=a.file_path,
+                ngon_ngu=a.ngon_ngu,
                 created_at=a.created_at
             ))
         return result
@@ -75,6 +100,7 @@ async def create_assignment(
     han_nop: Optional[str] = Form(None),
     is_required: bool = Form(False),
     diem_toi_da: Optional[float] = Form(10.0),
+    ngon_ngu: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -85,29 +111,16 @@ async def create_assignment(
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Chỉ giáo viên mới có thể tạo bài tập")
         
         _ensure_course(db, course_id)
+        ngon_ngu = _validate_language(ngon_ngu)
         
         # Xử lý file upload nếu có
         file_path = None
         if file and file.filename:
-            # Kiểm tra kích thước file
-            contents = await file.read()
-            if len(contents) > MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File quá lớn. Kích thước tối đa: {MAX_FILE_SIZE / 1024 / 1024}MB"
-                )
-            
-            # Tạo tên file unique
-            file_ext = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-            file_path_save = os.path.join(ASSIGNMENT_FILES_DIR, unique_filename)
-            
-            # Lưu file
-            with open(file_path_save, "wb") as f:
-                f.write(contents)
+            # Lưu file ngoài event loop, vượt giới hạn thì 413; tên file theo sha256 nội dung
+            stored = await run_in_threadpool(store_upload, file, ASSIGNMENT_FILE)
             
             # Đường dẫn để trả về cho client
-            file_path = f"/static/uploads/assignment_files/{unique_filename}"
+            file_path = stored.url
         
         # Parse datetime nếu có
         han_nop_datetime = None
@@ -130,7 +143,8 @@ async def create_assignment(
             han_nop=han_nop_datetime,
             is_required=is_required,
             diem_toi_da=diem_toi_da,
-            file_path=file_path
+            file_path=file_path,
+            ngon_ngu=ngon_ngu
         )
         
         db.add(assignment)
@@ -199,15 +213,10 @@ def submit_assignment(
 
     file_path = None
     if file:
-        file_bytes = file.file.read()
-        if len(file_bytes) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File vượt quá 10MB")
-        ext = os.path.splitext(file.filename)[1]
-        filename = f"{assignment_id}_{current_user.id}_{uuid.uuid4().hex}{ext}"
-        disk_path = os.path.join(UPLOAD_DIR, filename)
-        with open(disk_path, "wb") as buffer:
-            buffer.write(file_bytes)
-        file_path = f"/static/uploads/assignments/{filename}"
+        file_path = store_upload(file, SUBMISSION).url
+
+    # Bài tập code có test case: chấm tự động sau khi lưu
+    trang_thai = "grading" if _is_auto_graded(db, assignment) else "submitted"
 
     # Cho phép nộp lại: update nếu đã tồn tại, ngược lại tạo mới
     submission = (
@@ -218,19 +227,21 @@ def submit_assignment(
     if submission:
         submission.noi_dung = noi_dung
         submission.file_path = file_path or submission.file_path
-        submission.trang_thai = "submitted"
+        submission.trang_thai = trang_thai
     else:
         submission = Submission(
             bai_tap_id=assignment_id,
             user_id=current_user.id,
             noi_dung=noi_dung,
             file_path=file_path,
-            trang_thai="submitted"
+            trang_thai=trang_thai
         )
         db.add(submission)
 
     db.commit()
     db.refresh(submission)
+    if trang_thai == "grading":
+        grader.enqueue(submission.id)
     
     # Tạo thông báo cho giáo viên
     try:
@@ -327,4 +338,149 @@ def grade_submission(
     return submission
 
 
+# ---------- Tự chấm bằng test case ----------
+
+@router.put("/assignments/{assignment_id}/auto-grading", response_model=AssignmentOut)
+def update_auto_grading(
+    assignment_id: int,
+    payload: AutoGradingUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Bật (chọn ngôn ngữ) hoặc tắt (ngon_ngu = null) tự chấm cho bài tập"""
+    _ensure_teacher(current_user)
+    assignment = _ensure_assignment(db, assignment_id)
+    assignment.ngon_ngu = _validate_language(payload.ngon_ngu)
+    db.commit()
+    db.refresh(assignment)
+    return assignment
+
+
+@router.get("/assignments/{assignment_id}/test-cases", response_model=list[TestCaseOut])
+def list_test_cases(
+    assignment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    _ensure_assignment(db, assignment_id)
+    cases = (
+        db.query(TestCase)
+        .filter(TestCase.bai_tap_id == assignment_id)
+        .order_by(TestCase.thu_tu, TestCase.id)
+        .all()
+    )
+    is_teacher = current_user.role in [UserRole.teacher, UserRole.admin]
+    result = []
+    for case in cases:
+        out = TestCaseOut.model_validate(case)
+        if case.is_hidden and not is_teacher:
+            out.du_lieu_vao = None
+            out.ket_qua_mong_doi = None
+        result.append(out)
+    return result
+
+
+@router.post("/assignments/{assignment_id}/test-cases", response_model=TestCaseOut, status_code=status.HTTP_201_CREATED)
+def create_test_case(
+    assignment_id: int,
+    payload: TestCaseCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    _ensure_teacher(current_user)
+    _ensure_assignment(db, assignment_id)
+    count = db.query(TestCase).filter(TestCase.bai_tap_id == assignment_id).count()
+    if count >= MAX_TEST_CASES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tối đa {MAX_TEST_CASES} test case mỗi bài tập")
+
+    case = TestCase(bai_tap_id=assignment_id, **payload.model_dump())
+    db.add(case)
+    db.commit()
+    db.refresh(case)
+    return case
+
+
+@router.put("/test-cases/{test_case_id}", response_model=TestCaseOut)
+def update_test_case(
+    test_case_id: int,
+    payload: TestCaseCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    _ensure_teacher(current_user)
+    case = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    if not case:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test case không tồn tại")
+    for field, value in payload.model_dump().items():
+        setattr(case, field, value)
+    db.commit()
+    db.refresh(case)
+    return case
+
+
+@router.delete("/test-cases/{test_case_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_test_case(
+    test_case_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    _ensure_teacher(current_user)
+    case = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    if not case:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Test case không tồn tại")
+    db.query(TestCaseResult).filter(TestCaseResult.test_case_id == test_case_id).delete(synchronize_session=False)
+    db.delete(case)
+    db.commit()
+    return None
+
+
+@router.post("/assignments/{assignment_id}/regrade")
+def regrade_assignment(
+    assignment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Chấm lại mọi bài nộp (sau khi sửa test case); chạy nền theo hàng đợi chấm bài"""
+    _ensure_teacher(current_user, "Chỉ giáo viên mới có thể chấm lại bài")
+    assignment = _ensure_assignment(db, assignment_id)
+    if not _is_auto_graded(db, assignment):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bài tập chưa bật tự chấm, chưa có test case hoặc hệ thống chấm tự động đang tắt")
+
+    ids = [row.id for row in db.query(Submission.id).filter(Submission.bai_tap_id == assignment_id)]
+    db.query(Submission).filter(Submission.bai_tap_id == assignment_id).update(
+        {Submission.trang_thai: "grading"}, synchronize_session=False
+    )
+    db.commit()
+    for submission_id in ids:
+        grader.enqueue(submission_id)
+    return {"queued": len(ids)}
+
+
+@router.get("/submissions/{submission_id}/test-results", response_model=list[TestCaseResultOut])
+def get_test_results(
+    submission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Kết quả từng test case của lần chấm gần nhất"""
+    submission = db.query(Submission).filter(Submission.id == submission_id).first()
+    if not submission:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài nộp không tồn tại")
+    is_teacher = current_user.role in [UserRole.teacher, UserRole.admin]
+    if submission.user_id != current_user.id and not is_teacher:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Không có quyền xem bài nộp này")
 
+    rows = (
+        db.query(TestCaseResult, TestCase.is_hidden)
+        .join(TestCase, TestCase.id == TestCaseResult.test_case_id)
+        .filter(TestCaseResult.nop_bai_id == submission_id)
+        .order_by(TestCase.thu_tu, TestCase.id)
+        .all()
+    )
+    result = []
+    for row, is_hidden in rows:
+        out = TestCaseResultOut.model_validate(row)
+        if is_hidden and not is_teacher:
+            out.output = None
+        result.append(out)
+    return result
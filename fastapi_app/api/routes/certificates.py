@@ -5,10 +5,9 @@ import secrets
 from ...db.session import get_db
 from ...models.certificate import Certificate
 from ...models.course import Course
-from ...models.progress import Progress
-from ...models.course_content import CourseContent
 from ...api.deps import get_current_active_user
 from ...models.user import User
+from ...core import progress_summary
 
 router = APIRouter()
 
@@ -24,12 +23,7 @@ def get_certificate(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
     
     # Kiểm tra đã hoàn thành chưa (100% progress)
-    total_lessons = db.query(CourseContent).filter(CourseContent.khoa_hoc_id == course_id).count()
-    completed_lessons = db.query(Progress).filter(
-        Progress.user_id == current_user.id,
-        Progress.course_id == course_id,
-        Progress.completed == True
-    ).count()
+    completed_lessons, total_lessons = progress_summary.get_counts(db, current_user.id, course_id)
     
     if total_lessons == 0 or completed_lessons < total_lessons:
         raise HTTPException(
@@ -78,12 +72,7 @@ def mark_course_complete(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
     
     # Kiểm tra đã hoàn thành chưa
-    total_lessons = db.query(CourseContent).filter(CourseContent.khoa_hoc_id == course_id).count()
-    completed_lessons = db.query(Progress).filter(
-        Progress.user_id == current_user.id,
-        Progress.course_id == course_id,
-        Progress.completed == True
-    ).count()
+    completed_lessons, total_lessons = progress_summary.get_counts(db, current_user.id, course_id)
     
     if completed_lessons < total_lessons:
         raise HTTPException(
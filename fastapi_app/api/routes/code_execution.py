@@ -1,18 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 import subprocess
 import tempfile
 import os
 import time
 from typing import Optional
 
-from ...db.session import get_db
-from ...schemas.code_execution import CodeExecutionRequest, CodeExecutionResponse
-from ...api.deps import get_current_active_user
+from ...core.compile_cache import CompileCache, CompileError
+from ...core.config import settings
+from ...core import code_jobs as jobs
+from ...core.code_jobs import CodeJob, code_jobs
+from ...core.sandbox import SandboxBusy, job_sandbox, sandbox
+from ...schemas.code_execution import CodeExecutionRequest, CodeExecutionResponse, CodeJobResponse
+from ...api.deps import bearer_or_query_token, get_current_active_user_async, get_user_from_token_async
 from ...models.user import User
 
 router = APIRouter()
 
+# Ping định kỳ cho kết nối stream (giống routes/realtime.py)
+KEEPALIVE_SECONDS = 25
+
+compile_cache = CompileCache(settings.compile_cache_dir or None, settings.compile_cache_max_mb * 1024 * 1024)
+
 # Mapping language to command
 LANGUAGE_COMMANDS = {
     "python": {
@@ -125,53 +138,36 @@ def execute_javascript(code: str, stdin: Optional[str] = None, timeout: int = 10
 
 
 def execute_cpp(code: str, stdin: Optional[str] = None, compile_timeout: int = 5, run_timeout: int = 10) -> CodeExecutionResponse:
-    """Chạy code C++"""
+    """Chạy code C++ (biên dịch qua compile cache)"""
     try:
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.cpp', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
-
-        executable = temp_file.replace('.cpp', '.exe')
-
         try:
-            # Compile
-            compile_result = subprocess.run(
-                ["g++", temp_file, "-o", executable],
-                capture_output=True,
-                text=True,
-                timeout=compile_timeout
+            executable, cache_hit = compile_cache.get_or_compile(code, compile_timeout)
+        except CompileError as e:
+            return CodeExecutionResponse(
+                output="",
+                error=e.stderr,
+                execution_time=0,
+                exit_code=e.returncode
             )
 
-            if compile_result.returncode != 0:
-                return CodeExecutionResponse(
-                    output="",
-                    error=compile_result.stderr,
-                    execution_time=0,
-                    exit_code=compile_result.returncode
-                )
-
-            # Run
-            start_time = time.time()
-            run_result = subprocess.run(
-                [executable],
-                input=stdin.encode() if stdin else None,
-                capture_output=True,
-                text=True,
-                timeout=run_timeout
-            )
-            execution_time = time.time() - start_time
+        # Run
+        start_time = time.time()
+        run_result = subprocess.run(
+            [executable],
+            input=stdin if stdin else None,
+            capture_output=True,
+            text=True,
+            timeout=run_timeout
+        )
+        execution_time = time.time() - start_time
 
-            return CodeExecutionResponse(
-                output=run_result.stdout,
-                error=run_result.stderr if run_result.returncode != 0 else None,
-                execution_time=execution_time,
-                exit_code=run_result.returncode
-            )
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-            if os.path.exists(executable):
-                os.unlink(executable)
+        return CodeExecutionResponse(
+            output=run_result.stdout,
+            error=run_result.stderr if run_result.returncode != 0 else None,
+            execution_time=execution_time,
+            exit_code=run_result.returncode,
+            cache_hit=cache_hit
+        )
     except subprocess.TimeoutExpired:
         return CodeExecutionResponse(
             output="",
@@ -188,13 +184,16 @@ def execute_cpp(code: str, stdin: Optional[str] = None, compile_timeout: int = 5
         )
 
 
-@router.post("/execute", response_model=CodeExecutionResponse)
-def execute_code(
-    payload: CodeExecutionRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Chạy code và trả về kết quả"""
+def _execute_legacy(language: str, code: str, stdin: Optional[str]) -> CodeExecutionResponse:
+    """Chạy bằng subprocess mỗi request (khi sandbox pool tắt hoặc không hỗ trợ, vd Windows)"""
+    if language == "python":
+        return execute_python(code, stdin)
+    if language == "javascript":
+        return execute_javascript(code, stdin)
+    return execute_cpp(code, stdin)
+
+
+def _validate_request(payload: CodeExecutionRequest) -> str:
     language = payload.language.lower()
 
     if language not in LANGUAGE_COMMANDS:
@@ -210,21 +209,195 @@ def execute_code(
             detail="Code quá dài (tối đa 10000 ký tự)"
         )
 
+    if language == "java":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Language '{language}' chưa được implement"
+        )
+    return language
+
+
+def _timeouts(language: str) -> dict:
+    config = LANGUAGE_COMMANDS[language]
+    return {"timeout": config.get("run_timeout", config.get("timeout")), "compile_timeout": config.get("compile_timeout")}
+
+
+@router.post("/execute", response_model=CodeExecutionResponse)
+async def execute_code(
+    payload: CodeExecutionRequest,
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Chạy code và trả về kết quả"""
+    language = _validate_request(payload)
+
     try:
-        if language == "python":
-            return execute_python(payload.code, payload.stdin)
-        elif language == "javascript":
-            return execute_javascript(payload.code, payload.stdin)
-        elif language == "cpp":
-            return execute_cpp(payload.code, payload.stdin)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Language '{language}' chưa được implement"
-            )
+        if sandbox.supports(language):
+            result = await sandbox.execute(current_user.id, language, payload.code, payload.stdin, **_timeouts(language))
+            return CodeExecutionResponse(**{k: result.get(k) for k in CodeExecutionResponse.model_fields})
+        return await run_in_threadpool(_execute_legacy, language, payload.code, payload.stdin)
+    except SandboxBusy as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi khi chạy code: {str(e)}"
         )
 
+
+# ---------- Job bất đồng bộ ----------
+
+async def _run_job(job: CodeJob, code: str, stdin: Optional[str]):
+    try:
+        if job_sandbox.supports(job.language):
+            result = await job_sandbox.execute(
+                job.user_id, job.language, code, stdin, on_event=job.on_sandbox_event, **_timeouts(job.language)
+            )
+        else:
+            # Không có sandbox (Windows): chạy một lần, không stream được output
+            job.set_status(jobs.RUNNING)
+            result = (await run_in_threadpool(_execute_legacy, job.language, code, stdin)).model_dump()
+    except asyncio.CancelledError:
+        job.finish(jobs.CANCELLED, {"output": job.output(), "error": "Job đã bị hủy", "exit_code": -1})
+        return
+    except Exception as e:
+        job.finish(jobs.FAILED, {"output": job.output(), "error": str(e), "exit_code": -1})
+        return
+
+    if job.cancel_requested:
+        result["error"] = "Job đã bị hủy"
+        job.finish(jobs.CANCELLED, result)
+    else:
+        job.finish(jobs.COMPLETED, result)
+
+
+def _get_job(job_id: str, user: User) -> CodeJob:
+    job = code_jobs.get(job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Không tìm thấy job")
+    return job
+
+
+@router.post("/jobs", response_model=CodeJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_code_job(
+    payload: CodeExecutionRequest,
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """Gửi code chạy nền, trả về job id ngay; lấy kết quả qua GET /jobs/{id} hoặc stream"""
+    language = _validate_request(payload)
+
+    # SANDBOX_USER_CONCURRENCY=0: không giới hạn theo user (giống SandboxManager._user_limited)
+    user_limited = bool(settings.sandbox_user_concurrency) and (
+        code_jobs.active_count(current_user.id) >= settings.sandbox_user_concurrency
+    )
+    if user_limited or (
+        job_sandbox.supports(language) and job_sandbox.is_busy(current_user.id, language)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Bạn đang chạy quá nhiều chương trình cùng lúc hoặc hệ thống đang quá tải, vui lòng thử lại sau"
+        )
+
+    job = code_jobs.create(current_user.id, language)
+    job.task = asyncio.create_task(_run_job(job, payload.code, payload.stdin))
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}", response_model=CodeJobResponse)
+async def get_code_job(job_id: str, current_user: User = Depends(get_current_active_user_async)):
+    """Trạng thái và kết quả của job (đang chạy thì output là phần đã nhận được)"""
+    return _get_job(job_id, current_user).to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=CodeJobResponse)
+async def cancel_code_job(job_id: str, current_user: User = Depends(get_current_active_user_async)):
+    """Hủy job đang chờ hoặc đang chạy"""
+    job = _get_job(job_id, current_user)
+    job.cancel()
+    return job.to_dict()
+
+
+async def _job_events(job: CodeJob):
+    """Output đã có, rồi sự kiện mới (output/status/result) cho tới khi job kết thúc; None = ping"""
+    backlog, queue = job.subscribe()
+    try:
+        for event_data in backlog:
+            yield event_data
+        if job.status in jobs.FINISHED:
+            yield {"type": "result", "data": job.to_dict()}
+            return
+        while True:
+            try:
+                event_data = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            yield event_data
+            if event_data["type"] == "result":
+                return
+    finally:
+        job.unsubscribe(queue)
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_code_job(job_id: str, request: Request, token: Optional[str] = Query(None)):
+    """Server-Sent Events: stdout/stderr của job theo thời gian thực (EventSource dùng ?token=)"""
+    user = await get_user_from_token_async(bearer_or_query_token(request.headers, token))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    job = _get_job(job_id, user)
+
+    async def event_stream():
+        async for event_data in _job_events(job):
+            if await request.is_disconnected():
+                return
+            if event_data is None:
+                yield ": ping\n\n"
+                continue
+            data = json.dumps(jsonable_encoder(event_data["data"]), ensure_ascii=False)
+            yield f"event: {event_data['type']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/jobs/{job_id}/ws")
+async def code_job_websocket(websocket: WebSocket, job_id: str, token: Optional[str] = Query(None)):
+    """WebSocket: nhận output/status/result của job; client gửi "cancel" để hủy"""
+    user = await get_user_from_token_async(bearer_or_query_token(websocket.headers, token))
+    job = code_jobs.get(job_id)
+    if not user or not job or job.user_id != user.id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    async def pump_events():
+        async for event_data in _job_events(job):
+            await websocket.send_json(jsonable_encoder(event_data or {"type": "ping"}))
+        await websocket.close()
+
+    async def read_commands():
+        while True:
+            # Chấp nhận "cancel" hoặc {"action": "cancel"}
+            message = await websocket.receive_text()
+            try:
+                data = json.loads(message)
+                action = data.get("action") if isinstance(data, dict) else data
+            except ValueError:
+                action = message.strip()
+            if action == "cancel":
+                job.cancel()
+
+    tasks = [asyncio.create_task(pump_events()), asyncio.create_task(read_commands())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                print(f"Code job websocket error: {exc}")
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,32 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from typing import Optional, List, Dict, Any
 import os
 import json
+import uuid
 from datetime import datetime
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
 from ...models.course_content import CourseContent
 from ...models.course import Course
-from ...schemas.content import ContentCreate, ContentOut
-from ...api.deps import get_current_active_user
+from ...models.upload_session import UploadSession
+from ...schemas.content import ContentCreate, ContentOut, ResumableUploadCreate, ResumableUploadOut
+from ...api.deps import get_current_active_user, get_current_active_user_async
+from ...core.hls import packager, schedule_packaging
+from ...core.mp4 import probe_video
+from ...core import resumable_uploads
+from ...core.storage import storage
+from ...core.uploads import PDF, VIDEO, StoredFile, check_extension, store_upload, too_large
 from ...models.user import User
 
 router = APIRouter()
 
-# Tạo thư mục uploads nếu chưa có
-UPLOAD_DIR = "static/uploads/videos"
-PDF_DIR = "static/uploads/pdfs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(PDF_DIR, exist_ok=True)
+
+def _apply_video_metadata(lesson: CourseContent, stored: Optional[StoredFile]):
+    """Thời lượng/độ phân giải/bitrate cho video vừa upload (đã faststart khi lưu); video link ngoài thì xóa metadata cũ"""
+    metadata = None
+    if stored:
+        # Chỉ đọc header và moov (với S3 là vài GET có Range)
+        with storage.open(stored.key) as f:
+            metadata = probe_video(f, stored.size, stored.key)
+    lesson.video_duration = round(metadata.duration) if metadata else 0
+    lesson.video_width = metadata.width if metadata else None
+    lesson.video_height = metadata.height if metadata else None
+    lesson.video_bitrate = metadata.bitrate if metadata else None
+
+
+def _ensure_lesson_editor(db: Session, lesson_id: int, current_user: User) -> CourseContent:
+    lesson = db.query(CourseContent).filter(CourseContent.id == lesson_id).first()
+    if not lesson:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài học không tồn tại")
+    
+    # Kiểm tra quyền: chỉ teacher của khóa học hoặc admin
+    course = db.query(Course).filter(Course.id == lesson.khoa_hoc_id).first()
+    if course and course.teacher_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Không có quyền chỉnh sửa bài học này")
+    return lesson
 
 
 @router.get("/courses/{course_id}/lessons", response_model=list[ContentOut])
-def list_lessons(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(Course).filter(Course.id == course_id).first()
+async def list_lessons(course_id: int, db=Depends(get_async_db)):
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
-    return db.query(CourseContent).filter(CourseContent.khoa_hoc_id == course_id).order_by(CourseContent.thu_tu).all()
+    result = await db.execute(
+        select(CourseContent).where(CourseContent.khoa_hoc_id == course_id).order_by(CourseContent.thu_tu)
+    )
+    return result.scalars().all()
 
 
 @router.post("/courses/{course_id}/lessons", response_model=ContentOut, status_code=status.HTTP_201_CREATED)
@@ -49,17 +80,12 @@ def create_lesson(
     
     # Xử lý file upload nếu có
     final_video_path = video_path
+    uploaded_video = None
     if video_file:
-        # Lưu file video
-        file_ext = os.path.splitext(video_file.filename)[1]
-        filename = f"{course_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            content = video_file.file.read()
-            buffer.write(content)
-        
-        final_video_path = f"/static/uploads/videos/{filename}"
+        # Lưu file video (copy theo khối, vượt giới hạn thì 413; trùng nội dung thì dùng lại blob cũ)
+        stored = store_upload(video_file, VIDEO)
+        final_video_path = stored.url
+        uploaded_video = stored
     
     # Parse unlock_date nếu có
     unlock_dt = None
@@ -81,9 +107,15 @@ def create_lesson(
         resources=[]
     )
     
+    if uploaded_video:
+        _apply_video_metadata(lesson, uploaded_video)
     db.add(lesson)
+    needs_packaging = schedule_packaging(lesson)
     db.commit()
     db.refresh(lesson)
+    if needs_packaging:
+        # Đóng gói HLS chạy nền; trong lúc chờ vẫn phát video_path (MP4)
+        packager.enqueue(lesson.id)
     return lesson
 
 
@@ -100,14 +132,7 @@ def update_lesson(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    lesson = db.query(CourseContent).filter(CourseContent.id == lesson_id).first()
-    if not lesson:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài học không tồn tại")
-    
-    # Kiểm tra quyền: chỉ teacher của khóa học hoặc admin
-    course = db.query(Course).filter(Course.id == lesson.khoa_hoc_id).first()
-    if course and course.teacher_id != current_user.id and current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Không có quyền chỉnh sửa bài học này")
+    lesson = _ensure_lesson_editor(db, lesson_id, current_user)
     
     if tieu_de_muc:
         lesson.tieu_de_muc = tieu_de_muc
@@ -116,39 +141,22 @@ def update_lesson(
     
     # Xử lý upload video
     final_video_path = video_path
+    uploaded_video = None
     if video_file:
-        # Lưu file video
-        file_ext = os.path.splitext(video_file.filename)[1]
-        allowed_extensions = ['.mp4', '.webm', '.ogg', '.mov', '.avi']
-        if file_ext.lower() not in allowed_extensions:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Chỉ chấp nhận file video: {', '.join(allowed_extensions)}")
-        
-        filename = f"lesson_{lesson_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            content = video_file.file.read()
-            buffer.write(content)
-        
-        final_video_path = f"/static/uploads/videos/{filename}"
+        # Lưu file video; file cũ không còn bài nào dùng sẽ được GC dọn (core/blob_store.py)
+        stored = store_upload(video_file, VIDEO)
+        final_video_path = stored.url
+        uploaded_video = stored
     
-    if final_video_path is not None:
+    needs_packaging = False
+    if final_video_path is not None and final_video_path != lesson.video_path:
         lesson.video_path = final_video_path
+        _apply_video_metadata(lesson, uploaded_video)
+        needs_packaging = schedule_packaging(lesson)
     
     # Xử lý upload PDF
     if tai_lieu_pdf_file:
-        file_ext = os.path.splitext(tai_lieu_pdf_file.filename)[1]
-        if file_ext.lower() != '.pdf':
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chỉ chấp nhận file PDF")
-        
-        filename = f"lesson_{lesson_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        file_path = os.path.join(PDF_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            content = tai_lieu_pdf_file.file.read()
-            buffer.write(content)
-        
-        lesson.tai_lieu_pdf = f"/static/uploads/pdfs/{filename}"
+        lesson.tai_lieu_pdf = store_upload(tai_lieu_pdf_file, PDF).url
     
     # Xử lý links
     if tai_lieu_links is not None:
@@ -166,6 +174,8 @@ def update_lesson(
     
     db.commit()
     db.refresh(lesson)
+    if needs_packaging:
+        packager.enqueue(lesson.id)
     return lesson
 
 
@@ -176,3 +186,146 @@ def get_lesson(lesson_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài học không tồn tại")
     return lesson
 
+
+
+# Upload video nối tiếp được (core/resumable_uploads.py): tạo phiên, PATCH từng chunk
+# (song song được), HEAD/GET để biết đã nhận tới đâu, complete để gắn vào bài học
+
+def _check_upload_session(session: Optional[UploadSession], current_user: User) -> UploadSession:
+    if not session or session.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Phiên upload không tồn tại")
+    if resumable_uploads.is_expired(session):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Phiên upload đã hết hạn")
+    return session
+
+
+def _upload_out(session: UploadSession) -> ResumableUploadOut:
+    offset, missing = resumable_uploads.progress(session)
+    return ResumableUploadOut(
+        id=session.id,
+        chi_tiet_id=session.chi_tiet_id,
+        ten_file=session.ten_file,
+        kich_thuoc=session.kich_thuoc,
+        chunk_size=session.chunk_size,
+        total_chunks=resumable_uploads.chunk_count(session.kich_thuoc, session.chunk_size),
+        offset=offset,
+        missing_chunks=missing,
+        expires_at=session.expires_at,
+    )
+
+
+@router.post("/lessons/{lesson_id}/video-uploads", response_model=ResumableUploadOut, status_code=status.HTTP_201_CREATED)
+def create_video_upload(
+    lesson_id: int,
+    payload: ResumableUploadCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    lesson = _ensure_lesson_editor(db, lesson_id, current_user)
+    check_extension(payload.ten_file, VIDEO)
+    if payload.kich_thuoc <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Kích thước file không hợp lệ")
+    if payload.kich_thuoc > VIDEO.max_size:
+        raise too_large(VIDEO.label, VIDEO.max_size)
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        chi_tiet_id=lesson.id,
+        ten_file=os.path.basename(payload.ten_file)[:255],
+        kich_thuoc=payload.kich_thuoc,
+        chunk_size=resumable_uploads.normalize_chunk_size(payload.chunk_size),
+        expires_at=resumable_uploads.expiry(),
+    )
+    resumable_uploads.create_staging(session)
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    response.headers["Location"] = f"/api/video-uploads/{session.id}"
+    return _upload_out(session)
+
+
+@router.get("/video-uploads/{upload_id}", response_model=ResumableUploadOut)
+def get_video_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return _upload_out(_check_upload_session(db.get(UploadSession, upload_id), current_user))
+
+
+@router.head("/video-uploads/{upload_id}")
+def video_upload_offset(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    session = _check_upload_session(db.get(UploadSession, upload_id), current_user)
+    offset, _ = resumable_uploads.progress(session)
+    return Response(headers={
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(session.kich_thuoc),
+        "Tus-Resumable": "1.0.0",
+        "Cache-Control": "no-store",
+    })
+
+
+@router.patch("/video-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_video_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
+):
+    """
+    Body (application/offset+octet-stream) là đúng một chunk bắt đầu tại Upload-Offset.
+    Upload-Checksum (tuỳ chọn): "sha256 <base64>" của chunk, sai thì 460.
+    """
+    session = _check_upload_session(await db.get(UploadSession, upload_id), current_user)
+    chunk = UploadSession(id=session.id, kich_thuoc=session.kich_thuoc, chunk_size=session.chunk_size)
+    # Trả kết nối DB về pool trong lúc nhận chunk (có thể mất vài giây)
+    await db.rollback()
+
+    await resumable_uploads.write_chunk(chunk, upload_offset, request.stream(), upload_checksum)
+    offset, _ = await run_in_threadpool(resumable_uploads.progress, chunk)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(offset), "Tus-Resumable": "1.0.0"})
+
+
+@router.delete("/video-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def cancel_video_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    session = db.get(UploadSession, upload_id)
+    if not session or session.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Phiên upload không tồn tại")
+    resumable_uploads.remove_staging(session.id)
+    db.delete(session)
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/video-uploads/{upload_id}/complete", response_model=ContentOut)
+def complete_video_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    session = _check_upload_session(db.get(UploadSession, upload_id, with_for_update=True), current_user)
+    lesson = _ensure_lesson_editor(db, session.chi_tiet_id, current_user)
+
+    stored = resumable_uploads.finalize(session, os.path.splitext(session.ten_file)[1].lower())
+    db.delete(session)
+
+    lesson.video_path = stored.url
+    _apply_video_metadata(lesson, stored)
+    needs_packaging = schedule_packaging(lesson)
+    db.commit()
+    db.refresh(lesson)
+    if needs_packaging:
+        packager.enqueue(lesson.id)
+    return lesson
@@ -0,0 +1,208 @@
+"""
+GET /courses/{course_id}/overview: mọi thứ trang CourseDetail/LearnPage cần trong một request.
+
+- include=lessons,teacher,ratings,enrollment,progress,assignments,quizzes chọn phần cần trả
+  (mặc định DEFAULT_SECTIONS); phần không được chọn không chạy query nào.
+- Số query cố định theo số phần được chọn, không tăng theo số bài học/bài tập/quiz:
+  khóa học + giáo viên (joinedload), bài học, thống kê đánh giá (bảng course_ratings), đăng ký,
+  tiến độ, bài tập + bài nộp của người dùng, quiz + số câu hỏi + lượt làm của người dùng.
+- Khách (không token) vẫn xem được; enrollment/progress khi đó là trạng thái rỗng.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, undefer_group
+
+from ...db.session import get_async_db
+from ...api.deps import get_optional_user_async
+from ...core import course_ratings
+from ...models.assignment import Assignment, Submission
+from ...models.course import Course
+from ...models.course_rating import CourseRating
+from ...models.course_content import CourseContent
+from ...models.enrollment import Enrollment
+from ...models.progress import Progress
+from ...models.quiz import Quiz, QuizAttempt, QuizQuestion
+from ...models.user import User
+from ...schemas.assignment import AssignmentOut
+from ...schemas.content import ContentOut
+from ...schemas.course import CourseOut
+from ...schemas.enrollment import EnrollmentOut
+
+router = APIRouter()
+
+SECTIONS = ("lessons", "teacher", "ratings", "enrollment", "progress", "assignments", "quizzes")
+DEFAULT_SECTIONS = ("lessons", "teacher", "ratings", "enrollment", "progress")
+
+
+def parse_sections(include: Optional[str]) -> set[str]:
+    if include is None:
+        return set(DEFAULT_SECTIONS)
+    names = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sorted(names - set(SECTIONS))
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Phần không hợp lệ: {', '.join(unknown)}")
+    return names
+
+
+def _teacher(user: Optional[User]) -> Optional[dict]:
+    # Chỉ thông tin liên hệ công khai, không trả số dư ví như /users/{id}
+    if user is None:
+        return None
+    return {"id": user.id, "ho_ten": user.ho_ten, "email": user.email, "so_dien_thoai": user.so_dien_thoai}
+
+
+def _score(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+async def _ratings(db, course_id: int) -> dict:
+    return course_ratings.summary(await db.get(CourseRating, course_id))
+
+
+async def _progress(db, course_id: int, user_id: int, total_lessons: int) -> dict:
+    rows = (await db.execute(
+        select(Progress).where(Progress.user_id == user_id, Progress.course_id == course_id)
+    )).scalars().all()
+    completed = sorted(p.lesson_id for p in rows if p.completed and p.lesson_id)
+    course_record = next((p for p in rows if p.lesson_id is None), None)
+    if course_record is not None:
+        percentage = course_record.progress_percentage
+    else:
+        percentage = round(len(completed) / total_lessons * 100, 2) if total_lessons else 0.0
+    return {
+        "progress_percentage": percentage,
+        "completed_lesson_ids": completed,
+        "completed_lessons": len(completed),
+        "total_lessons": total_lessons,
+    }
+
+
+async def _assignments(db, course_id: int, user: Optional[User]) -> list[dict]:
+    assignments = (await db.execute(
+        select(Assignment).where(Assignment.khoa_hoc_id == course_id).order_by(Assignment.han_nop.nulls_last())
+    )).scalars().all()
+    latest: dict[int, Submission] = {}
+    if user is not None and assignments:
+        submissions = (await db.execute(
+            select(Submission)
+            .where(Submission.user_id == user.id, Submission.bai_tap_id.in_([a.id for a in assignments]))
+            .order_by(Submission.ngay_nop)
+        )).scalars().all()
+        for submission in submissions:
+            latest[submission.bai_tap_id] = submission  # Bài nộp sau ghi đè bài nộp trước
+
+    result = []
+    for a in assignments:
+        item = AssignmentOut.model_validate(a).model_dump(mode="json")
+        submission = latest.get(a.id)
+        item["submission"] = None if submission is None else {
+            "id": submission.id,
+            "trang_thai": submission.trang_thai,
+            "diem": _score(submission.diem),
+            "ngay_nop": submission.ngay_nop.isoformat() if submission.ngay_nop else None,
+        }
+        result.append(item)
+    return result
+
+
+async def _quizzes(db, course_id: int, user: Optional[User]) -> list[dict]:
+    rows = (await db.execute(
+        select(Quiz, func.count(QuizQuestion.id).label("so_cau_hoi"))
+        .join(CourseContent, CourseContent.id == Quiz.lesson_id)
+        .outerjoin(QuizQuestion, QuizQuestion.quiz_id == Quiz.id)
+        .where(CourseContent.khoa_hoc_id == course_id)
+        .group_by(Quiz.id, CourseContent.thu_tu)
+        .order_by(CourseContent.thu_tu, Quiz.id)
+    )).all()
+    attempts = {}
+    if user is not None and rows:
+        attempt_rows = (await db.execute(
+            select(QuizAttempt.quiz_id, func.count(QuizAttempt.id), func.max(QuizAttempt.diem))
+            .where(QuizAttempt.user_id == user.id, QuizAttempt.quiz_id.in_([row.Quiz.id for row in rows]))
+            .group_by(QuizAttempt.quiz_id)
+        )).all()
+        attempts = {quiz_id: (count, best) for quiz_id, count, best in attempt_rows}
+
+    result = []
+    for quiz, so_cau_hoi in rows:
+        count, best = attempts.get(quiz.id, (0, None))
+        result.append({
+            "id": quiz.id,
+            "lesson_id": quiz.lesson_id,
+            "tieu_de": quiz.tieu_de,
+            "thoi_gian_lam_bai": quiz.thoi_gian_lam_bai,
+            "diem_toi_da": _score(quiz.diem_toi_da),
+            "is_required": quiz.is_required,
+            "so_cau_hoi": so_cau_hoi,
+            "so_lan_lam": count,
+            "diem_cao_nhat": _score(best),
+        })
+    return result
+
+
+@router.get("/courses/{course_id}/overview")
+async def get_course_overview(
+    course_id: int,
+    include: Optional[str] = Query(None, description="Các phần cần trả, phân cách bằng dấu phẩy: " + ",".join(SECTIONS)),
+    db=Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_optional_user_async),
+):
+    """Khóa học kèm bài học, giáo viên, đánh giá, đăng ký/tiến độ của người dùng, bài tập, quiz"""
+    sections = parse_sections(include)
+
+    query = select(Course).options(undefer_group("rating")).where(Course.id == course_id)
+    if "teacher" in sections:
+        query = query.options(joinedload(Course.teacher))
+    course = (await db.execute(query)).scalar_one_or_none()
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
+
+    result = {"course": CourseOut.model_validate(course).model_dump(mode="json")}
+    if "teacher" in sections:
+        result["teacher"] = _teacher(course.teacher)
+
+    lessons = None
+    if "lessons" in sections:
+        lessons = (await db.execute(
+            select(CourseContent).where(CourseContent.khoa_hoc_id == course_id).order_by(CourseContent.thu_tu)
+        )).scalars().all()
+        result["lessons"] = [ContentOut.model_validate(lesson).model_dump(mode="json") for lesson in lessons]
+
+    if "ratings" in sections:
+        result["ratings"] = await _ratings(db, course_id)
+
+    if "enrollment" in sections:
+        enrollment = None
+        if current_user is not None:
+            enrollment = (await db.execute(
+                select(Enrollment).where(
+                    Enrollment.user_id == current_user.id,
+                    Enrollment.khoa_hoc_id == course_id,
+                    Enrollment.trang_thai == "active",
+                )
+            )).scalars().first()
+        result["enrollment"] = {
+            "is_enrolled": enrollment is not None,
+            "enrollment": EnrollmentOut.model_validate(enrollment).model_dump(mode="json") if enrollment else None,
+        }
+
+    if "progress" in sections:
+        result["progress"] = None
+        if current_user is not None:
+            if lessons is not None:
+                total_lessons = len(lessons)
+            else:
+                total_lessons = (await db.execute(
+                    select(func.count(CourseContent.id)).where(CourseContent.khoa_hoc_id == course_id)
+                )).scalar_one()
+            result["progress"] = await _progress(db, course_id, current_user.id, total_lessons)
+
+    if "assignments" in sections:
+        result["assignments"] = await _assignments(db, course_id, current_user)
+
+    if "quizzes" in sections:
+        result["quizzes"] = await _quizzes(db, course_id, current_user)
+
+    return result
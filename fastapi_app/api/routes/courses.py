@@ -1,88 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, undefer_group
+from sqlalchemy import func, select
 from typing import List
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
 from ...models.course import Course, CourseStatus, CourseMode
 from ...schemas.course import CourseCreate, CourseOut
+from ...api.catalog import (
+    DEFAULT_FIELDS, MAX_LIMIT, SORTS, count_query, keyset_page, load_fields, page_headers, parse_fields, relevance_key, serialize,
+)
 from ...api.deps import get_current_active_user
 from ...models.user import User
+from ...core.catalog_cache import catalog_cache
+from ...core.course_search import fallback_snippet, safe_highlight, search_condition, search_statement, terms
+from ...core.file_response import etag_matches
+from ...core.images import generate_variants
+from ...core.uploads import COURSE_IMAGE, store_upload
 
 router = APIRouter()
 
 
+def _catalog_body(courses_list: list) -> bytes:
+    # Cùng định dạng với UTF8JSONResponse (main.py)
+    return json.dumps(courses_list, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 @router.get("/courses")
-def list_courses(
+async def list_courses(
+    request: Request,
     q: str | None = Query(None, description="Tìm theo tiêu đề/mô tả"),
     cap_do: str | None = Query(None, description="Lọc cấp độ (Beginner/Intermediate/Advanced)"),
     hinh_thuc: CourseMode | None = Query(None, description="online/offline/hybrid"),
     status: CourseStatus | None = Query(None, description="active/inactive/draft"),
-    sort: str | None = Query("newest", description="newest|price_asc|price_desc"),
-    db: Session = Depends(get_db),
+    sort: str | None = Query(None, description="relevance|newest|price_asc|price_desc (mặc định: relevance khi có q, ngược lại newest)"),
+    fields: str | None = Query(None, description="Chỉ trả các trường này, vd id,tieu_de,gia,hinh_anh"),
+    limit: int | None = Query(None, ge=1, le=MAX_LIMIT, description="Số khóa học mỗi trang (không có = tất cả)"),
+    cursor: str | None = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
+    db=Depends(get_async_db),
 ):
     """
     Lấy danh sách khóa học.
     Luôn trả về array [] (không bao giờ trả về object {}).
+    Phân trang keyset theo kiểu sắp xếp và fields= (api/catalog.py); tổng số ở header X-Total-Count.
+    Kết quả được cache theo bộ lọc (core/catalog_cache.py), hỗ trợ ETag/If-None-Match (304).
     """
-    try:
-        query = db.query(Course)
+    words = terms(q)
+    if sort not in SORTS:
+        sort = "relevance" if words else "newest"
+    selected = parse_fields(fields, DEFAULT_FIELDS)
+
+    async def build() -> tuple[bytes, dict]:
+        query = select(Course).options(load_fields(selected))
 
         if status:
-            query = query.filter(Course.trang_thai == status)
+            query = query.where(Course.trang_thai == status)
         else:
             # Mặc định chỉ trả active
-            query = query.filter(Course.trang_thai == CourseStatus.active)
+            query = query.where(Course.trang_thai == CourseStatus.active)
 
         if cap_do:
-            query = query.filter(Course.cap_do == cap_do)
+            query = query.where(Course.cap_do == cap_do)
 
         if hinh_thuc:
-            query = query.filter(Course.hinh_thuc == hinh_thuc)
+            query = query.where(Course.hinh_thuc == hinh_thuc)
 
-        if q:
-            like_q = f"%{q}%"
-            query = query.filter(or_(Course.tieu_de.ilike(like_q), Course.mo_ta.ilike(like_q)))
+        # Full-text search qua GIN index (core/course_search.py), không phân biệt dấu
+        dialect_name = db.bind.dialect.name
+        condition = search_condition(q, dialect_name)
+        if condition is not None:
+            query = query.where(condition)
 
-        if sort == "price_asc":
-            query = query.order_by(Course.gia.asc())
-        elif sort == "price_desc":
-            query = query.order_by(Course.gia.desc())
-        else:
-            query = query.order_by(Course.created_at.desc())
+        key = SORTS.get(sort)
+        if sort == "relevance":
+            key = relevance_key(q, dialect_name) or SORTS["newest"]
 
-        # query.all() luôn trả về list (có thể rỗng), không bao giờ None
-        result = query.all()
-        
-        # Đảm bảo chắc chắn là list
-        if not isinstance(result, list):
-            result = []
+        # Tổng số chỉ đếm ở trang đầu
+        total = await db.scalar(count_query(query)) if limit and not cursor else None
+        query, page_limit = keyset_page(query, sort, key, cursor, limit)
+        rows, headers = page_headers((await db.execute(query)).all(), sort, page_limit, total)
         
         # Convert sang Pydantic models để serialize đúng
         courses_list = []
-        for course in result:
+        for row in rows:
             try:
-                course_dict = {
-                    "id": course.id,
-                    "tieu_de": course.tieu_de,
-                    "mo_ta": course.mo_ta,
-                    "cap_do": course.cap_do,
-                    "hinh_anh": course.hinh_anh,
-                    "gia": float(course.gia) if course.gia else 0.0,
-                    "gia_goc": float(course.gia_goc) if course.gia_goc else None,
-                    "so_buoi": course.so_buoi or 0,
-                    "thoi_luong": course.thoi_luong,
-                    "hinh_thuc": course.hinh_thuc.value if course.hinh_thuc else "online",
-                    "teacher_id": course.teacher_id,
-                }
-                courses_list.append(course_dict)
+                courses_list.append(serialize(row.Course, selected))
             except Exception as e:
-                print(f"Error serializing course {course.id}: {e}")
+                print(f"Error serializing course {row.Course.id}: {e}")
                 continue
-        
-        # Trả về JSONResponse trực tiếp để đảm bảo là array
-        return JSONResponse(content=courses_list)
+        return _catalog_body(courses_list), headers
+
+    try:
+        if not catalog_cache.enabled:
+            body, headers = await build()
+            return Response(content=body, media_type="application/json", headers=headers)
+        # Trúng cache: không query DB, trả nguyên body đã serialize
+        cache_key = (" ".join(words), cap_do, hinh_thuc, status, sort, selected, limit, cursor)
+        entry = await catalog_cache.get_or_build(cache_key, build)
+    except HTTPException:
+        raise  # Cursor không hợp lệ
     except Exception as e:
         # Nếu có bất kỳ lỗi nào, trả về list rỗng
         print(f"Error fetching courses: {e}")
@@ -90,10 +109,60 @@ def list_courses(
         traceback.print_exc()
         return JSONResponse(content=[])
 
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/courses/search")
+async def search_courses(
+    q: str = Query(..., min_length=1, max_length=200, description="Từ khóa (có dấu hoặc không dấu)"),
+    cap_do: str | None = Query(None),
+    hinh_thuc: CourseMode | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db=Depends(get_async_db),
+):
+    """
+    Tìm khóa học đang active theo độ liên quan (tiêu đề nặng hơn mô tả).
+    Mỗi kết quả kèm tieu_de_highlight và snippet: HTML đã escape, từ khớp bọc trong <mark>.
+    """
+    filters = [Course.trang_thai == CourseStatus.active]
+    if cap_do:
+        filters.append(Course.cap_do == cap_do)
+    if hinh_thuc:
+        filters.append(Course.hinh_thuc == hinh_thuc)
+
+    dialect_name = db.bind.dialect.name
+    statement = search_statement(q, dialect_name, filters, limit, offset)
+    rows = (await db.execute(statement.options(undefer_group("rating")))).all() if statement is not None else []
+
+    items = []
+    for row in rows:
+        item = serialize(row.Course, DEFAULT_FIELDS)
+        item["rank"] = float(row.rank or 0)
+        if "snippet" in row._fields:
+            item["tieu_de_highlight"] = safe_highlight(row.tieu_de_highlight)
+            item["snippet"] = safe_highlight(row.snippet)
+        else:
+            item["tieu_de_highlight"] = safe_highlight(row.Course.tieu_de)
+            item["snippet"] = fallback_snippet(row.Course.mo_ta)
+        items.append(item)
+
+    if rows:
+        total = rows[0].total
+    elif offset and statement is not None:
+        # Trang vượt quá cuối: đếm lại để client biết tổng
+        total = await db.scalar(select(func.count()).select_from(Course).where(search_condition(q, dialect_name), *filters))
+    else:
+        total = 0
+    return {"items": items, "total": total, "limit": limit, "offset": offset}
+
 
 @router.get("/courses/{course_id}", response_model=CourseOut)
 def get_course(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = db.query(Course).options(undefer_group("rating")).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
     return course
@@ -135,6 +204,22 @@ def create_course(
     return course
 
 
+@router.post("/course-images")
+async def upload_course_image(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Upload ảnh khóa học - giáo viên hoặc admin; trả URL để gán vào hinh_anh"""
+    from ...models.user import UserRole
+
+    if current_user.role not in (UserRole.teacher, UserRole.admin):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Chỉ giáo viên hoặc admin mới có quyền")
+    # Ảnh được làm sạch metadata khi lưu, bản thu nhỏ tạo sẵn cho srcset (core/images.py)
+    stored = await run_in_threadpool(store_upload, file, COURSE_IMAGE)
+    await run_in_threadpool(generate_variants, stored.key)
+    return {"url": stored.url}
+
+
 @router.put("/admin/courses/{course_id}/approve", response_model=CourseOut)
 def approve_course(
     course_id: int,
@@ -215,26 +300,33 @@ def update_course(
     return course
 
 
-@router.get("/admin/courses/pending", response_model=list[CourseOut])
+@router.get("/admin/courses/pending")
 def list_pending_courses(
+    response: Response,
+    fields: str | None = Query(None, description="Chỉ trả các trường này, vd id,tieu_de,created_at"),
+    limit: int | None = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: str | None = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Danh sách khóa học chờ duyệt - chỉ admin"""
+    """Danh sách khóa học chờ duyệt (mới nhất trước) - chỉ admin; phân trang/fields= như /courses"""
     from ...models.user import UserRole
     
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Chỉ admin mới có quyền")
     
+    selected = parse_fields(fields, DEFAULT_FIELDS)
     try:
-        courses = db.query(Course).filter(Course.trang_thai == CourseStatus.draft).order_by(Course.created_at.desc()).all()
-        # Đảm bảo chắc chắn là list
-        if not isinstance(courses, list):
-            return []
-        return courses
+        query = select(Course).options(load_fields(selected)).where(Course.trang_thai == CourseStatus.draft)
+        total = db.scalar(count_query(query)) if limit and not cursor else None
+        query, page_limit = keyset_page(query, "newest", SORTS["newest"], cursor, limit)
+        rows, headers = page_headers(db.execute(query).all(), "newest", page_limit, total)
+        response.headers.update(headers)
+        return [serialize(row.Course, selected) for row in rows]
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching pending courses: {e}")
         import traceback
         traceback.print_exc()
         return []
-
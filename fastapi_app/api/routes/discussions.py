@@ -1,21 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
-import os
-import uuid
 
 from ...db.session import get_db
 from ...models.discussion import Discussion
 from ...models.course import Course
 from ...schemas.discussion import DiscussionCreate, DiscussionOut
 from ...api.deps import get_current_active_user
+from ...api.pagination import keyset_paginate, keyset_rows
+from ...core.images import generate_variants
+from ...core.uploads import DISCUSSION_IMAGE, store_upload
 from ...models.user import User, UserRole
 
 router = APIRouter()
 MAX_CONTENT_LEN = 2000
-DISCUSSION_IMAGES_DIR = "static/uploads/discussions"
-os.makedirs(DISCUSSION_IMAGES_DIR, exist_ok=True)
-MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5 MB
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"]
 
 
@@ -29,23 +28,22 @@ def _ensure_course(db: Session, course_id: int) -> Course:
 @router.get("/courses/{course_id}/discussions", response_model=list[DiscussionOut])
 def list_discussions(
     course_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    before: Optional[str] = Query(None, description="Cursor: lấy thảo luận cũ hơn"),
+    after: Optional[str] = Query(None, description="Cursor: lấy thảo luận mới hơn"),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
 ):
     _ensure_course(db, course_id)
     # Lấy chỉ các thảo luận gốc (không có parent_id)
-    discussions = (
-        db.query(Discussion)
-        .filter(
+    query, reversed_order = keyset_paginate(
+        db.query(Discussion).filter(
             Discussion.khoa_hoc_id == course_id,
             Discussion.parent_id.is_(None)  # Chỉ lấy thảo luận gốc
-        )
-        .order_by(Discussion.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        ),
+        Discussion.created_at, Discussion.id, before, after, limit
     )
+    discussions = keyset_rows(query.all(), reversed_order, limit, response, before, after)
     
     # Thêm thông tin user và replies cho mỗi discussion
     result = []
@@ -119,27 +117,13 @@ async def create_discussion(
                 detail=f"Loại file không được hỗ trợ. Chỉ chấp nhận: {', '.join(ALLOWED_IMAGE_TYPES)}"
             )
         
-        # Đọc file
-        contents = await hinh_anh.read()
-        
-        # Kiểm tra kích thước
-        if len(contents) > MAX_IMAGE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Hình ảnh quá lớn. Kích thước tối đa: {MAX_IMAGE_SIZE / 1024 / 1024}MB"
-            )
-        
-        # Tạo tên file unique
-        file_ext = os.path.splitext(hinh_anh.filename)[1] or '.jpg'
-        unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        file_path_save = os.path.join(DISCUSSION_IMAGES_DIR, unique_filename)
-        
-        # Lưu file
-        with open(file_path_save, "wb") as f:
-            f.write(contents)
-        
+        # Lưu file ngoài event loop, vượt giới hạn thì 413; ảnh trùng nội dung chỉ lưu một bản
+        stored = await run_in_threadpool(store_upload, hinh_anh, DISCUSSION_IMAGE)
+        # Tạo sẵn bản thu nhỏ cho srcset (core/images.py)
+        await run_in_threadpool(generate_variants, stored.key)
+
         # Đường dẫn để trả về cho client
-        image_path = f"/static/uploads/discussions/{unique_filename}"
+        image_path = stored.url
 
     # Nếu là reply, kiểm tra parent discussion tồn tại
     if parent_id:
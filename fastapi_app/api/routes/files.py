@@ -0,0 +1,63 @@
+from typing import Optional
+
+from fastapi import APIRouter, Request, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from ...core import images
+from ...core.blob_store import BLOB_NAME
+from ...core.file_response import RangeFileResponse
+from ...core.storage import normalize_key, storage
+
+router = APIRouter()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _cache_control(key: str) -> str:
+    # Blob đặt tên theo sha256 nội dung (core/blob_store.py) không bao giờ đổi
+    return IMMUTABLE if BLOB_NAME.fullmatch(key.split("/", 2)[-1]) else "public, max-age=3600"
+
+
+async def _file_response(file_path: str, request: Request, w: Optional[int], fmt: Optional[str]) -> Response:
+    key = normalize_key(f"uploads/{file_path}")
+    try:
+        if key is None:
+            raise FileNotFoundError(file_path)
+        if w and images.is_image(key):
+            # Ảnh thu nhỏ (core/images.py): WebP nếu trình duyệt nhận, không thì JPEG
+            variant_format = images.negotiate_format(request.headers.get("accept"), fmt)
+            path = await run_in_threadpool(images.variant_path, key, w, variant_format)
+            if path:
+                return RangeFileResponse(
+                    path,
+                    request.headers,
+                    method=request.method,
+                    media_type=images.FORMATS[variant_format],
+                    headers={"Cache-Control": _cache_control(key), "Vary": "Accept"},
+                )
+        return storage.serve(key, request.headers, method=request.method, headers={"Cache-Control": _cache_control(key)})
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File không tồn tại")
+
+
+@router.get("/static/uploads/{file_path:path}", include_in_schema=False)
+async def get_upload(
+    file_path: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Độ rộng ảnh thu nhỏ (srcset)"),
+    fmt: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+):
+    """File upload (PDF, file bài tập/bài nộp, hình ảnh, video) qua storage:
+    local gửi file với Range/ETag, S3 redirect tới presigned URL. Ảnh có ?w= trả bản thu nhỏ"""
+    return await _file_response(file_path, request, w, fmt)
+
+
+@router.head("/static/uploads/{file_path:path}", include_in_schema=False)
+async def head_upload(
+    file_path: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096),
+    fmt: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+):
+    return await _file_response(file_path, request, w, fmt)
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import or_, and_, func, select, update, case
 from typing import List, Optional
-from datetime import datetime
 
-from ...db.session import get_db
+from ...db.session import get_async_db
 from ...models.message import Message
 from ...models.user import User, UserRole
 from ...schemas.message import MessageCreate, MessageOut, ConversationOut
-from ...api.deps import get_current_active_user
+from ...api.deps import get_current_active_user_async
+from ...api.pagination import keyset_paginate, keyset_rows
+from ...core import unread_counters
 
 router = APIRouter()
 
@@ -30,81 +30,88 @@ def _can_message(current_user: User, target_user: User) -> bool:
     return False
 
 
+def conversation_summaries_query(user_id: int):
+    """
+    Một query duy nhất: mỗi người đã nhắn tin với user_id kèm tin nhắn cuối và số tin chưa đọc.
+    Dùng window function trên messages (index sender/receiver/created_at) rồi join users.
+    """
+    partner_id = case(
+        (Message.sender_id == user_id, Message.receiver_id),
+        else_=Message.sender_id,
+    ).label("partner_id")
+    partition = case(
+        (Message.sender_id == user_id, Message.receiver_id),
+        else_=Message.sender_id,
+    )
+    ranked = (
+        select(
+            partner_id,
+            Message.noi_dung,
+            Message.created_at,
+            func.row_number().over(
+                partition_by=partition,
+                order_by=(Message.created_at.desc(), Message.id.desc()),
+            ).label("rn"),
+            func.sum(
+                case(
+                    (and_(Message.receiver_id == user_id, Message.da_doc == False), 1),
+                    else_=0,
+                )
+            ).over(partition_by=partition).label("unread_count"),
+        )
+        .where(or_(Message.sender_id == user_id, Message.receiver_id == user_id))
+        .subquery()
+    )
+    return (
+        select(User, ranked.c.noi_dung, ranked.c.created_at, ranked.c.unread_count)
+        .join(ranked, ranked.c.partner_id == User.id)
+        .where(ranked.c.rn == 1)
+        .order_by(ranked.c.created_at.desc())
+    )
+
+
 @router.get("/messages/conversations", response_model=List[ConversationOut])
-def get_conversations(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def get_conversations(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Lấy danh sách các cuộc trò chuyện của user hiện tại"""
-    # Lấy tất cả tin nhắn liên quan đến current_user
-    all_messages = db.query(Message).filter(
-        or_(
-            Message.sender_id == current_user.id,
-            Message.receiver_id == current_user.id
-        )
-    ).all()
-    
-    # Tạo set các user_id đã từng nhắn tin
-    other_user_ids = set()
-    for msg in all_messages:
-        if msg.sender_id == current_user.id:
-            other_user_ids.add(msg.receiver_id)
-        else:
-            other_user_ids.add(msg.sender_id)
+    rows = (await db.execute(conversation_summaries_query(current_user.id))).all()
     
-    # Lấy thông tin user và tin nhắn cuối cùng
     conversations = []
-    for other_user_id in other_user_ids:
-        # Lấy thông tin user
-        other_user = db.query(User).filter(User.id == other_user_id).first()
-        if not other_user:
-            continue
-        
+    for other_user, last_message, last_message_time, unread_count in rows:
         # Kiểm tra quyền nhắn tin
         if not _can_message(current_user, other_user) and not _can_message(other_user, current_user):
             continue
         
-        # Lấy tin nhắn cuối cùng
-        last_message = db.query(Message).filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
-                and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
-            )
-        ).order_by(Message.created_at.desc()).first()
-        
-        # Đếm số tin nhắn chưa đọc
-        unread_count = db.query(func.count(Message.id)).filter(
-            Message.sender_id == other_user_id,
-            Message.receiver_id == current_user.id,
-            Message.da_doc == False
-        ).scalar() or 0
-        
         conversations.append(ConversationOut(
             user_id=other_user.id,
             user_name=other_user.ho_ten or "Unknown",
             user_email=other_user.email,
             user_role=other_user.role.value if other_user.role else None,
-            last_message=last_message.noi_dung if last_message else None,
-            last_message_time=last_message.created_at if last_message else None,
-            unread_count=unread_count
+            last_message=last_message,
+            last_message_time=last_message_time,
+            unread_count=unread_count or 0
         ))
     
-    # Sắp xếp theo thời gian tin nhắn cuối cùng
-    conversations.sort(key=lambda x: x.last_message_time or datetime.min, reverse=True)
-    
     return conversations
 
 
 @router.get("/messages/conversations/{other_user_id}", response_model=List[MessageOut])
-def get_messages(
+async def get_messages(
     other_user_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    before: Optional[str] = Query(None, description="Cursor: lấy tin nhắn cũ hơn"),
+    after: Optional[str] = Query(None, description="Cursor: lấy tin nhắn mới hơn"),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
-    """Lấy danh sách tin nhắn giữa current_user và other_user"""
-    other_user = db.query(User).filter(User.id == other_user_id).first()
+    """
+    Lấy tin nhắn giữa current_user và other_user.
+    Mặc định trả về trang mới nhất; kết quả sắp xếp cũ -> mới để hiển thị khung chat.
+    """
+    other_user = await db.get(User, other_user_id)
     if not other_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Người dùng không tồn tại")
     
@@ -115,27 +122,39 @@ def get_messages(
             detail="Bạn không có quyền nhắn tin với người dùng này"
         )
     
-    # Lấy tin nhắn
-    messages = db.query(Message).filter(
-        or_(
-            and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
-            and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
-        )
-    ).order_by(Message.created_at.asc()).offset(skip).limit(limit).all()
+    # Lấy tin nhắn (keyset trên created_at, id)
+    query, reversed_order = keyset_paginate(
+        select(Message).where(
+            or_(
+                and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
+                and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
+            )
+        ),
+        Message.created_at, Message.id, before, after, limit
+    )
+    messages = keyset_rows((await db.execute(query)).scalars().all(), reversed_order, limit, response, before, after)
+    messages.reverse()
     
     # Đánh dấu tin nhắn đã đọc
-    db.query(Message).filter(
-        Message.sender_id == other_user_id,
-        Message.receiver_id == current_user.id,
-        Message.da_doc == False
-    ).update({"da_doc": True})
-    db.commit()
+    marked = await db.execute(
+        update(Message)
+        .where(
+            Message.sender_id == other_user_id,
+            Message.receiver_id == current_user.id,
+            Message.da_doc == False
+        )
+        .values(da_doc=True)
+    )
+    if marked.rowcount:
+        await db.execute(unread_counters.decrement_stmt(current_user.id, "messages", marked.rowcount))
+    await db.commit()
     
-    # Thêm thông tin user vào response
+    # Thêm thông tin user vào response (chỉ có 2 người trong cuộc trò chuyện)
+    users = {current_user.id: current_user, other_user.id: other_user}
     result = []
     for msg in messages:
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        receiver = db.query(User).filter(User.id == msg.receiver_id).first()
+        sender = users.get(msg.sender_id)
+        receiver = users.get(msg.receiver_id)
         
         result.append(MessageOut(
             id=msg.id,
@@ -154,13 +173,13 @@ def get_messages(
 
 
 @router.post("/messages", response_model=MessageOut, status_code=status.HTTP_201_CREATED)
-def send_message(
+async def send_message(
     payload: MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Gửi tin nhắn"""
-    receiver = db.query(User).filter(User.id == payload.receiver_id).first()
+    receiver = await db.get(User, payload.receiver_id)
     if not receiver:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Người nhận không tồn tại")
     
@@ -182,8 +201,8 @@ def send_message(
     )
     
     db.add(message)
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    await db.refresh(message)
     
     # Trả về với thông tin user
     return MessageOut(
@@ -201,45 +220,43 @@ def send_message(
 
 
 @router.get("/messages/unread-count", response_model=dict)
-def get_unread_count(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def get_unread_count(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
-    """Lấy số tin nhắn chưa đọc"""
-    count = db.query(func.count(Message.id)).filter(
-        Message.receiver_id == current_user.id,
-        Message.da_doc == False
-    ).scalar() or 0
-    
+    """Lấy số tin nhắn chưa đọc (đọc từ bộ đếm, không COUNT lại)"""
+    count = await unread_counters.get_unread_count(db, current_user.id, "messages")
     return {"unread_count": count}
 
 
 @router.get("/messages/available-users", response_model=List[ConversationOut])
-def get_available_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def get_available_users(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Lấy danh sách user có thể nhắn tin (chưa có conversation)"""
-    # Lấy tất cả user đã từng nhắn tin
-    existing_conversations = db.query(Message).filter(
-        or_(
-            Message.sender_id == current_user.id,
-            Message.receiver_id == current_user.id
-        )
-    ).all()
+    # Lấy id các user đã từng nhắn tin (chỉ lấy 2 cột, không load toàn bộ tin nhắn)
+    existing_pairs = (await db.execute(
+        select(Message.sender_id, Message.receiver_id).where(
+            or_(
+                Message.sender_id == current_user.id,
+                Message.receiver_id == current_user.id
+            )
+        ).distinct()
+    )).all()
     
     existing_user_ids = {current_user.id}
-    for msg in existing_conversations:
-        if msg.sender_id == current_user.id:
-            existing_user_ids.add(msg.receiver_id)
-        else:
-            existing_user_ids.add(msg.sender_id)
+    for sender_id, receiver_id in existing_pairs:
+        existing_user_ids.add(sender_id)
+        existing_user_ids.add(receiver_id)
     
     # Lấy tất cả user có thể nhắn tin
-    all_users = db.query(User).filter(
-        User.id != current_user.id,
-        User.is_active == True
-    ).all()
+    all_users = (await db.execute(
+        select(User).where(
+            User.id != current_user.id,
+            User.is_active == True
+        )
+    )).scalars().all()
     
     available_users = []
     for user in all_users:
@@ -261,12 +278,3 @@ def get_available_users(
         ))
     
     return available_users
-
-
-
-
-
-
-
-
-
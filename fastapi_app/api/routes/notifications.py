@@ -1,75 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from typing import Optional
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
 from ...models.notification import Notification
 from ...models.user import User
 from ...schemas.notification import NotificationOut, NotificationCreate
-from ...api.deps import get_current_active_user
+from ...api.deps import get_current_active_user, get_current_active_user_async
+from ...api.pagination import keyset_paginate, keyset_rows
+from ...core import unread_counters
 
 router = APIRouter()
 
 
 @router.get("/notifications", response_model=list[NotificationOut])
-def list_notifications(
+async def list_notifications(
+    response: Response,
     unread_only: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    before: Optional[str] = Query(None, description="Cursor: lấy thông báo cũ hơn"),
+    after: Optional[str] = Query(None, description="Cursor: lấy thông báo mới hơn"),
+    limit: int = Query(50, ge=1, le=100),
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
-    """Lấy danh sách thông báo của user hiện tại"""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    """Lấy danh sách thông báo của user hiện tại (mới nhất trước, phân trang bằng cursor)"""
+    query = select(Notification).where(Notification.user_id == current_user.id)
     
     if unread_only:
-        query = query.filter(Notification.da_doc == False)
+        query = query.where(Notification.da_doc == False)
     
-    notifications = query.order_by(Notification.created_at.desc()).limit(50).all()
-    return notifications
+    query, reversed_order = keyset_paginate(query, Notification.created_at, Notification.id, before, after, limit)
+    result = await db.execute(query)
+    return keyset_rows(result.scalars().all(), reversed_order, limit, response, before, after)
 
 
 @router.get("/notifications/unread-count")
-def get_unread_count(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def get_unread_count(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
-    """Đếm số thông báo chưa đọc"""
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.da_doc == False
-    ).count()
+    """Đếm số thông báo chưa đọc (đọc từ bộ đếm, không COUNT lại)"""
+    count = await unread_counters.get_unread_count(db, current_user.id, "notifications")
     return {"count": count}
 
 
 @router.put("/notifications/{notification_id}/read")
-def mark_as_read(
+async def mark_as_read(
     notification_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Đánh dấu thông báo đã đọc"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user.id
-    ).first()
+    notification = await db.scalar(
+        select(Notification).where(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id
+        )
+    )
     
     if not notification:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thông báo không tồn tại")
     
-    notification.da_doc = True
-    db.commit()
+    if not notification.da_doc:
+        notification.da_doc = True
+        await db.execute(unread_counters.decrement_stmt(current_user.id, "notifications"))
+    await db.commit()
     return {"message": "Đã đánh dấu đã đọc"}
 
 
 @router.put("/notifications/read-all")
-def mark_all_as_read(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def mark_all_as_read(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """Đánh dấu tất cả thông báo đã đọc"""
-    db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.da_doc == False
-    ).update({"da_doc": True})
-    db.commit()
+    await db.execute(
+        update(Notification)
+        .where(Notification.user_id == current_user.id, Notification.da_doc == False)
+        .values(da_doc=True)
+    )
+    await db.execute(unread_counters.reset_stmt(current_user.id, "notifications"))
+    await db.commit()
     return {"message": "Đã đánh dấu tất cả đã đọc"}
 
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 import uuid
@@ -10,6 +10,7 @@ from ...models.course import Course
 from ...models.enrollment import Enrollment
 from ...schemas.payment import PaymentCreate, PaymentOut, PaymentCallback, PaymentLinkResponse
 from ...api.deps import get_current_active_user
+from ...api.pagination import keyset_paginate, keyset_rows
 from ...models.user import User
 from decimal import Decimal
 
@@ -145,14 +146,19 @@ def payment_callback(
 
 @router.get("/me", response_model=list[PaymentOut])
 def get_my_payments(
+    response: Response,
+    before: Optional[str] = Query(None, description="Cursor: lấy thanh toán cũ hơn"),
+    after: Optional[str] = Query(None, description="Cursor: lấy thanh toán mới hơn"),
+    limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Lấy danh sách thanh toán của user hiện tại"""
-    payments = db.query(Payment).filter(
-        Payment.user_id == current_user.id
-    ).order_by(Payment.created_at.desc()).all()
-    return payments
+    """Lấy danh sách thanh toán của user hiện tại (mới nhất trước, phân trang bằng cursor)"""
+    query, reversed_order = keyset_paginate(
+        db.query(Payment).filter(Payment.user_id == current_user.id),
+        Payment.created_at, Payment.id, before, after, limit
+    )
+    return keyset_rows(query.all(), reversed_order, limit, response, before, after)
 
 
 @router.post("/buy-with-wallet", response_model=PaymentOut)
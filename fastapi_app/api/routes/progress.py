@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from ...db.session import get_db
-from ...models.progress import Progress
+from ...models.progress import Progress, WatchProgress
 from ...models.course_content import CourseContent
-from ...schemas.progress import ProgressCreate, ProgressOut
-from ...api.deps import get_current_active_user
+from ...schemas.progress import ProgressCreate, ProgressOut, WatchHeartbeat, WatchProgressOut
+from ...api.deps import get_current_active_user, get_current_active_user_async
 from ...models.user import User
+from ...core import progress_summary, watch_time
+from ...core.config import settings
+from ...core.watch_time import watch_buffer
 
 router = APIRouter()
 
@@ -28,7 +32,8 @@ def _validate_lesson(db: Session, course_id: int, lesson_id: Optional[int]) -> N
 
 
 def _recalc_percentage(db: Session, user_id: int, course_id: int, delta_completed: int = 0) -> float:
-    total_lessons = db.query(CourseContent).filter(CourseContent.khoa_hoc_id == course_id).count()
+    """Phần trăm hoàn thành từ progress_summary (lookup theo khóa chính), cộng thêm thay đổi sắp ghi"""
+    completed_lessons, total_lessons = progress_summary.get_counts(db, user_id, course_id)
     if total_lessons == 0:
         # Tránh chia 0, báo lỗi rõ ràng để course phải có lesson
         raise HTTPException(
@@ -36,14 +41,8 @@ def _recalc_percentage(db: Session, user_id: int, course_id: int, delta_complete
             detail="Khóa học chưa có bài học, không thể tính tiến độ",
         )
 
-    completed_lessons = db.query(Progress).filter(
-        Progress.user_id == user_id,
-        Progress.course_id == course_id,
-        Progress.completed.is_(True),
-    ).count()
-
-    completed_lessons = max(0, completed_lessons + delta_completed)
-    return round((completed_lessons / total_lessons) * 100, 2)
+    completed_lessons = min(total_lessons, max(0, completed_lessons + delta_completed))
+    return progress_summary.percentage(completed_lessons, total_lessons)
 
 
 @router.post("/courses/{course_id}/progress", response_model=ProgressOut, status_code=status.HTTP_201_CREATED)
@@ -62,9 +61,17 @@ def update_progress(
         Progress.lesson_id == lesson_id,
     ).first()
 
+    # Đọc tóm tắt trước khi sửa dòng (autoflush sẽ chạy hook cập nhật progress_summary)
+    previous = progress.completed if progress else False
+    delta = 0
+    if lesson_id is not None:
+        if completed and not previous:
+            delta = 1
+        elif not completed and previous:
+            delta = -1
+    percentage = _recalc_percentage(db, current_user.id, course_id, delta_completed=delta)
+
     if not progress:
-        delta = 1 if completed else 0
-        percentage = _recalc_percentage(db, current_user.id, course_id, delta_completed=delta)
         progress = Progress(
             user_id=current_user.id,
             course_id=course_id,
@@ -74,21 +81,8 @@ def update_progress(
         )
         db.add(progress)
     else:
-        previous = progress.completed
         progress.completed = completed
-
-        delta = 0
-        if completed and not previous:
-            delta = 1
-        elif not completed and previous:
-            delta = -1
-
-        progress.progress_percentage = _recalc_percentage(
-            db,
-            current_user.id,
-            course_id,
-            delta_completed=delta,
-        )
+        progress.progress_percentage = percentage
 
     db.commit()
     db.refresh(progress)
@@ -141,3 +135,52 @@ def get_all_progress(
     """Lấy tất cả progress của user"""
     progress_list = db.query(Progress).filter(Progress.user_id == current_user.id).all()
     return progress_list
+
+
+@router.post("/lessons/{lesson_id}/watch", status_code=status.HTTP_202_ACCEPTED)
+async def record_watch_time(
+    lesson_id: int,
+    heartbeat: WatchHeartbeat,
+    current_user: User = Depends(get_current_active_user_async),
+):
+    """Heartbeat thời gian xem: chỉ gộp vào bộ đệm, ghi DB theo lô (core/watch_time.py)"""
+    watch_buffer.add(current_user.id, lesson_id, heartbeat.intervals, heartbeat.position, heartbeat.duration)
+    if not heartbeat.final:
+        return {"buffered": True}
+    written = await run_in_threadpool(watch_buffer.flush, [(current_user.id, lesson_id)])
+    state = written.get((current_user.id, lesson_id))
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài học không tồn tại")
+    return {"buffered": False, **state}
+
+
+@router.get("/lessons/{lesson_id}/watch", response_model=WatchProgressOut)
+def get_watch_progress(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Vị trí xem tiếp và tỉ lệ đã xem (gồm cả heartbeat chưa ghi)"""
+    lesson = db.get(CourseContent, lesson_id)
+    if not lesson:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bài học không tồn tại")
+    row = db.get(WatchProgress, (current_user.id, lesson_id))
+    pending = watch_buffer.pending(current_user.id, lesson_id)
+
+    intervals = list(row.watched_intervals) if row else []
+    position = row.last_position if row else 0.0
+    duration = lesson.video_duration or None
+    if pending is not None:
+        intervals += pending.intervals
+        position = pending.position
+        duration = duration or pending.duration
+    seconds = watch_time.watched_seconds(watch_time.clip_intervals(watch_time.merge_intervals(intervals), duration))
+    fraction = watch_time.watched_fraction(seconds, duration)
+    return {
+        "lesson_id": lesson_id,
+        "last_position": position,
+        "watched_seconds": seconds,
+        "duration": duration,
+        "watched_fraction": fraction,
+        "completed": fraction >= settings.watch_complete_fraction,
+    }
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+
+from ...api.deps import bearer_or_query_token, get_user_from_token_async
+from ...core.realtime import hub
+
+router = APIRouter()
+
+# Gửi ping định kỳ để proxy (Render, nginx) không cắt kết nối rảnh
+KEEPALIVE_SECONDS = 25
+
+
+@router.websocket("/ws")
+async def realtime_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Kênh WebSocket nhận sự kiện message/notification của user hiện tại"""
+    user = await get_user_from_token_async(bearer_or_query_token(websocket.headers, token))
+    if not user:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = hub.subscribe(user.id)
+
+    async def pump_events():
+        while True:
+            try:
+                event_data = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                event_data = {"type": "ping"}
+            await websocket.send_json(event_data)
+
+    async def drain_client():
+        # Client không cần gửi gì; đọc để phát hiện ngắt kết nối
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(pump_events()), asyncio.create_task(drain_client())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # WebSocketDisconnect là kết thúc bình thường
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                print(f"Realtime websocket error: {exc}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(user.id, queue)
+
+
+@router.get("/events/stream")
+async def realtime_sse(request: Request, token: Optional[str] = Query(None)):
+    """Server-Sent Events: fallback khi không dùng được WebSocket (EventSource)"""
+    user = await get_user_from_token_async(bearer_or_query_token(request.headers, token))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    queue = hub.subscribe(user.id)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event_data = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                data = json.dumps(event_data.get("data", {}), ensure_ascii=False)
+                yield f"event: {event_data['type']}\ndata: {data}\n\n"
+        finally:
+            hub.unsubscribe(user.id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -5,9 +5,11 @@ from sqlalchemy import func
 from ...db.session import get_db
 from ...models.review import Review
 from ...models.course import Course
+from ...models.course_rating import CourseRating
 from ...models.user import User
 from ...schemas.review import ReviewCreate, ReviewOut, ReviewWithUser
 from ...api.deps import get_current_active_user
+from ...core import course_ratings
 from ...models.user import User
 
 router = APIRouter()
@@ -90,27 +92,10 @@ def create_review(
 
 @router.get("/courses/{course_id}/reviews/stats")
 def get_review_stats(course_id: int, db: Session = Depends(get_db)):
-    """Lấy thống kê đánh giá của khóa học"""
+    """Lấy thống kê đánh giá của khóa học (bảng course_ratings, không đọc từng đánh giá)"""
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Khóa học không tồn tại")
     
-    reviews = db.query(Review).filter(Review.khoa_hoc_id == course_id).all()
-    
-    if not reviews:
-        return {
-            "total_reviews": 0,
-            "average_rating": 0,
-            "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        }
-    
-    total = len(reviews)
-    average = sum(r.diem for r in reviews) / total
-    distribution = {i: sum(1 for r in reviews if r.diem == i) for i in range(1, 6)}
-    
-    return {
-        "total_reviews": total,
-        "average_rating": round(average, 1),
-        "rating_distribution": distribution
-    }
+    return course_ratings.summary(db.get(CourseRating, course_id))
 
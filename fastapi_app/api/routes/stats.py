@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, select
 from typing import Dict
 
 from ...db.session import get_db
@@ -8,10 +8,15 @@ from ...models.user import User
 from ...models.course import Course
 from ...models.enrollment import Enrollment
 from ...models.assignment import Assignment, Submission
+from ...api.catalog import (
+    DEFAULT_FIELDS, MAX_LIMIT, SORTS, count_query, keyset_page, load_fields, page_headers, parse_fields, serialize,
+)
 from ...api.deps import get_current_active_user
 
 router = APIRouter()
 
+TEACHER_COURSE_FIELDS = (*DEFAULT_FIELDS, "trang_thai", "created_at", "student_count")
+
 
 @router.get("/teachers/me/stats")
 def get_teacher_stats(
@@ -91,10 +96,14 @@ def get_admin_stats(
 
 @router.get("/teachers/me/courses/with-stats")
 def get_teacher_courses_with_stats(
+    response: Response,
+    fields: str | None = Query(None, description="Chỉ trả các trường này, vd id,tieu_de,student_count"),
+    limit: int | None = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: str | None = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Lấy danh sách khóa học của giáo viên kèm số học viên"""
+    """Lấy danh sách khóa học của giáo viên kèm số học viên (mới nhất trước); phân trang/fields= như /courses"""
     from ...models.user import UserRole
     if current_user.role not in [UserRole.teacher, UserRole.admin]:
         raise HTTPException(
@@ -102,34 +111,27 @@ def get_teacher_courses_with_stats(
             detail="Chỉ giáo viên mới có quyền"
         )
     
-    courses = db.query(Course).filter(
-        Course.teacher_id == current_user.id
-    ).all()
-    
+    selected = parse_fields(fields, TEACHER_COURSE_FIELDS, extra=("student_count",))
+    query = select(Course).options(load_fields(selected)).where(Course.teacher_id == current_user.id)
+    total = db.scalar(count_query(query)) if limit and not cursor else None
+    if "student_count" in selected:
+        # Đếm số học viên đã đăng ký bằng subquery tương quan, chỉ cho các khóa học của trang
+        student_count = (
+            select(func.count(distinct(Enrollment.user_id)))
+            .where(Enrollment.khoa_hoc_id == Course.id, Enrollment.trang_thai == "active")
+            .scalar_subquery()
+        )
+        query = query.add_columns(student_count.label("student_count"))
+    query, page_limit = keyset_page(query, "newest", SORTS["newest"], cursor, limit)
+    rows, headers = page_headers(db.execute(query).all(), "newest", page_limit, total)
+    response.headers.update(headers)
+
     result = []
-    for course in courses:
-        # Đếm số học viên đã đăng ký khóa này
-        student_count = db.query(func.count(distinct(Enrollment.user_id))).filter(
-            Enrollment.khoa_hoc_id == course.id,
-            Enrollment.trang_thai == "active"
-        ).scalar() or 0
-        
-        result.append({
-            "id": course.id,
-            "tieu_de": course.tieu_de,
-            "mo_ta": course.mo_ta,
-            "cap_do": course.cap_do,
-            "hinh_anh": course.hinh_anh,
-            "gia": float(course.gia) if course.gia else 0,
-            "gia_goc": float(course.gia_goc) if course.gia_goc else None,
-            "so_buoi": course.so_buoi,
-            "thoi_luong": course.thoi_luong,
-            "hinh_thuc": course.hinh_thuc.value if course.hinh_thuc else "online",
-            "trang_thai": course.trang_thai.value if course.trang_thai else "active",
-            "teacher_id": course.teacher_id,
-            "created_at": course.created_at,
-            "student_count": student_count
-        })
+    for row in rows:
+        item = serialize(row.Course, selected)
+        if "student_count" in selected:
+            item["student_count"] = row.student_count or 0
+        result.append(item)
     
     return result
 
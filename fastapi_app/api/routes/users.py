@@ -85,39 +85,30 @@ def get_learning_history(
 ):
     """Lấy lịch sử học tập"""
     from ...models.enrollment import Enrollment
-    from ...models.progress import Progress
     from ...models.course import Course
+    from ...core import progress_summary
     
-    # Lấy các khóa học đã đăng ký
-    enrollments = db.query(Enrollment).filter(
+    # Lấy các khóa học đã đăng ký (kèm tên khóa học trong cùng query)
+    rows = db.query(Enrollment, Course.tieu_de).join(Course, Course.id == Enrollment.khoa_hoc_id).filter(
         Enrollment.user_id == current_user.id,
         Enrollment.trang_thai == 'active'
     ).all()
     
-    # Lấy tiến độ học tập
-    progress_list = db.query(Progress).filter(
-        Progress.user_id == current_user.id
-    ).all()
+    # Tiến độ từ progress_summary
+    counts = progress_summary.get_user_counts(db, current_user.id, [e.khoa_hoc_id for e, _ in rows])
     
     # Tổng hợp dữ liệu
     courses_data = []
-    for enrollment in enrollments:
-        course = db.query(Course).filter(Course.id == enrollment.khoa_hoc_id).first()
-        if course:
-            # Tính tiến độ
-            course_progress = [p for p in progress_list if p.khoa_hoc_id == course.id]
-            completed_lessons = len([p for p in course_progress if p.completed])
-            total_lessons = len(course.contents) if hasattr(course, 'contents') else 0
-            progress_percentage = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-            
-            courses_data.append({
-                "course_id": course.id,
-                "course_title": course.tieu_de,
-                "enrollment_date": enrollment.ngay_dang_ky.isoformat() if enrollment.ngay_dang_ky else None,
-                "progress_percentage": round(progress_percentage, 1),
-                "completed_lessons": completed_lessons,
-                "total_lessons": total_lessons
-            })
+    for enrollment, course_title in rows:
+        completed_lessons, total_lessons = counts[enrollment.khoa_hoc_id]
+        courses_data.append({
+            "course_id": enrollment.khoa_hoc_id,
+            "course_title": course_title,
+            "enrollment_date": enrollment.ngay_dang_ky.isoformat() if enrollment.ngay_dang_ky else None,
+            "progress_percentage": round(progress_summary.percentage(completed_lessons, total_lessons), 1),
+            "completed_lessons": completed_lessons,
+            "total_lessons": total_lessons
+        })
     
     return {
         "total_courses": len(courses_data),
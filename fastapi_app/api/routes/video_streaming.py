@@ -1,131 +1,94 @@
+import posixpath
+
 from fastapi import APIRouter, Request, HTTPException, status
-from fastapi.responses import StreamingResponse, Response
-import os
-from pathlib import Path
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from ...core.config import settings
+from ...core.hls import HLS_PREFIX, VIDEO_PREFIX
+from ...core.storage import normalize_key, storage
 
 router = APIRouter()
 
-# Thư mục chứa video
-VIDEO_DIR = Path("static/uploads/videos")
+HLS_MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
+def _video_response(filename: str, request: Request) -> Response:
+    # normalize_key chặn ../ thoát khỏi thư mục video
+    key = normalize_key(f"{VIDEO_PREFIX}/{filename}")
+    accel_redirect = None
+    if key and settings.video_accel_redirect:
+        accel_redirect = settings.video_accel_redirect.rstrip("/") + "/" + key[len(VIDEO_PREFIX) + 1:]
+    try:
+        if key is None:
+            raise FileNotFoundError(filename)
+        # Storage local: gửi file với Range/ETag; S3: redirect tới presigned URL (S3 tự xử lý Range)
+        return storage.serve(
+            key,
+            request.headers,
+            method=request.method,
+            media_type="video/mp4" if key.lower().endswith(".mp4") else None,
+            headers={"Cache-Control": "public, max-age=3600"},  # Cache 1 giờ
+            accel_redirect=accel_redirect,
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video không tồn tại"
+        )
 
 
 @router.get("/video/{filename:path}")
 async def stream_video(filename: str, request: Request):
     """
     Stream video với hỗ trợ HTTP Range requests (206 Partial Content)
-    Cho phép seek, pause/resume, và tối ưu bandwidth
+    Cho phép seek, pause/resume, và tối ưu bandwidth.
+    ETag/Last-Modified cho 304 và If-Range; nhiều range trả multipart/byteranges.
     """
-    file_path = VIDEO_DIR / filename
-    
-    # Kiểm tra file tồn tại
-    if not file_path.exists() or not file_path.is_file():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Video không tồn tại"
-        )
-    
-    # Lấy file size
-    file_size = file_path.stat().st_size
-    
-    # Lấy Range header từ request
-    range_header = request.headers.get("range")
-    
-    if not range_header:
-        # Nếu không có Range header, trả về toàn bộ file
-        return StreamingResponse(
-            open(file_path, "rb"),
-            media_type="video/mp4",
-            headers={
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(file_size),
-                "Content-Type": "video/mp4",
-            }
-        )
-    
-    # Parse Range header (ví dụ: "bytes=0-1023" hoặc "bytes=1024-")
-    try:
-        byte_start = 0
-        byte_end = file_size - 1
-        
-        if range_header.startswith("bytes="):
-            ranges = range_header.replace("bytes=", "").split("-")
-            if ranges[0]:
-                byte_start = int(ranges[0])
-            if ranges[1]:
-                byte_end = int(ranges[1])
-            else:
-                byte_end = file_size - 1
-        
-        # Đảm bảo range hợp lệ
-        if byte_start >= file_size or byte_end >= file_size or byte_start > byte_end:
-            raise HTTPException(
-                status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
-                detail="Range không hợp lệ",
-                headers={
-                    "Content-Range": f"bytes */{file_size}",
-                }
-            )
-        
-        content_length = byte_end - byte_start + 1
-        
-        # Tạo generator để đọc file theo chunk
-        def generate():
-            with open(file_path, "rb") as f:
-                f.seek(byte_start)
-                remaining = content_length
-                chunk_size = 8192  # 8KB chunks
-                
-                while remaining > 0:
-                    chunk = f.read(min(chunk_size, remaining))
-                    if not chunk:
-                        break
-                    remaining -= len(chunk)
-                    yield chunk
-        
-        # Trả về 206 Partial Content
-        return StreamingResponse(
-            generate(),
-            status_code=status.HTTP_206_PARTIAL_CONTENT,
-            media_type="video/mp4",
-            headers={
-                "Content-Range": f"bytes {byte_start}-{byte_end}/{file_size}",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(content_length),
-                "Content-Type": "video/mp4",
-                "Cache-Control": "public, max-age=3600",  # Cache 1 giờ
-            }
-        )
-    
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Range header không hợp lệ"
-        )
+    return _video_response(filename, request)
 
 
 @router.head("/video/{filename:path}")
-async def video_head(filename: str):
+async def video_head(filename: str, request: Request):
     """
     HEAD request để lấy metadata video mà không tải toàn bộ file
     """
-    file_path = VIDEO_DIR / filename
-    
-    if not file_path.exists() or not file_path.is_file():
+    return _video_response(filename, request)
+
+
+async def _hls_response(lesson_id: int, version: str, file_path: str, request: Request) -> Response:
+    # version bắt đầu bằng "." là thư mục tạm của job đang đóng gói (normalize_key trả None)
+    key = normalize_key(f"{HLS_PREFIX}/{lesson_id}/{version}/{file_path}")
+    media_type = HLS_MEDIA_TYPES.get(posixpath.splitext(key or "")[1].lower())
+    try:
+        if key is None or media_type is None:
+            raise FileNotFoundError(file_path)
+        serve_args = (key, request.headers, request.method, media_type)
+        # Mỗi version ứng với một file video gốc nên playlist và segment không bao giờ đổi
+        headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+        if file_path.endswith(".m3u8"):
+            # Playlist chứa URI tương đối nên luôn trả từ /api/hls (với S3 là đọc object: chạy ngoài event loop)
+            return await run_in_threadpool(storage.serve, *serve_args, headers=headers, proxy=True)
+        # Segment: local gửi file, S3 redirect tới presigned URL
+        return storage.serve(*serve_args, headers=headers)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Video không tồn tại"
+            detail="Không tìm thấy file HLS"
         )
-    
-    file_size = file_path.stat().st_size
-    
-    return Response(
-        status_code=status.HTTP_200_OK,
-        headers={
-            "Accept-Ranges": "bytes",
-            "Content-Length": str(file_size),
-            "Content-Type": "video/mp4",
-            "Cache-Control": "public, max-age=3600",
-        }
-    )
 
+
+@router.get("/hls/{lesson_id}/{version}/{file_path:path}")
+async def hls_file(lesson_id: int, version: str, file_path: str, request: Request):
+    """
+    Master playlist, playlist từng mức bitrate và segment .ts của video bài học (core/hls.py)
+    """
+    return await _hls_response(lesson_id, version, file_path, request)
+
+
+@router.head("/hls/{lesson_id}/{version}/{file_path:path}")
+async def hls_file_head(lesson_id: int, version: str, file_path: str, request: Request):
+    return await _hls_response(lesson_id, version, file_path, request)
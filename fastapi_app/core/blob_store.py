@@ -0,0 +1,143 @@
+"""
+Kho file upload đánh địa chỉ theo nội dung (SHA-256), dùng bởi core/uploads.py, trên backend
+của core/storage.py (local hoặc S3).
+
+- Mỗi UploadKind giữ prefix riêng; file có key <prefix>/<sha[:2]>/<sha[2:4]>/<sha><đuôi>.
+  Cùng một file upload nhiều lần (cùng loại, cùng đuôi) chỉ lưu một bản; chia 2 cấp thư mục
+  để mỗi thư mục không chứa quá nhiều file.
+- Blob không bao giờ bị sửa tại chỗ: mọi xử lý (faststart video...) làm trên file tạm trước khi đặt tên.
+- Tham chiếu tới blob là các cột đường dẫn trong REFERENCES (CourseContent, Assignment, Submission,
+  Discussion...). collect_garbage quét các cột đó (mark) rồi xóa file không còn được tham chiếu (sweep).
+  File mới hơn settings.blob_gc_grace_hours được giữ lại vì request upload có thể chưa commit DB;
+  upload trùng một blob có sẵn sẽ cập nhật thời gian sửa đổi của blob đó.
+"""
+import hashlib
+import os
+import re
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.assignment import Assignment, Submission
+from ..models.course import Course
+from ..models.course_content import CourseContent
+from ..models.discussion import Discussion
+from .config import settings
+from .storage import key_from_url, storage
+
+HASH_CHUNK = 1024 * 1024
+EXTENSION = re.compile(r"\.[a-z0-9]{1,10}")
+BLOB_NAME = re.compile(r"([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(\.[a-z0-9]{1,10})?")
+VIDEO_API_PREFIX = "/api/video/"
+VIDEO_STATIC_PREFIX = "/static/uploads/videos/"
+
+# Cột chứa đường dẫn file upload
+REFERENCES = [
+    CourseContent.video_path,
+    CourseContent.tai_lieu_pdf,
+    CourseContent.hinh_anh,
+    Course.hinh_anh,
+    Assignment.file_path,
+    Submission.file_path,
+    Discussion.hinh_anh,
+]
+# Cột JSON dạng [{"url": ...}, ...]
+JSON_REFERENCES = [CourseContent.tai_lieu_links, CourseContent.resources]
+
+
+class GcReport(NamedTuple):
+    scanned: int  # Số file đã xét
+    removed: int
+    reclaimed_bytes: int
+    kept_recent: int  # Không được tham chiếu nhưng còn trong thời gian chờ
+    dry_run: bool
+
+
+def blob_name(digest: str, ext: str) -> str:
+    """Đường dẫn tương đối của blob; đuôi file lạ (khoảng trắng, unicode...) bị bỏ"""
+    ext = ext.lower() if EXTENSION.fullmatch(ext.lower()) else ""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def put_blob(tmp_path: str, prefix: str, digest: str, ext: str) -> str:
+    """Đưa file tạm local vào kho; trả về key. File tạm luôn bị xóa/di chuyển"""
+    key = f"{prefix}/{blob_name(digest, ext)}"
+    # Đã có bản giống hệt: chỉ làm mới thời gian để GC không xóa trước khi DB commit
+    if storage.touch(key):
+        os.unlink(tmp_path)
+    else:
+        storage.put_file(tmp_path, key)
+    return key
+
+
+def _normalize(url: Optional[str]) -> Optional[str]:
+    """Key của mọi dạng tham chiếu (URL đầy đủ, /api/video/..., có query)"""
+    if not isinstance(url, str):
+        return None
+    url = url.split("?", 1)[0].split("#", 1)[0]
+    index = url.find("/static/uploads/")
+    if index >= 0:
+        return key_from_url(url[index:])
+    index = url.find(VIDEO_API_PREFIX)
+    if index >= 0:
+        return key_from_url(VIDEO_STATIC_PREFIX + url[index + len(VIDEO_API_PREFIX):])
+    return None
+
+
+def referenced_keys(db: Session) -> set[str]:
+    keys = set()
+    for column in REFERENCES:
+        for (value,) in db.query(column).filter(column.isnot(None)).distinct():
+            keys.add(_normalize(value))
+    for column in JSON_REFERENCES:
+        for (items,) in db.query(column).filter(column.isnot(None)):
+            for item in items if isinstance(items, list) else []:
+                if isinstance(item, dict):
+                    keys.add(_normalize(item.get("url")))
+    keys.discard(None)
+    return keys
+
+
+def collect_garbage(
+    db: Session,
+    prefixes: Iterable[str],
+    dry_run: bool = False,
+    include_legacy: bool = False,
+    grace_hours: Optional[int] = None,
+) -> GcReport:
+    """Xóa file upload không còn được tham chiếu và cũ hơn thời gian chờ.
+    include_legacy: xét cả file tên cũ (trước kho theo nội dung) nằm ngay trong prefix"""
+    referenced = referenced_keys(db)
+    db.rollback()  # Không giữ transaction trong lúc duyệt kho
+    hours = settings.blob_gc_grace_hours if grace_hours is None else grace_hours
+    cutoff = time.time() - hours * 3600
+    scanned = removed = reclaimed = kept = 0
+
+    for prefix in prefixes:
+        for info in list(storage.list(prefix)):
+            name = info.key[len(prefix) + 1:]
+            if name.startswith("."):
+                continue  # File tạm đang ghi
+            if not (BLOB_NAME.fullmatch(name) or (include_legacy and "/" not in name)):
+                continue
+            scanned += 1
+            if info.key in referenced:
+                continue
+            if info.mtime > cutoff:
+                kept += 1
+                continue
+            if not dry_run:
+                storage.delete(info.key)
+            removed += 1
+            reclaimed += info.size
+
+    return GcReport(scanned, removed, reclaimed, kept, dry_run)
@@ -0,0 +1,155 @@
+"""
+Cache danh sách khóa học công khai (GET /api/courses) trong bộ nhớ mỗi worker.
+
+- Khóa là bộ tham số lọc/sắp xếp đã chuẩn hóa; giá trị là body JSON đã serialize sẵn kèm ETag,
+  nên request trúng cache không chạm DB và không phải dựng lại dict.
+- Xóa toàn bộ khi một Course được insert/update/delete (hook ORM, sau khi transaction commit):
+  bao trùm create_course, update_course, approve_course, update_course_status và mọi nơi khác;
+  tương tự với Review (điểm đánh giá trên danh sách).
+  Worker khác được báo qua kênh realtime (NOTIFY khi realtime_backend=postgres).
+- Single-flight: nhiều request cùng khóa lúc cache trống chỉ chạy một query, các request còn lại chờ kết quả.
+- Mỗi lần xóa tăng generation; kết quả dựng từ dữ liệu trước lần xóa sẽ không được lưu.
+- TTL (settings.catalog_cache_ttl_seconds) là lưới an toàn khi lỡ mất sự kiện từ worker khác.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .realtime import hub
+
+CACHE_NAME = "catalog"
+
+
+class CatalogEntry(NamedTuple):
+    body: bytes
+    etag: str
+    headers: dict  # Header phân trang (X-Next-Cursor, X-Total-Count)
+    expires_at: float
+
+
+def body_etag(body: bytes, headers: dict) -> str:
+    digest = hashlib.sha256(body)
+    for name in sorted(headers):
+        digest.update(f"\n{name}: {headers[name]}".encode())
+    return '"' + digest.hexdigest()[:32] + '"'
+
+
+class CatalogCache:
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CatalogEntry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        # invalidate được gọi từ threadpool (route sync commit), phần còn lại chạy trên event loop
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _lookup(self, key: Hashable) -> Optional[CatalogEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: Hashable, entry: CatalogEntry, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return  # Khóa học đã thay đổi trong lúc query: kết quả có thể đã cũ
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_build(self, key: Hashable, build: Callable[[], Awaitable[tuple[bytes, dict]]]) -> CatalogEntry:
+        """Entry từ cache; cache trống thì gọi build() -> (body, headers), một lần cho mỗi khóa dù nhiều request chờ"""
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            entry = await asyncio.shield(future)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            # Request đang dựng bị lỗi/hủy: thử lại (có thể tự dựng)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        entry = None
+        try:
+            body, headers = await build()
+            entry = CatalogEntry(body, body_etag(body, headers), headers, time.monotonic() + self.ttl_seconds)
+            self._store(key, entry, generation)
+            return entry
+        finally:
+            del self._inflight[key]
+            future.set_result(entry)
+
+
+catalog_cache = CatalogCache(settings.catalog_cache_ttl_seconds, settings.catalog_cache_max_entries)
+
+
+def invalidate_catalog():
+    catalog_cache.invalidate()
+    hub.publish_invalidation(CACHE_NAME)
+
+
+def _mark_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["catalog_dirty"] = True
+
+
+def _on_commit(session):
+    if session.info.pop("catalog_dirty", False):
+        invalidate_catalog()
+
+
+def _on_rollback(session, previous_transaction):
+    session.info.pop("catalog_dirty", None)
+
+
+def register_catalog_events():
+    """Gắn hook ORM: đánh dấu khi Course/Review thay đổi, chỉ xóa cache khi commit thành công"""
+    from ..models.course import Course
+    from ..models.review import Review
+
+    hub.on_invalidate(CACHE_NAME, catalog_cache.invalidate)
+    if event.contains(Course, "after_insert", _mark_dirty):
+        return
+    # Review: danh sách hiển thị điểm đánh giá trung bình
+    for model in (Course, Review):
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(model, name, _mark_dirty)
+    event.listen(Session, "after_commit", _on_commit)
+    event.listen(Session, "after_soft_rollback", _on_rollback)
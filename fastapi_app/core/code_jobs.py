@@ -0,0 +1,152 @@
+"""
+Hàng đợi job chạy code bất đồng bộ (/api/code/jobs), lưu trong process, không cần broker.
+
+- Mỗi job giữ trạng thái, output đã nhận (stdout/stderr theo từng đoạn) và danh sách subscriber
+  (SSE/WebSocket). Subscriber mới nhận lại toàn bộ output cũ rồi tới output mới.
+- Job đã xong được giữ code_jobs_ttl giây rồi dọn khi có job mới.
+- Chạy trong process: với nhiều worker uvicorn, client phải gọi lại đúng worker đã nhận job
+  (sticky session) hoặc chạy 1 worker.
+"""
+import asyncio
+import os
+import signal
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .config import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class CodeJob:
+    def __init__(self, user_id: int, language: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.language = language
+        self.status = QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.chunks: list[dict] = []
+        self.result: dict = {}
+        self.pid: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+        self.subscribers: set[asyncio.Queue] = set()
+
+    def output(self, stream: str = "stdout") -> str:
+        return "".join(c["data"] for c in self.chunks if c["stream"] == stream)
+
+    def to_dict(self) -> dict:
+        finished = self.status in FINISHED
+        return {
+            "id": self.id,
+            "language": self.language,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            # Đang chạy: trả output đã nhận tới lúc này
+            "output": self.result.get("output", "") if finished and self.result else self.output("stdout"),
+            "error": self.result.get("error") if finished else None,
+            "execution_time": self.result.get("execution_time"),
+            "exit_code": self.result.get("exit_code"),
+            "cache_hit": self.result.get("cache_hit"),
+        }
+
+    def _publish(self, event_data: dict):
+        for queue in list(self.subscribers):
+            queue.put_nowait(event_data)
+
+    def on_sandbox_event(self, message: dict):
+        """Callback của sandbox: started (pid để hủy) và từng đoạn output"""
+        if message["event"] == "started":
+            self.pid = message.get("pid")
+            self.set_status(RUNNING)
+        elif message["event"] == "output" and message.get("data"):
+            chunk = {"stream": message["stream"], "data": message["data"]}
+            self.chunks.append(chunk)
+            self._publish({"type": "output", "data": chunk})
+
+    def set_status(self, new_status: str):
+        if self.status == new_status:
+            return
+        self.status = new_status
+        if new_status == RUNNING:
+            self.started_at = datetime.utcnow()
+        if new_status in FINISHED:
+            self.finished_at = datetime.utcnow()
+        self._publish({"type": "status", "data": {"status": new_status}})
+
+    def finish(self, new_status: str, result: dict):
+        self.result = result
+        self.pid = None
+        self.set_status(new_status)
+        self._publish({"type": "result", "data": self.to_dict()})
+
+    def subscribe(self) -> tuple[list[dict], asyncio.Queue]:
+        """Trả về (output đã có, queue sự kiện mới); không giới hạn queue vì output đã bị chặn 64KB"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.add(queue)
+        return [{"type": "output", "data": c} for c in self.chunks], queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def cancel(self):
+        """Đang chạy: giết chương trình (sandbox trả kết quả bình thường); đang chờ: hủy task"""
+        if self.status in FINISHED:
+            return
+        self.cancel_requested = True
+        if self.pid:
+            self.kill()
+        elif self.task:
+            self.task.cancel()
+
+    def kill(self):
+        """Giết nhóm tiến trình của chương trình đang chạy; worker sandbox vẫn được giữ lại"""
+        if not self.pid:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # Tiến trình con chưa kịp setsid
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class CodeJobStore:
+    def __init__(self):
+        self._jobs: dict[str, CodeJob] = {}
+
+    def create(self, user_id: int, language: str) -> CodeJob:
+        self.purge()
+        job = CodeJob(user_id, language)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[CodeJob]:
+        return self._jobs.get(job_id)
+
+    def active_count(self, user_id: int) -> int:
+        return sum(1 for j in self._jobs.values() if j.user_id == user_id and j.status not in FINISHED)
+
+    def purge(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.code_jobs_ttl)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+code_jobs = CodeJobStore()
@@ -0,0 +1,105 @@
+"""
+Cache file thực thi C++ theo nội dung (chỉ dùng thư viện chuẩn, worker sandbox import trực tiếp).
+
+- Khóa: sha256(phiên bản g++ + cờ biên dịch + source) -> file thực thi trong thư mục cache.
+- Ghi file tạm rồi os.replace nên nhiều worker dùng chung thư mục an toàn.
+- LRU theo mtime: lần hit cập nhật mtime; vượt max_bytes thì xóa file cũ nhất.
+"""
+import hashlib
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+COMPILER = "g++"
+FLAGS = ("-O2",)
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "elearning_cpp_cache")
+
+
+class CompileError(Exception):
+    def __init__(self, stderr: str, returncode: int):
+        super().__init__(stderr)
+        self.stderr = stderr
+        self.returncode = returncode
+
+
+class CompileCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory or DEFAULT_DIR
+        self.max_bytes = max_bytes
+        self._compiler_version: Optional[str] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def compiler_version(self) -> str:
+        if self._compiler_version is None:
+            try:
+                out = subprocess.run([COMPILER, "--version"], capture_output=True, text=True, timeout=5).stdout
+                self._compiler_version = out.splitlines()[0] if out else COMPILER
+            except (OSError, subprocess.TimeoutExpired):
+                self._compiler_version = COMPILER
+        return self._compiler_version
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.compiler_version().encode())
+        digest.update("\0".join(FLAGS).encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def lookup(self, source: str) -> Optional[str]:
+        path = os.path.join(self.directory, self.key(source))
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_compile(self, source: str, timeout: float) -> tuple[str, bool]:
+        """Trả về (đường dẫn file thực thi, cache_hit); lỗi biên dịch -> CompileError"""
+        path = self.lookup(source)
+        if path:
+            return path, True
+
+        path = os.path.join(self.directory, self.key(source))
+        with tempfile.TemporaryDirectory(dir=self.directory, prefix=".build_") as build_dir:
+            source_path = os.path.join(build_dir, "main.cpp")
+            output_path = os.path.join(build_dir, "main")
+            with open(source_path, "w") as f:
+                f.write(source)
+            result = subprocess.run(
+                [COMPILER, source_path, *FLAGS, "-o", output_path],
+                capture_output=True, text=True, timeout=timeout,
+            )
+            if result.returncode != 0:
+                raise CompileError(result.stderr, result.returncode)
+            os.replace(output_path, path)
+        self.evict(keep=path)
+        return path, False
+
+    def evict(self, keep: Optional[str] = None):
+        """Xóa file ít dùng nhất cho đến khi tổng dung lượng <= max_bytes (không xóa file keep)"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -31,6 +31,75 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     refresh_token_expire_minutes: int = 60 * 24 * 7
     allowed_origins: List[AnyHttpUrl] = []
+    # Bật engine async (psycopg 3) cho các route đọc nhiều; tắt thì dùng Session sync chạy trong threadpool
+    db_async: bool = False
+    # Connection pool (mỗi worker uvicorn có pool riêng: tổng kết nối = workers * (size + overflow))
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800  # giây, -1 để tắt
+    # Chạy sau PgBouncer (transaction pooling): NullPool và tắt prepared statements
+    db_pgbouncer: bool = False
+    # Kênh realtime: "memory" (1 worker) hoặc "postgres" (LISTEN/NOTIFY, dùng chung giữa nhiều worker)
+    realtime_backend: str = "memory"
+    # Sandbox chạy code: số worker khởi động sẵn cho mỗi ngôn ngữ, hàng đợi và giới hạn tài nguyên
+    sandbox_enabled: bool = True
+    sandbox_workers: int = 4
+    sandbox_queue_size: int = 64
+    sandbox_user_concurrency: int = 2
+    sandbox_memory_mb: int = 256
+    # Job chạy code bất đồng bộ (/api/code/jobs): pool worker riêng, giữ kết quả code_jobs_ttl giây
+    code_jobs_workers: int = 2
+    code_jobs_queue_size: int = 100
+    code_jobs_ttl: int = 3600
+    # Tự chấm bài tập code: số bài nộp chấm cùng lúc, số worker sandbox (0 = số core), timeout mỗi test case
+    grading_enabled: bool = True
+    grading_concurrency: int = 4
+    grading_workers: int = 0
+    grading_timeout: int = 5
+    # Khi chạy sau nginx: prefix location internal để nginx sendfile video (rỗng = app tự gửi)
+    video_accel_redirect: str = ""
+    # Giới hạn upload (MB): route upload trả 413 ngay khi body vượt giới hạn
+    upload_max_video_mb: int = 2048
+    upload_max_pdf_mb: int = 50
+    upload_max_file_mb: int = 10
+    upload_max_image_mb: int = 5
+    # Upload video nối tiếp được (/api/lessons/{id}/video-uploads): thư mục staging (ngoài static), hạn phiên
+    upload_staging_dir: str = "upload_staging"
+    resumable_upload_ttl_hours: int = 24
+    # Lưu trữ file upload: "local" (thư mục static/) hoặc "s3" (S3/MinIO, chạy nhiều node không chung ổ đĩa)
+    storage_backend: str = "local"
+    s3_endpoint_url: str = ""  # vd http://localhost:9000 cho MinIO; rỗng = AWS S3 theo s3_region
+    s3_region: str = "us-east-1"
+    s3_bucket: str = ""
+    s3_access_key: str = ""
+    s3_secret_key: str = ""
+    s3_presign_seconds: int = 3600  # Thời hạn presigned URL khi redirect tải file
+    # Dọn file upload không còn được tham chiếu (core/blob_store.py): chu kỳ chạy, thời gian chờ với file mới
+    blob_gc_interval_hours: int = 24
+    blob_gc_grace_hours: int = 24
+    # Đóng gói HLS nhiều mức bitrate sau khi upload video (tự tắt nếu không tìm thấy ffmpeg/ffprobe)
+    hls_enabled: bool = True
+    ffmpeg_path: str = "ffmpeg"
+    ffprobe_path: str = "ffprobe"
+    hls_concurrency: int = 1
+    hls_segment_seconds: int = 6
+    hls_timeout: int = 3600
+    # Cache file thực thi C++ theo nội dung source (rỗng = thư mục tạm của hệ thống)
+    compile_cache_dir: str = ""
+    compile_cache_max_mb: int = 256
+    # Cache ảnh thu nhỏ (?w=) trên đĩa local mỗi node (rỗng = thư mục tạm của hệ thống), LRU theo dung lượng
+    image_cache_dir: str = ""
+    image_cache_max_mb: int = 512
+    # Cache JSON danh sách khóa học (GET /api/courses) trong bộ nhớ mỗi worker; xóa khi khóa học thay đổi,
+    # TTL là lưới an toàn khi lỡ mất sự kiện xóa cache từ worker khác (realtime_backend=postgres)
+    catalog_cache_ttl_seconds: int = 300
+    catalog_cache_max_entries: int = 256
+    # Thời gian xem video (POST /api/lessons/{id}/watch): gộp trong bộ nhớ rồi ghi hàng loạt
+    # theo chu kỳ hoặc khi số (user, bài học) đang chờ vượt ngưỡng; tự hoàn thành bài khi xem đủ tỉ lệ
+    watch_flush_interval_seconds: int = 15
+    watch_buffer_max_entries: int = 2000
+    watch_complete_fraction: float = 0.9
 
     @field_validator('allowed_origins', mode='before')
     @classmethod
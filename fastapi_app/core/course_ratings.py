@@ -0,0 +1,103 @@
+"""
+Thống kê đánh giá khóa học (bảng course_ratings): số đánh giá, tổng điểm, số đánh giá theo mức sao.
+
+- Cập nhật: hook ORM after_insert/after_update/after_delete của Review, chạy trong cùng transaction
+  (create_review tạo mới hoặc sửa điểm đều đi qua đây). Cộng dồn bằng INSERT ... ON CONFLICT DO UPDATE
+  nên hai đánh giá đồng thời không ghi đè nhau.
+- Đọc: lookup theo khóa chính (get_review_stats, /overview) hoặc cột Course.total_reviews/average_rating
+  (danh sách khóa học, chi tiết khóa học).
+- rebuild_course_ratings tính lại toàn bộ bằng một câu GROUP BY (scripts/rebuild_course_ratings.py).
+"""
+from typing import Optional
+
+from sqlalchemy import case, delete, event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.course_rating import STARS, CourseRating
+from ..models.review import Review
+
+COUNT_COLUMNS = ("total_reviews", "rating_sum", *(f"star_{s}" for s in STARS))
+
+
+def _insert(dialect_name: str):
+    # ON CONFLICT: PostgreSQL (production) và SQLite (dev) đều hỗ trợ
+    if dialect_name == "sqlite":
+        return sqlite.insert(CourseRating)
+    return postgresql.insert(CourseRating)
+
+
+def apply_delta_stmt(dialect_name: str, course_id: int, count: int, rating_sum: int, stars: dict[int, int]):
+    """Cộng delta vào dòng của khóa học; chưa có dòng thì tạo với chính delta đó"""
+    values = {"khoa_hoc_id": course_id, "total_reviews": count, "rating_sum": rating_sum}
+    values.update({f"star_{s}": stars.get(s, 0) for s in STARS})
+    stmt = _insert(dialect_name).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[CourseRating.khoa_hoc_id],
+        set_={
+            **{name: getattr(CourseRating, name) + getattr(stmt.excluded, name) for name in COUNT_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+
+
+def summary(rating: Optional[CourseRating]) -> dict:
+    """Dạng trả về của /courses/{id}/reviews/stats"""
+    if rating is None or not rating.total_reviews:
+        return {"total_reviews": 0, "average_rating": 0, "rating_distribution": {s: 0 for s in STARS}}
+    return {
+        "total_reviews": rating.total_reviews,
+        "average_rating": round(rating.rating_sum / rating.total_reviews, 1),
+        "rating_distribution": {s: getattr(rating, f"star_{s}") for s in STARS},
+    }
+
+
+def rebuild_course_ratings(db: Session) -> int:
+    """Tính lại mọi dòng từ danh_gia_khoa_hoc trong một lượt GROUP BY; trả về số khóa học có đánh giá"""
+    aggregate = select(
+        Review.khoa_hoc_id,
+        func.count(Review.id),
+        func.sum(Review.diem),
+        *(func.sum(case((Review.diem == s, 1), else_=0)) for s in STARS),
+    ).group_by(Review.khoa_hoc_id)
+    stmt = _insert(db.bind.dialect.name).from_select(["khoa_hoc_id", *COUNT_COLUMNS], aggregate)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CourseRating.khoa_hoc_id],
+        set_={**{name: getattr(stmt.excluded, name) for name in COUNT_COLUMNS}, "updated_at": func.now()},
+    )
+    result = db.execute(stmt)
+    # Khóa học không còn đánh giá nào
+    db.execute(
+        delete(CourseRating)
+        .where(CourseRating.khoa_hoc_id.not_in(select(Review.khoa_hoc_id)))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def _on_review_insert(mapper, connection, target):
+    connection.execute(apply_delta_stmt(connection.dialect.name, target.khoa_hoc_id, 1, target.diem, {target.diem: 1}))
+
+
+def _on_review_update(mapper, connection, target):
+    history = inspect(target).attrs.diem.history
+    if not history.deleted or not history.added:
+        return
+    old, new = history.deleted[0], history.added[0]
+    if old == new:
+        return
+    connection.execute(apply_delta_stmt(connection.dialect.name, target.khoa_hoc_id, 0, new - old, {old: -1, new: 1}))
+
+
+def _on_review_delete(mapper, connection, target):
+    connection.execute(apply_delta_stmt(connection.dialect.name, target.khoa_hoc_id, -1, -target.diem, {target.diem: -1}))
+
+
+def register_rating_events():
+    """Cập nhật course_ratings cùng transaction với mọi thay đổi Review"""
+    if event.contains(Review, "after_insert", _on_review_insert):
+        return
+    event.listen(Review, "after_insert", _on_review_insert)
+    event.listen(Review, "after_update", _on_review_update)
+    event.listen(Review, "after_delete", _on_review_delete)
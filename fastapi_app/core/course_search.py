@@ -0,0 +1,117 @@
+"""
+Tìm kiếm khóa học bằng full-text search của PostgreSQL (database/add_course_search.sql).
+
+- khoa_hoc.search_vector là cột sinh tự động (tiêu đề trọng số A, mô tả trọng số B) với cấu hình
+  "vietnamese" bỏ dấu, có GIN index: "lap trinh" khớp "Lập trình", không quét tuần tự cả bảng.
+- Mỗi từ trong câu tìm là tiền tố (lập:* & trình:*) để gõ dở vẫn ra kết quả.
+- Xếp hạng bằng ts_rank (khớp tiêu đề nặng hơn mô tả), hòa thì khóa học mới hơn trước.
+- Đoạn trích (ts_headline) chỉ tính cho các dòng của trang hiện tại; từ khớp bọc trong <mark>,
+  phần còn lại đã được escape HTML.
+- Database khác PostgreSQL (SQLite khi dev): lọc ILIKE từng từ, không xếp hạng.
+"""
+import html
+import re
+from typing import Optional
+
+from sqlalchemy import and_, cast, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+
+from ..models.course import Course
+
+CONFIG = "public.vietnamese"
+MAX_TERMS = 8
+SNIPPET_CHARS = 160
+TOKEN = re.compile(r"[^\W_]+")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=\" ... \""
+TITLE_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+
+# Cột không khai báo trong model Course: chỉ có trên PostgreSQL sau migration
+search_vector = literal_column("khoa_hoc.search_vector", TSVECTOR)
+
+
+def terms(q: Optional[str]) -> list[str]:
+    return TOKEN.findall((q or "").lower())[:MAX_TERMS]
+
+
+def is_postgres(dialect_name: str) -> bool:
+    return dialect_name == "postgresql"
+
+
+def _tsquery(words: list[str]):
+    # Từ chỉ gồm chữ/số nên không cần escape cú pháp tsquery
+    return func.to_tsquery(cast(CONFIG, REGCONFIG), " & ".join(f"'{w}':*" for w in words))
+
+
+def search_condition(q: Optional[str], dialect_name: str):
+    """Điều kiện WHERE cho câu tìm q; None nếu q không có từ nào"""
+    words = terms(q)
+    if not words:
+        return None
+    if is_postgres(dialect_name):
+        return search_vector.bool_op("@@")(_tsquery(words))
+    return and_(*(or_(Course.tieu_de.ilike(f"%{w}%"), Course.mo_ta.ilike(f"%{w}%")) for w in words))
+
+
+def rank_expression(q: Optional[str], dialect_name: str):
+    """Điểm liên quan để sắp xếp giảm dần (None nếu không xếp hạng được)"""
+    words = terms(q)
+    if not words or not is_postgres(dialect_name):
+        return None
+    return func.ts_rank(search_vector, _tsquery(words))
+
+
+def search_statement(q: str, dialect_name: str, filters=(), limit: int = 20, offset: int = 0):
+    """
+    Một trang kết quả tìm kiếm. Mỗi dòng: Course, rank, total (tổng số kết quả),
+    tieu_de_highlight và snippet (None nếu không phải PostgreSQL).
+    """
+    words = terms(q)
+    condition = search_condition(q, dialect_name)
+    if condition is None:
+        return None
+
+    if not is_postgres(dialect_name):
+        return (
+            select(Course, literal_column("0").label("rank"), func.count().over().label("total"))
+            .where(condition, *filters)
+            .order_by(Course.created_at.desc(), Course.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+
+    query = _tsquery(words)
+    rank = func.ts_rank(search_vector, query)
+    page = (
+        select(Course.id, rank.label("rank"), func.count().over().label("total"))
+        .where(condition, *filters)
+        .order_by(rank.desc(), Course.created_at.desc(), Course.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    config = cast(CONFIG, REGCONFIG)
+    return (
+        select(
+            Course,
+            page.c.rank,
+            page.c.total,
+            func.ts_headline(config, Course.tieu_de, query, TITLE_HEADLINE_OPTIONS).label("tieu_de_highlight"),
+            func.ts_headline(config, func.coalesce(Course.mo_ta, ""), query, HEADLINE_OPTIONS).label("snippet"),
+        )
+        .join(page, page.c.id == Course.id)
+        .order_by(page.c.rank.desc(), Course.created_at.desc(), Course.id.desc())
+    )
+
+
+def safe_highlight(text: Optional[str]) -> Optional[str]:
+    """Escape HTML, chỉ giữ thẻ <mark> do ts_headline chèn"""
+    if text is None:
+        return None
+    return html.escape(text).replace("&lt;mark&gt;", "<mark>").replace("&lt;/mark&gt;", "</mark>")
+
+
+def fallback_snippet(mo_ta: Optional[str]) -> str:
+    text = mo_ta or ""
+    if len(text) > SNIPPET_CHARS:
+        text = text[:SNIPPET_CHARS] + "..."
+    return html.escape(text)
@@ -0,0 +1,265 @@
+"""
+Trả file lớn (video) với Range, conditional request và cách gửi ít tốn CPU nhất có thể.
+
+Thứ tự ưu tiên khi gửi body:
+1. X-Accel-Redirect (settings.video_accel_redirect): nginx tự sendfile, kể cả Range/ETag.
+2. Extension ASGI "http.response.zerocopysend" (server gọi os.sendfile) / "http.response.pathsend".
+3. Đọc bằng os.pread trong thread với chunk tăng dần 64KB -> 1MB (thay cho 8KB cố định).
+
+Hỗ trợ: ETag mạnh + Last-Modified, If-None-Match / If-Modified-Since (304), If-Range,
+nhiều range (multipart/byteranges), 416 khi range không thỏa mãn.
+"""
+import mimetypes
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+MIN_CHUNK = 64 * 1024
+MAX_CHUNK = 1024 * 1024
+# Nhiều range hơn thì trả cả file (chống request cắt vụn file)
+MAX_RANGES = 16
+
+
+def _read_at(f, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(f.fileno(), size, offset)
+    # Windows không có pread
+    f.seek(offset)
+    return f.read(size)
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_list(value: str) -> list[str]:
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def _weak_match(etag: str, candidates: list[str]) -> bool:
+    strip = lambda tag: tag[2:] if tag.startswith("W/") else tag  # noqa: E731
+    return "*" in candidates or any(strip(c) == strip(etag) for c in candidates)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match khớp ETag (so sánh yếu, như RFC 9110 quy định cho 304)"""
+    return if_none_match is not None and _weak_match(etag, _etag_list(if_none_match))
+
+
+def parse_range_header(value: str, size: int) -> Optional[list[tuple[int, int]]]:
+    """Trả về danh sách (start, end) đã gộp (end tính cả); [] nếu không range nào thỏa mãn;
+    None nếu header sai cú pháp hoặc quá nhiều range (khi đó bỏ qua Range, trả cả file)"""
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        start_s, sep, end_s = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if start_s == "":
+                # bytes=-500: 500 byte cuối
+                length = int(end_s)
+                if length <= 0:
+                    continue
+                ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(start_s)
+            end = int(end_s) if end_s else None
+        except ValueError:
+            return None
+        if end is not None and start > end:
+            return None
+        if start >= size:
+            continue
+        end = size - 1 if end is None else end
+        ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class RangeFileResponse(Response):
+    def __init__(
+        self,
+        path: str,
+        request_headers: Headers,
+        method: str = "GET",
+        media_type: Optional[str] = None,
+        headers: Optional[dict] = None,
+        stat_result: Optional[os.stat_result] = None,
+        accel_redirect: Optional[str] = None,
+    ):
+        self.path = path
+        self.stat_result = stat_result or os.stat(path)
+        self.media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.send_body = method.upper() != "HEAD"
+        self.background = None
+        self.ranges: Optional[list[tuple[int, int]]] = None
+        self.boundary: Optional[str] = None
+        self.parts: list[tuple[bytes, int, int]] = []
+
+        size = self.stat_result.st_size
+        etag = file_etag(self.stat_result)
+        last_modified = formatdate(self.stat_result.st_mtime, usegmt=True)
+        base_headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            **(headers or {}),
+        }
+
+        if accel_redirect:
+            # nginx (location internal + sendfile on) tự xử lý Range/ETag
+            self.send_body = False
+            self.status_code = 200
+            self.init_headers({**base_headers, "X-Accel-Redirect": accel_redirect, "Content-Type": self.media_type})
+            self.headers["content-length"] = "0"
+            return
+
+        if self._not_modified(request_headers, etag):
+            self.status_code = 304
+            self.send_body = False
+            self.init_headers(base_headers)
+            return
+
+        range_header = request_headers.get("range")
+        if range_header and self._if_range_ok(request_headers.get("if-range"), etag, last_modified):
+            self.ranges = parse_range_header(range_header, size)
+
+        if self.ranges is None:
+            self.status_code = 200
+            self.init_headers({**base_headers, "Content-Type": self.media_type, "Content-Length": str(size)})
+        elif not self.ranges:
+            self.status_code = 416
+            self.send_body = False
+            self.init_headers({**base_headers, "Content-Range": f"bytes */{size}", "Content-Length": "0"})
+        elif len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            self.status_code = 206
+            self.init_headers({
+                **base_headers,
+                "Content-Type": self.media_type,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            })
+        else:
+            self.status_code = 206
+            self.boundary = secrets.token_hex(16)
+            length = 0
+            for start, end in self.ranges:
+                preamble = (
+                    f"\r\n--{self.boundary}\r\n"
+                    f"Content-Type: {self.media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                self.parts.append((preamble, start, end))
+                length += len(preamble) + end - start + 1
+            self.epilogue = f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+            length += len(self.epilogue)
+            self.init_headers({
+                **base_headers,
+                "Content-Type": f"multipart/byteranges; boundary={self.boundary}",
+                "Content-Length": str(length),
+            })
+
+    def _not_modified(self, request_headers: Headers, etag: str) -> bool:
+        # If-None-Match được ưu tiên; chỉ xét If-Modified-Since khi không có nó
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _weak_match(etag, _etag_list(if_none_match))
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= int(self.stat_result.st_mtime)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _if_range_ok(self, if_range: Optional[str], etag: str, last_modified: str) -> bool:
+        """If-Range: ETag phải khớp mạnh, ngày phải bằng đúng Last-Modified; sai thì trả cả file"""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == etag
+        return if_range == last_modified
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async with anyio.create_task_group() as task_group:
+
+            async def wrap(func):
+                await func()
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(wrap, partial(self._send_body, scope, send))
+            await wrap(partial(self._listen_for_disconnect, receive))
+
+    async def _listen_for_disconnect(self, receive: Receive) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+
+    async def _send_body(self, scope: Scope, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        if self.ranges is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        if self.ranges is None:
+            segments = [(b"", 0, self.stat_result.st_size - 1)]
+        elif self.boundary is None:
+            segments = [(b"", *self.ranges[0])]
+        else:
+            segments = self.parts
+
+        zerocopy = "http.response.zerocopysend" in extensions
+        with open(self.path, "rb") as f:
+            for preamble, start, end in segments:
+                if preamble:
+                    await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True,
+                    })
+                else:
+                    await self._send_chunks(f, start, end, send)
+        await send({"type": "http.response.body", "body": self.epilogue if self.boundary else b"", "more_body": False})
+
+    async def _send_chunks(self, f, start: int, end: int, send: Send) -> None:
+        # Chunk nhỏ lúc đầu để byte đầu tiên tới nhanh (seek), rồi tăng dần để giảm số vòng lặp
+        chunk = MIN_CHUNK
+        offset = start
+        while offset <= end:
+            size = min(chunk, end - offset + 1)
+            data = await anyio.to_thread.run_sync(_read_at, f, size, offset)
+            if not data:
+                break
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+            offset += len(data)
+            chunk = min(chunk * 2, MAX_CHUNK)
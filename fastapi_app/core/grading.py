@@ -0,0 +1,326 @@
+"""
+Tự chấm bài tập code bằng test case.
+
+- Bài nộp của bài tập có ngon_ngu được đặt trang_thai = "grading" và đưa vào hàng đợi chấm.
+- Hàng đợi gộp trùng: học viên nộp lại khi bài cũ chưa chấm thì chỉ chấm một lần (bản mới nhất).
+- grading_concurrency bài nộp được chấm cùng lúc; test case của mọi bài nộp dùng chung pool
+  sandbox riêng (grading_workers tiến trình, mặc định = số core) nên cả lớp nộp sát hạn vẫn
+  tận dụng hết CPU mà không chiếm chỗ của /api/code.
+- Test case đầu chạy trước (C++ biên dịch một lần vào compile cache, lỗi biên dịch thì dừng sớm),
+  các test case còn lại chạy song song.
+- Không chạy được test case (SYSTEM_ERROR) thì bài nộp trở về "submitted" để giáo viên chấm tay.
+- trang_thai lưu trong DB nên bài đang chờ chấm được đưa lại vào hàng đợi khi khởi động.
+- Trước khi chấm, bài nộp được nhận bằng UPDATE có điều kiện (grading -> grading_claimed): nhiều worker
+  uvicorn cùng đưa lại hàng đợi khi khởi động thì mỗi bài vẫn chỉ chạy test case một lần. Bài đã nhận
+  nhưng quá CLAIM_TIMEOUT_SECONDS chưa xong (worker chết giữa chừng) được nhận lại; chấm lỗi thì bài nộp
+  trở về "grading". main.py quét lại các bài này mỗi giờ (requeue_pending), không chờ khởi động lại.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+
+from ..models.assignment import Assignment, Submission, TestCase, TestCaseResult
+from .config import settings
+from .sandbox import SandboxManager
+from .storage import key_from_url, storage
+
+# Số test case tối đa mỗi bài tập (giới hạn hàng đợi của pool chấm bài)
+MAX_TEST_CASES = 50
+# Output lưu lại cho mỗi test case
+STORED_OUTPUT = 2000
+# Bài nộp đã được một worker nhận nhưng chưa lưu kết quả sau thời gian này thì coi như worker đã chết
+CLAIM_TIMEOUT_SECONDS = 600
+
+GRADING = "grading"
+CLAIMED = "grading_claimed"
+
+ACCEPTED = "accepted"
+WRONG_ANSWER = "wrong_answer"
+RUNTIME_ERROR = "runtime_error"
+TIME_LIMIT_EXCEEDED = "time_limit_exceeded"
+COMPILE_ERROR = "compile_error"
+SYSTEM_ERROR = "system_error"
+
+
+def _normalize(text: str) -> str:
+    return (text or "").replace("\r\n", "\n").rstrip()
+
+
+def _floats_equal(actual: str, expected: str, tolerance: float) -> bool:
+    try:
+        a, b = float(actual), float(expected)
+    except ValueError:
+        return actual == expected
+    return abs(a - b) <= tolerance * max(1.0, abs(b))
+
+
+def outputs_match(actual: str, expected: str, mode: str = "exact", tolerance: float = 1e-6) -> bool:
+    """exact: giống hệt (bỏ qua \\r và khoảng trắng cuối); whitespace: so theo token;
+    float: so theo token, số thực sai lệch <= tolerance (tương đối khi |giá trị| > 1)"""
+    if mode == "exact":
+        return _normalize(actual) == _normalize(expected)
+    actual_tokens, expected_tokens = (actual or "").split(), (expected or "").split()
+    if len(actual_tokens) != len(expected_tokens):
+        return False
+    if mode == "whitespace":
+        return actual_tokens == expected_tokens
+    return all(_floats_equal(a, b, tolerance or 0) for a, b in zip(actual_tokens, expected_tokens))
+
+
+def verdict(result: dict, case: TestCase) -> str:
+    if result.get("compile_error"):
+        return COMPILE_ERROR
+    if result.get("timed_out"):
+        return TIME_LIMIT_EXCEEDED
+    if result.get("exit_code") != 0:
+        return RUNTIME_ERROR if result.get("exit_code") is not None else SYSTEM_ERROR
+    if outputs_match(result.get("output", ""), case.ket_qua_mong_doi, case.che_do_so_sanh, case.sai_so):
+        return ACCEPTED
+    return WRONG_ANSWER
+
+
+def compute_score(cases: list[TestCase], verdicts: dict[int, str], max_score) -> Decimal:
+    total = sum(Decimal(str(c.trong_so or 0)) for c in cases)
+    if not total:
+        return Decimal("0")
+    passed = sum(Decimal(str(c.trong_so or 0)) for c in cases if verdicts.get(c.id) == ACCEPTED)
+    score = Decimal(str(max_score if max_score is not None else 10)) * passed / total
+    return score.quantize(Decimal("0.01"))
+
+
+def _claimable():
+    """Bài nộp đang chờ chấm, hoặc đã được nhận nhưng quá hạn (worker chấm đã chết)"""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+    return or_(
+        Submission.trang_thai == GRADING,
+        and_(Submission.trang_thai == CLAIMED, Submission.updated_at < stale_before),
+    )
+
+
+def _read_submission_code(submission: Submission) -> str:
+    if submission.noi_dung:
+        return submission.noi_dung
+    key = key_from_url(submission.file_path)
+    if key:
+        # file_path dạng /static/uploads/assignments/...; đọc qua storage (local hoặc S3)
+        try:
+            with storage.open(key) as f:
+                return f.read().decode("utf-8", errors="replace")
+        except FileNotFoundError:
+            pass
+    return ""
+
+
+class AutoGrader:
+    def __init__(self):
+        self.sandbox: Optional[SandboxManager] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        if not settings.grading_enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.sandbox = SandboxManager(
+            workers=settings.grading_workers or os.cpu_count() or 2,
+            queue_size=settings.grading_concurrency * MAX_TEST_CASES,
+            user_concurrency=0,
+        )
+        await self.sandbox.start()
+        self._tasks = [asyncio.create_task(self._serve()) for _ in range(settings.grading_concurrency)]
+
+        # Bài nộp còn đang chờ chấm từ lần chạy trước
+        for submission_id in await run_in_threadpool(self._claimable_ids):
+            self._enqueue(submission_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self.sandbox:
+            await self.sandbox.stop()
+        self._loop = None
+
+    def accepts(self, language: Optional[str]) -> bool:
+        """Grader đang chạy và sandbox hỗ trợ ngôn ngữ: chỉ khi đó bài nộp mới được đặt trạng thái grading"""
+        return (
+            settings.grading_enabled
+            and self._loop is not None
+            and self.sandbox is not None
+            and bool(language)
+            and self.sandbox.supports(language)
+        )
+
+    def requeue_pending(self) -> int:
+        """Đưa lại vào hàng đợi bài nộp đang chờ chấm hoặc bị nhận quá hạn (gọi định kỳ từ thread nền)"""
+        if self._loop is None:
+            return 0
+        ids = self._claimable_ids()
+        for submission_id in ids:
+            self.enqueue(submission_id)
+        return len(ids)
+
+    def _claimable_ids(self) -> list[int]:
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return [row.id for row in db.query(Submission.id).filter(_claimable())]
+        finally:
+            db.close()
+
+    def enqueue(self, submission_id: int):
+        """Gọi được từ route sync (threadpool) lẫn từ event loop"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._enqueue, submission_id)
+
+    def _enqueue(self, submission_id: int):
+        if submission_id in self._pending:
+            return
+        self._pending.add(submission_id)
+        self._queue.put_nowait(submission_id)
+
+    async def _serve(self):
+        while True:
+            submission_id = await self._queue.get()
+            # Bỏ khỏi pending trước khi chấm: nộp lại trong lúc chấm sẽ được chấm thêm lần nữa
+            self._pending.discard(submission_id)
+            try:
+                await self.grade(submission_id)
+            except Exception as e:
+                print(f"Error grading submission {submission_id}: {e}")
+
+    async def grade(self, submission_id: int):
+        """Đọc dữ liệu rồi đóng session ngay: không giữ kết nối DB trong lúc chạy test case"""
+        loaded = await run_in_threadpool(self._load, submission_id)
+        if not loaded:
+            return
+        submission, assignment, cases, code = loaded
+        try:
+            results = await self.run_cases(submission.user_id, assignment.ngon_ngu, code, cases)
+            await run_in_threadpool(self._save, submission, assignment, cases, results)
+        except Exception:
+            # Trả bài nộp về hàng chờ để lần quét định kỳ (requeue_pending) chấm lại
+            await run_in_threadpool(self._release, submission_id)
+            raise
+
+    def _release(self, submission_id: int):
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            db.query(Submission).filter(Submission.id == submission_id, Submission.trang_thai == CLAIMED).update(
+                {Submission.trang_thai: GRADING}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _load(self, submission_id: int):
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            # Nhận bài nộp: chỉ một worker/tiến trình cập nhật được dòng (rowcount = 1)
+            claimed = (
+                db.query(Submission)
+                .filter(Submission.id == submission_id, _claimable())
+                .update({Submission.trang_thai: CLAIMED}, synchronize_session=False)
+            )
+            db.commit()
+            if not claimed:
+                return None
+            submission = db.get(Submission, submission_id)
+            assignment = db.get(Assignment, submission.bai_tap_id)
+            cases = (
+                db.query(TestCase)
+                .filter(TestCase.bai_tap_id == assignment.id)
+                .order_by(TestCase.thu_tu, TestCase.id)
+                .all()
+            )
+            code = _read_submission_code(submission)
+            db.expunge_all()
+            return submission, assignment, cases, code
+        finally:
+            db.close()
+
+    async def run_cases(self, user_id: int, language: Optional[str], code: str, cases: list[TestCase]) -> dict[int, dict]:
+        if not cases:
+            return {}
+        if not language or not self.sandbox or not self.sandbox.supports(language) or not code.strip():
+            error = "Không có code để chấm" if not code.strip() else f"Không chạy được ngôn ngữ '{language}'"
+            return {c.id: {"error": error, "exit_code": None} for c in cases}
+
+        async def run(case: TestCase) -> dict:
+            return await self.sandbox.execute(user_id, language, code, case.du_lieu_vao, timeout=settings.grading_timeout)
+
+        first = await run(cases[0])
+        results = {cases[0].id: first}
+        if first.get("compile_error"):
+            return {c.id: first for c in cases}
+        rest = await asyncio.gather(*(run(c) for c in cases[1:]))
+        results.update({c.id: r for c, r in zip(cases[1:], rest)})
+        return results
+
+    def _save(self, loaded: Submission, assignment: Assignment, cases: list[TestCase], results: dict[int, dict]):
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            submission = db.get(Submission, loaded.id, with_for_update=True)
+            # Trong lúc chấm, học viên nộp lại (lượt chấm sau sẽ chấm bản mới) hoặc giáo viên chấm tay: bỏ kết quả
+            if not submission or submission.trang_thai != CLAIMED or submission.updated_at != loaded.updated_at:
+                return
+            self._write_results(db, submission, assignment, cases, results)
+        finally:
+            db.close()
+
+    def _write_results(self, db, submission: Submission, assignment: Assignment, cases: list[TestCase], results: dict[int, dict]):
+        db.query(TestCaseResult).filter(TestCaseResult.nop_bai_id == submission.id).delete(synchronize_session=False)
+        verdicts = {case.id: verdict(results[case.id], case) for case in cases}
+        if SYSTEM_ERROR in verdicts.values():
+            # Không chạy được (sandbox tắt, không phải POSIX, ngôn ngữ không hỗ trợ): để giáo viên chấm tay,
+            # không ghi điểm 0 và không báo cho học viên
+            submission.trang_thai = "submitted"
+            db.commit()
+            return
+
+        for case in cases:
+            result = results[case.id]
+            output = result.get("output") or result.get("error") or ""
+            db.add(TestCaseResult(
+                nop_bai_id=submission.id,
+                test_case_id=case.id,
+                ket_qua=verdicts[case.id],
+                thoi_gian=result.get("execution_time"),
+                bo_nho_kb=result.get("memory_kb"),
+                output=output[:STORED_OUTPUT],
+            ))
+
+        score = compute_score(cases, verdicts, assignment.diem_toi_da)
+        passed = sum(1 for v in verdicts.values() if v == ACCEPTED)
+        submission.diem = score
+        submission.trang_thai = "graded"
+        submission.nhan_xet = f"Tự động chấm: {passed}/{len(cases)} test case đạt"
+        if any(v == COMPILE_ERROR for v in verdicts.values()):
+            submission.nhan_xet += " (lỗi biên dịch)"
+        db.commit()
+
+        try:
+            from ..api.routes.notifications import create_notification_for_grade
+            create_notification_for_grade(db, submission.id, assignment.id, submission.user_id, float(score))
+        except Exception as e:
+            print(f"Failed to create notification: {e}")
+
+
+grader = AutoGrader()
@@ -0,0 +1,373 @@
+"""
+Đóng gói video bài học thành HLS nhiều mức bitrate (adaptive bitrate).
+
+- Sau khi upload (content.create_lesson / update_lesson), bài học được đặt hls_status = "pending"
+  và đưa vào hàng đợi; ffmpeg chạy nền (nice 10) giải mã một lần, scale ra các mức trong LADDER
+  (không vượt độ phân giải gốc), cắt segment hls_segment_seconds giây và ghi master playlist.
+- Output: uploads/hls/<lesson_id>/<version>/ trong storage (core/storage.py) với version = tên file video gốc
+  (sha256, không đuôi), nên nội dung không bao giờ đổi và /api/hls/... được cache lâu dài (immutable).
+  ffmpeg đọc video qua storage.input_url (file local hoặc presigned URL của S3), ghi vào thư mục tạm
+  local rồi storage.put_dir (local: rename; S3: upload từng file).
+- Chưa ready (hoặc không có ffmpeg) thì client tiếp tục phát video_path qua /api/video.
+- Trong lúc đóng gói mà giáo viên đổi video: kết quả cũ bị bỏ, video mới được đóng gói lại.
+- hls_status lưu trong DB nên bài học đang chờ được đưa lại vào hàng đợi khi khởi động.
+- Trước khi chạy ffmpeg, bài học được nhận bằng UPDATE có điều kiện (pending -> processing, ghi
+  hls_claimed_at): nhiều worker uvicorn cùng đưa lại hàng đợi thì mỗi video vẫn chỉ đóng gói một lần.
+  Dòng processing quá claim_timeout() (worker chết giữa chừng) mới được nhận lại.
+"""
+import asyncio
+import json
+import os
+import posixpath
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+
+from ..models.course_content import CourseContent
+from .config import settings
+from .storage import normalize_key, storage
+
+VIDEO_PREFIX = "uploads/videos"
+HLS_PREFIX = "uploads/hls"
+MASTER_PLAYLIST = "master.m3u8"
+
+PENDING = "pending"
+PROCESSING = "processing"
+READY = "ready"
+FAILED = "failed"
+
+
+class Rendition(NamedTuple):
+    height: int
+    video_kbps: int
+    audio_kbps: int
+
+
+LADDER = [
+    Rendition(1080, 5000, 192),
+    Rendition(720, 2800, 128),
+    Rendition(480, 1400, 128),
+    Rendition(360, 800, 96),
+]
+
+
+class PackagingError(Exception):
+    pass
+
+
+def source_key(video_path: Optional[str]) -> Optional[str]:
+    """Key storage của video_path (/static/uploads/videos/<file> hoặc /api/video/<file>); None nếu là link ngoài"""
+    if not video_path:
+        return None
+    for prefix in ("/static/uploads/videos/", "/api/video/"):
+        if video_path.startswith(prefix):
+            key = normalize_key(f"{VIDEO_PREFIX}/{video_path[len(prefix):]}")
+            if key and storage.stat(key) is not None:
+                return key
+    return None
+
+
+def select_renditions(source_height: int) -> list[Rendition]:
+    renditions = [r for r in LADDER if r.height <= source_height]
+    if not renditions:
+        # Video nhỏ hơn mức thấp nhất: giữ nguyên độ phân giải
+        lowest = LADDER[-1]
+        renditions = [Rendition(max(source_height - source_height % 2, 2), lowest.video_kbps, lowest.audio_kbps)]
+    return renditions
+
+
+def build_ffmpeg_args(
+    ffmpeg: str,
+    source: str,
+    out_dir: str,
+    renditions: list[Rendition],
+    has_audio: bool,
+    segment_seconds: int,
+) -> list[str]:
+    count = len(renditions)
+    splits = "".join(f"[s{i}]" for i in range(count))
+    filters = [f"[0:v]split={count}{splits}"]
+    filters += [f"[s{i}]scale=-2:{r.height}[v{i}]" for i, r in enumerate(renditions)]
+
+    args = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source, "-filter_complex", ";".join(filters)]
+    for i, r in enumerate(renditions):
+        args += [
+            "-map", f"[v{i}]",
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", f"{r.video_kbps}k",
+            f"-maxrate:v:{i}", f"{r.video_kbps * 107 // 100}k",
+            f"-bufsize:v:{i}", f"{r.video_kbps * 3 // 2}k",
+        ]
+    if has_audio:
+        for i, r in enumerate(renditions):
+            args += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", f"{r.audio_kbps}k"]
+        args += ["-ac", "2"]
+    streams = " ".join(f"v:{i},a:{i}" if has_audio else f"v:{i}" for i in range(count))
+    args += [
+        "-preset", "veryfast",
+        "-profile:v", "main",
+        "-pix_fmt", "yuv420p",
+        # Keyframe đúng ranh giới segment để chuyển mức bitrate không bị giật
+        "-sc_threshold", "0",
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(out_dir, "v%v", "seg_%05d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", streams,
+        os.path.join(out_dir, "v%v", "index.m3u8"),
+    ]
+    return args
+
+
+def claim_timeout() -> timedelta:
+    # ffmpeg tối đa hls_timeout giây, cộng thời gian probe và upload lên storage
+    return timedelta(seconds=settings.hls_timeout + 600)
+
+
+def _claimable():
+    """Bài học chờ đóng gói, hoặc đang processing nhưng quá hạn (worker đóng gói đã chết)"""
+    stale_before = datetime.now(timezone.utc) - claim_timeout()
+    return or_(
+        CourseContent.hls_status == PENDING,
+        and_(
+            CourseContent.hls_status == PROCESSING,
+            or_(CourseContent.hls_claimed_at.is_(None), CourseContent.hls_claimed_at < stale_before),
+        ),
+    )
+
+
+def _lesson_prefix(lesson_id: int) -> str:
+    return f"{HLS_PREFIX}/{lesson_id}"
+
+
+def _remove_versions(lesson_id: int, keep: Optional[str]):
+    """Xóa các bản đóng gói khác keep (bỏ qua thư mục tạm của job đang chạy)"""
+    prefix = _lesson_prefix(lesson_id)
+    versions = {info.key[len(prefix) + 1:].split("/", 1)[0] for info in storage.list(prefix)}
+    for version in versions:
+        if version != keep and not version.startswith("."):
+            storage.delete_prefix(f"{prefix}/{version}")
+
+
+def _lower_priority():
+    os.nice(10)
+
+
+async def _run(args: list[str], timeout: Optional[float] = None) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        preexec_fn=_lower_priority if os.name == "posix" else None,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise PackagingError(stderr.decode(errors="replace").strip()[-1000:] or f"exit code {process.returncode}")
+    return stdout
+
+
+class HlsPackager:
+    def __init__(self):
+        self.ffmpeg: Optional[str] = None
+        self.ffprobe: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def available(self) -> bool:
+        return self._loop is not None
+
+    async def start(self):
+        from ..db.session import SessionLocal
+
+        if not settings.hls_enabled:
+            return
+        self.ffmpeg = shutil.which(settings.ffmpeg_path)
+        self.ffprobe = shutil.which(settings.ffprobe_path)
+        if not self.ffmpeg or not self.ffprobe:
+            print("HLS packaging disabled: ffmpeg/ffprobe not found")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._serve()) for _ in range(settings.hls_concurrency)]
+
+        # Bài học còn đang chờ đóng gói từ lần chạy trước
+        def pending_ids():
+            db = SessionLocal()
+            try:
+                query = db.query(CourseContent.id).filter(_claimable())
+                return [row.id for row in query]
+            finally:
+                db.close()
+
+        for lesson_id in await run_in_threadpool(pending_ids):
+            self._enqueue(lesson_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+    def enqueue(self, lesson_id: int):
+        """Gọi được từ route sync (threadpool) lẫn từ event loop"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._enqueue, lesson_id)
+
+    def _enqueue(self, lesson_id: int):
+        if lesson_id in self._pending:
+            return
+        self._pending.add(lesson_id)
+        self._queue.put_nowait(lesson_id)
+
+    async def _serve(self):
+        while True:
+            lesson_id = await self._queue.get()
+            self._pending.discard(lesson_id)
+            try:
+                await self.package(lesson_id)
+            except Exception as e:
+                print(f"Error packaging HLS for lesson {lesson_id}: {e}")
+
+    async def package(self, lesson_id: int):
+        loaded = await run_in_threadpool(self._load, lesson_id)
+        if not loaded:
+            return
+        video_path, key = loaded
+        version = posixpath.splitext(posixpath.basename(key))[0]
+        prefix = _lesson_prefix(lesson_id)
+        work_dir = tempfile.mkdtemp(prefix=".tmp-", dir=storage.temp_dir(prefix))
+        try:
+            # Presigned URL phải còn hạn suốt thời gian ffmpeg chạy
+            source = storage.input_url(key, settings.hls_timeout + 600)
+            height, has_audio = await self.probe(source)
+            renditions = select_renditions(height)
+            args = build_ffmpeg_args(self.ffmpeg, source, work_dir, renditions, has_audio, settings.hls_segment_seconds)
+            await _run(args, timeout=settings.hls_timeout)
+            await run_in_threadpool(storage.put_dir, work_dir, f"{prefix}/{version}")
+        except asyncio.CancelledError:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        except Exception as e:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            await run_in_threadpool(self._fail, lesson_id, video_path, str(e))
+            raise
+        await run_in_threadpool(self._save, lesson_id, video_path, version, renditions)
+
+    async def probe(self, source: str) -> tuple[int, bool]:
+        stdout = await _run([
+            self.ffprobe, "-v", "error",
+            "-show_entries", "stream=codec_type,height",
+            "-of", "json", source,
+        ], timeout=60)
+        streams = json.loads(stdout or b"{}").get("streams", [])
+        heights = [s.get("height") or 0 for s in streams if s.get("codec_type") == "video"]
+        if not heights or not heights[0]:
+            raise PackagingError("Không tìm thấy luồng video")
+        return heights[0], any(s.get("codec_type") == "audio" for s in streams)
+
+    def _load(self, lesson_id: int):
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            lesson = db.get(CourseContent, lesson_id)
+            if not lesson:
+                storage.delete_prefix(_lesson_prefix(lesson_id))
+                return None
+            if lesson.hls_status not in (PENDING, PROCESSING):
+                # Video đổi sang link ngoài: xóa bản đóng gói cũ
+                keep = lesson.hls_path.split("/")[-2] if lesson.hls_status == READY and lesson.hls_path else None
+                _remove_versions(lesson_id, keep)
+                return None
+            key = source_key(lesson.video_path)
+            if key is None:
+                # Video là link ngoài (YouTube...) hoặc file đã bị xóa: không đóng gói
+                lesson.hls_status = None
+                db.commit()
+                return None
+            # Nhận bài học: chỉ một worker/tiến trình cập nhật được dòng (rowcount = 1)
+            claimed = (
+                db.query(CourseContent)
+                .filter(
+                    CourseContent.id == lesson_id,
+                    CourseContent.video_path == lesson.video_path,
+                    _claimable(),
+                )
+                .update(
+                    {CourseContent.hls_status: PROCESSING, CourseContent.hls_claimed_at: datetime.now(timezone.utc)},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return None
+            return lesson.video_path, key
+        finally:
+            db.close()
+
+    def _fail(self, lesson_id: int, video_path: str, error: str):
+        from ..db.session import SessionLocal
+
+        print(f"HLS packaging failed for lesson {lesson_id}: {error}")
+        db = SessionLocal()
+        try:
+            lesson = db.get(CourseContent, lesson_id, with_for_update=True)
+            if lesson and lesson.video_path == video_path and lesson.hls_status == PROCESSING:
+                lesson.hls_status = FAILED
+                db.commit()
+        finally:
+            db.close()
+
+    def _save(self, lesson_id: int, video_path: str, version: str, renditions: list[Rendition]):
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            lesson = db.get(CourseContent, lesson_id, with_for_update=True)
+            # Video đã bị đổi trong lúc đóng gói: bỏ kết quả (video mới đã được xếp hàng)
+            if not lesson or lesson.video_path != video_path or lesson.hls_status != PROCESSING:
+                storage.delete_prefix(f"{_lesson_prefix(lesson_id)}/{version}")
+                return
+            lesson.hls_status = READY
+            lesson.hls_path = f"/api/hls/{lesson_id}/{version}/{MASTER_PLAYLIST}"
+            lesson.hls_renditions = [{"height": r.height, "bitrate": r.video_kbps} for r in renditions]
+            db.commit()
+        finally:
+            db.close()
+
+        # Bản đóng gói của video cũ
+        _remove_versions(lesson_id, keep=version)
+
+
+def schedule_packaging(lesson: CourseContent) -> bool:
+    """Đặt lại trạng thái HLS khi video_path của bài học thay đổi (gọi trước commit).
+    Trả về True nếu cần packager.enqueue(lesson.id) sau commit (đóng gói video mới / dọn bản cũ)."""
+    lesson.hls_path = None
+    lesson.hls_renditions = None
+    lesson.hls_status = None
+    if not packager.available:
+        return False
+    if source_key(lesson.video_path) is not None:
+        lesson.hls_status = PENDING
+    return True
+
+
+packager = HlsPackager()
@@ -0,0 +1,229 @@
+"""
+Xử lý ảnh upload (hình ảnh thảo luận, ảnh khóa học) và ảnh thu nhỏ theo kích thước hiển thị.
+
+- Khi upload (UploadKind.prepare, trước khi đặt tên theo sha256): giải mã để chắc là ảnh thật, xoay theo
+  EXIF rồi ghi lại không kèm metadata (EXIF/GPS, text chunk); giữ ICC profile để không lệch màu.
+- Ngay sau khi lưu, generate_variants tạo sẵn bản WebP và JPEG ở các độ rộng WIDTHS (giải mã một lần).
+- /static/uploads/...?w=320 (api/routes/files.py) trả bản gần nhất >= w, WebP nếu trình duyệt nhận
+  (Accept), dùng được trực tiếp trong srcset. Bản thu nhỏ nằm trong cache trên đĩa local của mỗi node,
+  LRU theo mtime, giới hạn settings.image_cache_max_mb; bị xóa thì tạo lại khi có request.
+- Pillow là tùy chọn: không cài thì ảnh được lưu nguyên bản và luôn trả ảnh gốc.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from .config import settings
+from .storage import storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow chưa cài: bỏ qua xử lý ảnh
+    Image = ImageOps = None
+
+WIDTHS = (160, 320, 640, 960, 1280)
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"})
+# Định dạng được ghi lại khi làm sạch metadata (GIF động giữ nguyên)
+SANITIZE_FORMATS = {"JPEG", "PNG", "WEBP"}
+MAX_PIXELS = 40_000_000
+QUALITY = {"webp": 80, "jpeg": 82}
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "elearning_image_variants")
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def is_image(key: str) -> bool:
+    return os.path.splitext(key)[1].lower() in IMAGE_EXTENSIONS
+
+
+def snap_width(width: int) -> int:
+    """Độ rộng nhỏ nhất trong WIDTHS >= width (giới hạn số bản thu nhỏ của mỗi ảnh)"""
+    for candidate in WIDTHS:
+        if candidate >= width:
+            return candidate
+    return WIDTHS[-1]
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    if requested in FORMATS:
+        return requested
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+
+def _invalid_image() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File không phải hình ảnh hợp lệ")
+
+
+def _open(f) -> "Image.Image":
+    im = Image.open(f)
+    if im.width * im.height > MAX_PIXELS:
+        # Chống ảnh "bom giải nén": chỉ mới đọc header
+        raise _invalid_image()
+    return im
+
+
+def sanitize_image(path: str) -> bool:
+    """Prepare cho UploadKind ảnh: ghi lại ảnh không kèm metadata. True nếu file đã được ghi lại"""
+    if Image is None:
+        return False
+    try:
+        with _open(path) as im:
+            if im.format not in SANITIZE_FORMATS or getattr(im, "is_animated", False):
+                im.verify()
+                return False
+            im.load()
+            icc_profile = im.info.get("icc_profile")
+            out = ImageOps.exif_transpose(im)
+            params = {"icc_profile": icc_profile} if icc_profile else {}
+            if im.format == "JPEG":
+                params.update(quality=90, optimize=True)
+            elif im.format == "WEBP":
+                params.update(quality=90)
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".sanitize-", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    out.save(f, format=im.format, **params)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+    except HTTPException:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        # UnidentifiedImageError là OSError
+        raise _invalid_image()
+    os.replace(tmp_path, path)
+    return True
+
+
+class VariantCache:
+    """Cache bản thu nhỏ trên đĩa, cùng cách làm với core/compile_cache.py (LRU theo mtime)"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str, width: int, fmt: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}_{width}.{fmt}")
+
+    def lookup(self, key: str, width: int, fmt: str) -> Optional[str]:
+        path = self.path(key, width, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, key: str, width: int, fmt: str) -> str:
+        """Đường dẫn bản thu nhỏ (tạo nếu chưa có); FileNotFoundError nếu ảnh gốc không tồn tại"""
+        path = self.lookup(key, width, fmt)
+        if path:
+            return path
+        with storage.open(key) as f, _open(f) as im:
+            self._write(_prepare(im), key, width, fmt)
+        self.evict()
+        return self.path(key, width, fmt)
+
+    def generate(self, key: str):
+        """Tạo mọi bản thu nhỏ của ảnh vừa upload, thu nhỏ dần từ bản lớn nhất"""
+        with storage.open(key) as f, _open(f) as im:
+            current = _prepare(im)
+            for width in sorted(WIDTHS, reverse=True):
+                current = _resize(current, width)
+                for fmt in FORMATS:
+                    self._write(current, key, width, fmt)
+        self.evict()
+
+    def _write(self, im: "Image.Image", key: str, width: int, fmt: str):
+        im = _resize(im, width)
+        if fmt == "jpeg" and im.mode != "RGB":
+            background = Image.new("RGB", im.size, (255, 255, 255))
+            background.paste(im, mask=im.getchannel("A") if "A" in im.getbands() else None)
+            im = background
+        fd, tmp_path = tempfile.mkstemp(prefix=".variant-", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                im.save(f, format=fmt.upper(), quality=QUALITY[fmt], optimize=fmt == "jpeg", method=4)
+            os.replace(tmp_path, self.path(key, width, fmt))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def evict(self):
+        """Xóa bản ít dùng nhất cho đến khi tổng dung lượng <= max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def _prepare(im: "Image.Image") -> "Image.Image":
+    im.seek(0)  # GIF động: lấy khung đầu
+    im = ImageOps.exif_transpose(im)
+    return im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+
+
+def _resize(im: "Image.Image", width: int) -> "Image.Image":
+    """Thu về độ rộng width, giữ tỉ lệ, không phóng to"""
+    if im.width <= width:
+        return im
+    height = max(round(im.height * width / im.width), 1)
+    return im.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+
+variants = VariantCache(
+    settings.image_cache_dir or None,
+    settings.image_cache_max_mb * 1024 * 1024,
+)
+
+
+def generate_variants(key: str):
+    """Gọi sau khi lưu ảnh upload; lỗi không làm hỏng request upload (bản thu nhỏ tạo lại khi cần)"""
+    if Image is None or not is_image(key):
+        return
+    try:
+        variants.generate(key)
+    except Exception as e:
+        print(f"Could not generate image variants for {key}: {e}")
+
+
+def variant_path(key: str, width: int, fmt: str) -> Optional[str]:
+    """Bản thu nhỏ cho request ?w=; None nếu không xử lý được (khi đó trả ảnh gốc)"""
+    if Image is None or not is_image(key):
+        return None
+    try:
+        return variants.get_or_create(key, snap_width(width), fmt)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        print(f"Could not resize image {key}: {e}")
+        return None
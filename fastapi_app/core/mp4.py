@@ -0,0 +1,271 @@
+"""
+Xử lý MP4/MOV (ISO-BMFF) sau khi upload, thuần Python, không cần ffprobe.
+
+- read_metadata: đọc header các box cấp cao nhất rồi chỉ nạp moov vào bộ nhớ để lấy thời lượng (mvhd),
+  độ phân giải (tkhd của track 'vide') và bitrate trung bình.
+- faststart: nếu moov nằm sau mdat, ghi lại file với moov ngay sau ftyp để player bắt đầu phát
+  mà không phải request Range xuống cuối file. Offset chunk trong stco/co64 được dời theo vị trí mới
+  (tự chuyển stco -> co64 nếu vượt 4GB); phần còn lại copy theo từng khối, không đọc cả file vào RAM.
+  File mới ghi vào file tạm cùng thư mục rồi os.replace. Với upload, faststart_video chạy trên file tạm
+  trước khi file được đặt tên theo sha256 (core/blob_store.py) vì blob không được sửa tại chỗ.
+"""
+import bisect
+import os
+import shutil
+import struct
+import tempfile
+from typing import BinaryIO, NamedTuple, Optional
+
+MP4_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+# Box được duyệt đệ quy khi dời offset (đường đi tới stco/co64)
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# moov lớn hơn thì bỏ qua (file bất thường)
+MAX_MOOV = 64 * 1024 * 1024
+COPY_CHUNK = 1024 * 1024
+
+
+class Mp4Error(Exception):
+    pass
+
+
+class Box(NamedTuple):
+    type: bytes
+    offset: int
+    size: int
+    header_size: int
+
+
+class VideoMetadata(NamedTuple):
+    duration: float  # giây
+    width: Optional[int]
+    height: Optional[int]
+    bitrate: Optional[int]  # kbps, trung bình cả file
+
+
+def _top_level_boxes(f, file_size: int) -> list[Box]:
+    boxes = []
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise Mp4Error("Header box bị cắt cụt")
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size or offset + size > file_size:
+            raise Mp4Error(f"Kích thước box {box_type!r} không hợp lệ")
+        boxes.append(Box(box_type, offset, size, header_size))
+        offset += size
+    return boxes
+
+
+def _children(data: bytes) -> list[tuple[bytes, bytes]]:
+    """(type, payload) của các box con trong payload của một box container"""
+    result = []
+    offset = 0
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise Mp4Error(f"Kích thước box {box_type!r} không hợp lệ")
+        result.append((box_type, data[offset + header_size:offset + size]))
+        offset += size
+    return result
+
+
+def _child(data: bytes, box_type: bytes) -> Optional[bytes]:
+    for child_type, payload in _children(data):
+        if child_type == box_type:
+            return payload
+    return None
+
+
+def _read_box(f, box: Box) -> bytes:
+    f.seek(box.offset + box.header_size)
+    return f.read(box.size - box.header_size)
+
+
+def _load_moov(f, boxes: list[Box]) -> tuple[Box, bytes]:
+    moov = next((b for b in boxes if b.type == b"moov"), None)
+    if moov is None:
+        raise Mp4Error("Không có box moov")
+    if moov.size > MAX_MOOV:
+        raise Mp4Error("Box moov quá lớn")
+    return moov, _read_box(f, moov)
+
+
+def _parse_metadata(moov: bytes, file_size: int) -> VideoMetadata:
+    mvhd = _child(moov, b"mvhd")
+    if mvhd is None:
+        raise Mp4Error("Không có box mvhd")
+    if mvhd[0] == 1:
+        timescale, duration = struct.unpack_from(">IQ", mvhd, 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", mvhd, 12)
+    seconds = duration / timescale if timescale else 0.0
+
+    width = height = None
+    for box_type, trak in _children(moov):
+        if box_type != b"trak":
+            continue
+        mdia = _child(trak, b"mdia")
+        hdlr = _child(mdia, b"hdlr") if mdia is not None else None
+        tkhd = _child(trak, b"tkhd")
+        if hdlr is None or tkhd is None or hdlr[8:12] != b"vide" or len(tkhd) < 8:
+            continue
+        # Hai trường cuối của tkhd: width, height dạng fixed-point 16.16
+        w, h = struct.unpack_from(">II", tkhd, len(tkhd) - 8)
+        width, height = w >> 16, h >> 16
+        break
+
+    bitrate = round(file_size * 8 / seconds / 1000) if seconds else None
+    return VideoMetadata(seconds, width, height, bitrate)
+
+
+def read_metadata(path: str) -> VideoMetadata:
+    with open(path, "rb") as f:
+        return read_metadata_from(f, os.path.getsize(path))
+
+
+def read_metadata_from(f: BinaryIO, file_size: int) -> VideoMetadata:
+    """Như read_metadata, với file-like seek được (vd object S3 đọc theo Range)"""
+    _, moov = _load_moov(f, _top_level_boxes(f, file_size))
+    return _parse_metadata(moov, file_size)
+
+
+class _NeedCo64(Exception):
+    pass
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _rebuild(data: bytes, shift, co64: bool) -> bytes:
+    """Ghi lại payload của container, dời mọi offset trong stco/co64 bằng shift(offset)"""
+    out = []
+    for box_type, payload in _children(data):
+        if box_type in CONTAINERS:
+            out.append(_box(box_type, _rebuild(payload, shift, co64)))
+        elif box_type in (b"stco", b"co64"):
+            count = struct.unpack_from(">I", payload, 4)[0]
+            fmt = ">%dQ" if box_type == b"co64" else ">%dI"
+            offsets = [shift(o) for o in struct.unpack_from(fmt % count, payload, 8)]
+            if co64 or box_type == b"co64":
+                out.append(_box(b"co64", payload[:8] + struct.pack(">%dQ" % count, *offsets)))
+            else:
+                if offsets and max(offsets) > 0xFFFFFFFF:
+                    raise _NeedCo64()
+                out.append(_box(b"stco", payload[:8] + struct.pack(">%dI" % count, *offsets)))
+        elif box_type == b"cmov":
+            raise Mp4Error("moov nén (cmov) không hỗ trợ")
+        else:
+            out.append(_box(box_type, payload))
+    return b"".join(out)
+
+
+def _copy_range(src, dst, offset: int, length: int):
+    src.seek(offset)
+    while length > 0:
+        data = src.read(min(COPY_CHUNK, length))
+        if not data:
+            raise Mp4Error("File bị cắt cụt khi copy")
+        dst.write(data)
+        length -= len(data)
+
+
+def faststart(path: str) -> bool:
+    """Đưa moov lên trước mdat. Trả về True nếu file đã được ghi lại"""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        boxes = _top_level_boxes(f, file_size)
+        types = [b.type for b in boxes]
+        if b"mdat" not in types or b"moof" in types:
+            # Không có dữ liệu hoặc MP4 phân mảnh (offset tính theo moof): giữ nguyên
+            return False
+        moov_box, moov = _load_moov(f, boxes)
+        if types.index(b"moov") < types.index(b"mdat"):
+            return False
+
+        # ftyp đứng đầu, rồi moov, rồi các box còn lại theo thứ tự cũ
+        rest = [b for b in boxes if b.type not in (b"ftyp", b"moov")]
+        order = [b for b in boxes if b.type == b"ftyp"] + [moov_box] + rest
+        starts = [b.offset for b in boxes]
+
+        def layout(moov_size: int):
+            new_offsets = {}
+            position = 0
+            for b in order:
+                new_offsets[b.offset] = position
+                position += moov_size if b is moov_box else b.size
+            return new_offsets
+
+        def shifter(new_offsets):
+            def shift(offset: int) -> int:
+                i = bisect.bisect_right(starts, offset) - 1
+                if i < 0 or boxes[i].type == b"moov" or offset >= boxes[i].offset + boxes[i].size:
+                    raise Mp4Error("Offset chunk nằm ngoài dữ liệu")
+                return new_offsets[boxes[i].offset] + offset - boxes[i].offset
+            return shift
+
+        # Kích thước moov không phụ thuộc giá trị offset, chỉ phụ thuộc stco hay co64
+        new_moov = None
+        for co64 in (False, True):
+            size = 8 + len(_rebuild(moov, lambda o: 0, co64))
+            try:
+                new_moov = _box(b"moov", _rebuild(moov, shifter(layout(size)), co64))
+                break
+            except _NeedCo64:
+                continue
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".faststart-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for b in order:
+                    if b is moov_box:
+                        out.write(new_moov)
+                    else:
+                        _copy_range(f, out, b.offset, b.size)
+            shutil.copymode(path, tmp_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    os.replace(tmp_path, path)
+    return True
+
+
+def _is_mp4(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in MP4_EXTENSIONS
+
+
+def faststart_video(path: str) -> bool:
+    """Faststart cho file vừa upload (trước khi lưu vào kho); lỗi thì giữ nguyên file. True nếu đã ghi lại"""
+    if not _is_mp4(path):
+        return False
+    try:
+        return faststart(path)
+    except (Mp4Error, struct.error, OSError) as e:
+        print(f"Could not faststart video {path}: {e}")
+        return False
+
+
+def probe_video(f: BinaryIO, file_size: int, name: str) -> Optional[VideoMetadata]:
+    """Metadata của video đã lưu; None nếu không phải MP4/MOV đọc được"""
+    if not _is_mp4(name):
+        return None
+    try:
+        return read_metadata_from(f, file_size)
+    except (Mp4Error, struct.error, OSError) as e:
+        print(f"Could not read video metadata {name}: {e}")
+        return None
@@ -0,0 +1,202 @@
+"""
+Tóm tắt tiến độ (bảng progress_summary): số bài đã hoàn thành và tổng số bài của mỗi (user, khóa học).
+
+- Số bài hoàn thành: hook ORM của Progress (insert/update/delete, chỉ tính dòng có lesson_id),
+  cộng dồn bằng INSERT ... ON CONFLICT DO UPDATE trong cùng transaction.
+- Tổng số bài: hook ORM của CourseContent cộng/trừ cho mọi dòng của khóa học khi thêm/xóa bài;
+  dòng mới tạo lấy tổng bằng COUNT một lần.
+- Đọc: get_counts là lookup theo khóa chính (POST /progress, chứng nhận, lịch sử học tập).
+- backfill_progress_summary tính lại toàn bộ; reconcile_progress_summary chỉ sửa dòng lệch (chạy định kỳ).
+"""
+from sqlalchemy import and_, case, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.course_content import CourseContent
+from ..models.progress import Progress, ProgressSummary
+
+
+def _insert(dialect_name: str):
+    # ON CONFLICT: PostgreSQL (production) và SQLite (dev) đều hỗ trợ
+    if dialect_name == "sqlite":
+        return sqlite.insert(ProgressSummary)
+    return postgresql.insert(ProgressSummary)
+
+
+def _lesson_count(course_id):
+    return select(func.count(CourseContent.id)).where(CourseContent.khoa_hoc_id == course_id)
+
+
+def _completed_count(user_id, course_id):
+    return select(func.count(Progress.id)).where(
+        Progress.user_id == user_id,
+        Progress.course_id == course_id,
+        Progress.lesson_id.isnot(None),
+        Progress.completed.is_(True),
+    )
+
+
+def percentage(completed: int, total: int) -> float:
+    return round(completed / total * 100, 2) if total else 0.0
+
+
+def completed_delta_stmt(dialect_name: str, user_id: int, course_id: int, delta: int):
+    """Cộng delta vào số bài hoàn thành; dòng chưa có thì tạo với tổng số bài hiện tại"""
+    stmt = _insert(dialect_name).values(
+        user_id=user_id,
+        course_id=course_id,
+        completed_lessons=max(delta, 0),
+        total_lessons=_lesson_count(course_id).scalar_subquery(),
+    )
+    column = ProgressSummary.completed_lessons
+    return stmt.on_conflict_do_update(
+        index_elements=[ProgressSummary.user_id, ProgressSummary.course_id],
+        set_={"completed_lessons": case((column + delta < 0, 0), else_=column + delta), "updated_at": func.now()},
+    )
+
+
+def total_delta_stmt(course_id: int, delta: int):
+    column = ProgressSummary.total_lessons
+    return (
+        update(ProgressSummary)
+        .where(ProgressSummary.course_id == course_id)
+        .values(total_lessons=case((column + delta < 0, 0), else_=column + delta))
+    )
+
+
+def get_counts(db: Session, user_id: int, course_id: int) -> tuple[int, int]:
+    """(số bài hoàn thành, tổng số bài); chưa có dòng (chưa hoàn thành bài nào) thì đếm tổng số bài"""
+    row = db.execute(
+        select(ProgressSummary.completed_lessons, ProgressSummary.total_lessons).where(
+            ProgressSummary.user_id == user_id, ProgressSummary.course_id == course_id
+        )
+    ).first()
+    if row is not None:
+        return row.completed_lessons, row.total_lessons
+    return 0, db.scalar(_lesson_count(course_id)) or 0
+
+
+def get_user_counts(db: Session, user_id: int, course_ids: list[int]) -> dict[int, tuple[int, int]]:
+    """get_counts cho nhiều khóa học: một query vào progress_summary, một query đếm bài cho khóa còn thiếu"""
+    if not course_ids:
+        return {}
+    counts = {
+        row.course_id: (row.completed_lessons, row.total_lessons)
+        for row in db.execute(
+            select(ProgressSummary).where(ProgressSummary.user_id == user_id, ProgressSummary.course_id.in_(course_ids))
+        ).scalars()
+    }
+    missing = [course_id for course_id in course_ids if course_id not in counts]
+    if missing:
+        rows = db.execute(
+            select(CourseContent.khoa_hoc_id, func.count(CourseContent.id))
+            .where(CourseContent.khoa_hoc_id.in_(missing))
+            .group_by(CourseContent.khoa_hoc_id)
+        ).all()
+        totals = dict(rows)
+        counts.update({course_id: (0, totals.get(course_id, 0)) for course_id in missing})
+    return counts
+
+
+def backfill_progress_summary(db: Session) -> int:
+    """Tính lại mọi dòng từ progress và chi_tiet_khoa_hoc trong một lượt GROUP BY; trả về số dòng"""
+    completed = func.sum(case((and_(Progress.completed.is_(True), Progress.lesson_id.isnot(None)), 1), else_=0))
+    aggregate = select(
+        Progress.user_id,
+        Progress.course_id,
+        completed,
+        _lesson_count(Progress.course_id).scalar_subquery(),
+    ).group_by(Progress.user_id, Progress.course_id)
+    stmt = _insert(db.bind.dialect.name).from_select(
+        ["user_id", "course_id", "completed_lessons", "total_lessons"], aggregate
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProgressSummary.user_id, ProgressSummary.course_id],
+        set_={
+            "completed_lessons": stmt.excluded.completed_lessons,
+            "total_lessons": stmt.excluded.total_lessons,
+            "updated_at": func.now(),
+        },
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount or 0
+
+
+def check_progress_summary(db: Session) -> dict:
+    """Kiểm tra nhất quán, không sửa: số dòng lệch và số (user, khóa học) có progress nhưng chưa có dòng"""
+    completed = _completed_count(ProgressSummary.user_id, ProgressSummary.course_id).scalar_subquery()
+    total = _lesson_count(ProgressSummary.course_id).scalar_subquery()
+    drifted = db.scalar(
+        select(func.count()).select_from(ProgressSummary)
+        .where((ProgressSummary.completed_lessons != completed) | (ProgressSummary.total_lessons != total))
+    )
+    pairs = select(Progress.user_id, Progress.course_id).distinct().subquery()
+    missing = db.scalar(
+        select(func.count())
+        .select_from(pairs)
+        .outerjoin(
+            ProgressSummary,
+            and_(ProgressSummary.user_id == pairs.c.user_id, ProgressSummary.course_id == pairs.c.course_id),
+        )
+        .where(ProgressSummary.user_id.is_(None))
+    )
+    return {"drifted": drifted or 0, "missing": missing or 0}
+
+
+def reconcile_progress_summary(db: Session) -> int:
+    """Kiểm tra nhất quán: sửa các dòng lệch bằng một câu UPDATE; trả về số dòng đã sửa"""
+    completed = _completed_count(ProgressSummary.user_id, ProgressSummary.course_id).scalar_subquery()
+    total = _lesson_count(ProgressSummary.course_id).scalar_subquery()
+    result = db.execute(
+        update(ProgressSummary)
+        .where((ProgressSummary.completed_lessons != completed) | (ProgressSummary.total_lessons != total))
+        .values(completed_lessons=completed, total_lessons=total)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def _counts_lesson(target) -> bool:
+    return target.lesson_id is not None
+
+
+def _on_progress_insert(mapper, connection, target):
+    if target.completed and _counts_lesson(target):
+        connection.execute(completed_delta_stmt(connection.dialect.name, target.user_id, target.course_id, 1))
+
+
+def _on_progress_update(mapper, connection, target):
+    history = inspect(target).attrs.completed.history
+    if not history.has_changes() or not _counts_lesson(target):
+        return
+    previous = bool(history.deleted[0]) if history.deleted else False
+    if previous == bool(target.completed):
+        return
+    delta = 1 if target.completed else -1
+    connection.execute(completed_delta_stmt(connection.dialect.name, target.user_id, target.course_id, delta))
+
+
+def _on_progress_delete(mapper, connection, target):
+    if target.completed and _counts_lesson(target):
+        connection.execute(completed_delta_stmt(connection.dialect.name, target.user_id, target.course_id, -1))
+
+
+def _on_lesson_insert(mapper, connection, target):
+    connection.execute(total_delta_stmt(target.khoa_hoc_id, 1))
+
+
+def _on_lesson_delete(mapper, connection, target):
+    connection.execute(total_delta_stmt(target.khoa_hoc_id, -1))
+
+
+def register_progress_events():
+    """Cập nhật progress_summary cùng transaction với thay đổi Progress/CourseContent"""
+    if event.contains(Progress, "after_insert", _on_progress_insert):
+        return
+    event.listen(Progress, "after_insert", _on_progress_insert)
+    event.listen(Progress, "after_update", _on_progress_update)
+    event.listen(Progress, "after_delete", _on_progress_delete)
+    event.listen(CourseContent, "after_insert", _on_lesson_insert)
+    event.listen(CourseContent, "after_delete", _on_lesson_delete)
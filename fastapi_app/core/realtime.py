@@ -0,0 +1,230 @@
+"""
+Kênh đẩy realtime (WebSocket/SSE) cho tin nhắn và thông báo.
+
+- RealtimeHub: pub/sub trong process, mỗi kết nối của user là một asyncio.Queue.
+- Backend "postgres": publish qua NOTIFY, mỗi worker LISTEN và phát lại cho các kết nối của mình,
+  nhờ vậy nhiều worker uvicorn dùng chung sự kiện.
+- Sự kiện được phát sau khi transaction commit (xem register_model_events), nên mọi nơi tạo
+  Message/Notification đều được đẩy mà không cần sửa từng route.
+- publish_invalidation: báo mọi worker xóa một cache trong bộ nhớ (vd danh sách khóa học),
+  handler đăng ký bằng on_invalidate.
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, object_session
+
+from .config import settings
+
+NOTIFY_CHANNEL = "elearning_events"
+QUEUE_SIZE = 100
+# NOTIFY giới hạn payload ~8000 byte, cắt bớt nội dung dài
+PREVIEW_LEN = 500
+
+
+class RealtimeHub:
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backend = None
+        self._invalidation_handlers: dict[str, Callable[[], None]] = {}
+        self.worker_id = uuid.uuid4().hex  # Bỏ qua NOTIFY xóa cache do chính worker này gửi
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if settings.realtime_backend == "postgres":
+            self._backend = PostgresNotifyBackend(self)
+            await self._backend.start()
+
+    async def stop(self):
+        if self._backend:
+            await self._backend.stop()
+            self._backend = None
+        self._loop = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def connection_count(self) -> int:
+        return sum(len(q) for q in self._subscribers.values())
+
+    def publish(self, user_id: int, event_data: dict):
+        """An toàn khi gọi từ threadpool (route sync) lẫn từ event loop"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if self._backend:
+            asyncio.run_coroutine_threadsafe(self._backend.send(user_id, event_data), loop)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, user_id, event_data)
+
+    def on_invalidate(self, name: str, handler: Callable[[], None]):
+        self._invalidation_handlers[name] = handler
+
+    def publish_invalidation(self, name: str):
+        """Gửi cho các worker khác (backend postgres); worker hiện tại phải tự xóa cache trước khi gọi"""
+        loop = self._loop
+        if self._backend is None or loop is None or loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._backend.notify({"invalidate": name, "origin": self.worker_id}), loop)
+
+    def invalidate(self, name: str):
+        handler = self._invalidation_handlers.get(name)
+        if handler:
+            handler()
+
+    def dispatch(self, user_id: int, event_data: dict):
+        """Giao sự kiện cho các kết nối của user trong worker này (chạy trên event loop)"""
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                # Client đọc chậm: bỏ sự kiện cũ nhất thay vì chặn publisher
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event_data)
+
+
+class PostgresNotifyBackend:
+    def __init__(self, hub: RealtimeHub):
+        self.hub = hub
+        self._dsn = make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._send_conn = None
+        self._send_lock = asyncio.Lock()
+        self._listen_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listen_task:
+            self._listen_task.cancel()
+        if self._send_conn is not None:
+            await self._send_conn.close()
+
+    async def send(self, user_id: int, event_data: dict):
+        await self.notify({"user_id": user_id, "event": event_data})
+
+    async def notify(self, data: dict):
+        import psycopg
+
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        async with self._send_lock:
+            try:
+                if self._send_conn is None or self._send_conn.closed:
+                    self._send_conn = await psycopg.AsyncConnection.connect(self._dsn, autocommit=True)
+                await self._send_conn.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+            except Exception as e:
+                print(f"Realtime NOTIFY failed: {e}")
+                self._send_conn = None
+
+    async def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    async for notify in conn.notifies():
+                        try:
+                            data = json.loads(notify.payload)
+                            if "invalidate" in data:
+                                if data.get("origin") != self.hub.worker_id:
+                                    self.hub.invalidate(data["invalidate"])
+                                continue
+                            self.hub.dispatch(int(data["user_id"]), data["event"])
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Realtime LISTEN connection lost: {e}")
+                await asyncio.sleep(5)
+
+
+hub = RealtimeHub()
+
+
+def _created_at(target) -> str:
+    # Đọc thẳng từ state để không kích hoạt lazy load giữa lúc flush (server_default chưa được nạp)
+    value = inspect(target).dict.get("created_at")
+    return (value or datetime.utcnow()).isoformat()
+
+
+def message_event(message) -> dict:
+    return {
+        "type": "message",
+        "data": {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "receiver_id": message.receiver_id,
+            "noi_dung": (message.noi_dung or "")[:PREVIEW_LEN],
+            "created_at": _created_at(message),
+        },
+    }
+
+
+def notification_event(notification) -> dict:
+    return {
+        "type": "notification",
+        "data": {
+            "id": notification.id,
+            "loai": notification.loai,
+            "tieu_de": notification.tieu_de,
+            "noi_dung": (notification.noi_dung or "")[:PREVIEW_LEN],
+            "link": notification.link,
+            "created_at": _created_at(notification),
+        },
+    }
+
+
+def _queue_event(target, user_ids, event_data):
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault("realtime_events", []).extend((uid, event_data) for uid in user_ids)
+
+
+def _on_message_insert(mapper, connection, target):
+    # Gửi cho cả người gửi để đồng bộ các tab khác đang mở
+    _queue_event(target, (target.receiver_id, target.sender_id), message_event(target))
+
+
+def _on_notification_insert(mapper, connection, target):
+    _queue_event(target, (target.user_id,), notification_event(target))
+
+
+def _on_commit(session):
+    for user_id, event_data in session.info.pop("realtime_events", ()):
+        hub.publish(user_id, event_data)
+
+
+def _on_rollback(session, previous_transaction):
+    session.info.pop("realtime_events", None)
+
+
+def register_model_events():
+    """Gắn hook ORM: gom sự kiện lúc insert, chỉ publish khi commit thành công"""
+    from ..models.message import Message
+    from ..models.notification import Notification
+
+    if event.contains(Message, "after_insert", _on_message_insert):
+        return
+    event.listen(Message, "after_insert", _on_message_insert)
+    event.listen(Notification, "after_insert", _on_notification_insert)
+    event.listen(Session, "after_commit", _on_commit)
+    event.listen(Session, "after_soft_rollback", _on_rollback)
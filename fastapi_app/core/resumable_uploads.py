@@ -0,0 +1,247 @@
+"""
+Upload video bài học nối tiếp được (theo tinh thần giao thức tus), cho file nhiều GB.
+
+- Tạo phiên (models.upload_session) với kích thước file và chunk_size; file staging được cấp
+  sẵn đúng kích thước (sparse) trong settings.upload_staging_dir (ngoài thư mục static).
+- Mỗi PATCH gửi đúng một chunk tại Upload-Offset (bội số của chunk_size): body được ghi thẳng
+  vào file staging bằng pwrite theo từng khối, không qua multipart, không đọc cả chunk vào RAM.
+  Nhiều chunk gửi song song được vì mỗi chunk ghi vào vùng riêng.
+- File .chunks bên cạnh giữ 1 byte/chunk (1 = đã nhận đủ), chỉ đánh dấu sau khi ghi xong chunk nên
+  mất kết nối giữa chừng thì gửi lại đúng chunk đó. Không cần ghi DB cho mỗi chunk.
+- Chunk đã nhận thì PATCH gửi lại không ghi đè (trả thành công luôn); ghi lỗi (thiếu byte, sai checksum)
+  thì bỏ đánh dấu chunk, để một PATCH trùng chạy song song không để lại dữ liệu hỏng mà vẫn "đã nhận".
+- Upload-Offset trả về là phần đầu liên tục đã nhận (như tus); missing_chunks để gửi song song.
+- Hoàn tất: file staging được chuyển vào kho theo nội dung như upload thường (core/uploads.commit_file).
+- Phiên hết hạn sau resumable_upload_ttl_hours; cleanup_expired_uploads chạy định kỳ trong main.py.
+"""
+import hashlib
+import os
+import shutil
+from base64 import b64decode
+from binascii import Error as BinasciiError
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import anyio
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..models.upload_session import UploadSession
+from .config import settings
+from .uploads import MB, RESUMABLE_CHUNK_LIMIT as MAX_CHUNK, VIDEO, StoredFile, commit_file, temp_file
+
+MIN_CHUNK = MB
+DEFAULT_CHUNK = 8 * MB
+# Gom dữ liệu nhận được thành khối cỡ này trước mỗi lần pwrite (một lần chuyển sang thread)
+WRITE_BUFFER = MB
+# tus: 460 Checksum Mismatch
+HTTP_CHECKSUM_MISMATCH = 460
+CHECKSUMS = {"sha1": hashlib.sha1, "sha256": hashlib.sha256, "md5": hashlib.md5}
+
+STAGING_DIR = Path(settings.upload_staging_dir)
+
+
+def _data_path(upload_id: str) -> Path:
+    return STAGING_DIR / f"{upload_id}.part"
+
+
+def _bitmap_path(upload_id: str) -> Path:
+    return STAGING_DIR / f"{upload_id}.chunks"
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    return max(1, -(-size // chunk_size))
+
+
+def chunk_length(session: UploadSession, index: int) -> int:
+    start = index * session.chunk_size
+    return min(session.chunk_size, session.kich_thuoc - start)
+
+
+def normalize_chunk_size(chunk_size: Optional[int]) -> int:
+    return min(max(chunk_size or DEFAULT_CHUNK, MIN_CHUNK), MAX_CHUNK)
+
+
+def expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=settings.resumable_upload_ttl_hours)
+
+
+def is_expired(session: UploadSession) -> bool:
+    expires_at = session.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+def create_staging(session: UploadSession):
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    with open(_data_path(session.id), "wb") as f:
+        f.truncate(session.kich_thuoc)
+    with open(_bitmap_path(session.id), "wb") as f:
+        f.write(bytes(chunk_count(session.kich_thuoc, session.chunk_size)))
+
+
+def remove_staging(upload_id: str):
+    for path in (_data_path(upload_id), _bitmap_path(upload_id)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def received_chunks(session: UploadSession) -> bytes:
+    try:
+        with open(_bitmap_path(session.id), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Phiên upload đã bị hủy")
+
+
+def progress(session: UploadSession) -> tuple[int, list[int]]:
+    """(offset liên tục đã nhận, danh sách chunk còn thiếu)"""
+    bitmap = received_chunks(session)
+    missing = [i for i, done in enumerate(bitmap) if not done]
+    offset = session.kich_thuoc if not missing else missing[0] * session.chunk_size
+    return offset, missing
+
+
+def _parse_checksum(header: Optional[str]):
+    """Upload-Checksum: "<thuật toán> <base64>" (tus checksum extension)"""
+    if not header:
+        return None, None
+    algorithm, _, encoded = header.strip().partition(" ")
+    if algorithm.lower() not in CHECKSUMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Thuật toán checksum không hỗ trợ")
+    try:
+        return CHECKSUMS[algorithm.lower()](), b64decode(encoded, validate=True)
+    except BinasciiError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload-Checksum không hợp lệ")
+
+
+async def write_chunk(
+    session: UploadSession,
+    offset: int,
+    body: AsyncIterator[bytes],
+    checksum_header: Optional[str] = None,
+) -> None:
+    if offset < 0 or offset >= session.kich_thuoc or offset % session.chunk_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Offset phải là bội số của {session.chunk_size} và nhỏ hơn kích thước file",
+        )
+    index = offset // session.chunk_size
+    expected = chunk_length(session, index)
+    digest, expected_digest = _parse_checksum(checksum_header)
+    if received_chunks(session)[index:index + 1] == b"\x01":
+        # Gửi lại chunk đã nhận (retry sau khi mất response): không ghi đè dữ liệu đã kiểm tra
+        return
+
+    try:
+        fd = os.open(_data_path(session.id), os.O_WRONLY | getattr(os, "O_BINARY", 0))
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Phiên upload đã bị hủy")
+    written = 0
+    buffer = bytearray()
+    try:
+        async def flush():
+            nonlocal written
+            await anyio.to_thread.run_sync(_pwrite, fd, bytes(buffer), offset + written)
+            written += len(buffer)
+            buffer.clear()
+
+        async for piece in body:
+            if written + len(buffer) + len(piece) > expected:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Chunk dài hơn {expected} byte")
+            if digest:
+                digest.update(piece)
+            buffer += piece
+            if len(buffer) >= WRITE_BUFFER:
+                await flush()
+        if buffer:
+            await flush()
+        if written != expected:
+            # Kết nối đứt giữa chừng: chunk chưa được đánh dấu, client gửi lại
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Chunk phải dài đúng {expected} byte")
+        if digest and digest.digest() != expected_digest:
+            raise HTTPException(status_code=HTTP_CHECKSUM_MISMATCH, detail="Checksum của chunk không khớp")
+    except BaseException:
+        # Có thể đã ghi một phần: PATCH trùng chạy song song vừa đánh dấu chunk thì bỏ đánh dấu
+        # (ghi 1 byte, gọi trực tiếp để vẫn chạy khi request bị hủy)
+        if written or buffer:
+            try:
+                _mark_received(session.id, index, False)
+            except HTTPException:
+                pass
+        raise
+    finally:
+        os.close(fd)
+    await anyio.to_thread.run_sync(_mark_received, session.id, index)
+
+
+def _pwrite(fd: int, data: bytes, offset: int):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            count = os.pwrite(fd, view, offset)
+        else:
+            # Windows không có pwrite
+            os.lseek(fd, offset, os.SEEK_SET)
+            count = os.write(fd, view)
+        view = view[count:]
+        offset += count
+
+
+def _mark_received(upload_id: str, index: int, received: bool = True):
+    try:
+        fd = os.open(_bitmap_path(upload_id), os.O_WRONLY | getattr(os, "O_BINARY", 0))
+    except FileNotFoundError:
+        # Phiên đã hoàn tất/bị hủy trong lúc ghi
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Phiên upload đã bị hủy")
+    try:
+        _pwrite(fd, b"\x01" if received else b"\x00", index)
+    finally:
+        os.close(fd)
+
+
+def finalize(session: UploadSession, ext: str) -> StoredFile:
+    """Đưa file staging đã đủ chunk vào kho video (core/blob_store.py)"""
+    _, missing = progress(session)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Còn thiếu {len(missing)} chunk",
+        )
+    fd, tmp_path = temp_file(VIDEO, ext)
+    os.close(fd)
+    try:
+        try:
+            # Cùng ổ đĩa thì chỉ là rename
+            os.replace(_data_path(session.id), tmp_path)
+        except OSError:
+            # Khác ổ đĩa: copy rồi xóa
+            shutil.move(str(_data_path(session.id)), tmp_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    remove_staging(session.id)
+    # Tính sha256 cả file (đọc tuần tự một lần) vì các chunk đến không theo thứ tự
+    return commit_file(tmp_path, VIDEO, ext)
+
+
+def cleanup_expired_uploads(db: Session) -> int:
+    """Xóa phiên hết hạn và file staging mồ côi; trả về số phiên đã xóa"""
+    now = datetime.now(timezone.utc)
+    expired = db.query(UploadSession).filter(UploadSession.expires_at <= now).all()
+    for session in expired:
+        remove_staging(session.id)
+        db.delete(session)
+    db.commit()
+
+    if STAGING_DIR.is_dir():
+        active = {row.id for row in db.query(UploadSession.id)}
+        cutoff = now.timestamp() - settings.resumable_upload_ttl_hours * 3600
+        for path in STAGING_DIR.iterdir():
+            if path.stem not in active and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+    return len(expired)
@@ -0,0 +1,204 @@
+"""
+Pool worker sandbox cho endpoint chạy code (/api/code/execute).
+
+- Mỗi ngôn ngữ có N tiến trình worker (core/sandbox_worker.py) khởi động sẵn lúc startup,
+  nhận job qua pipe; worker chết hoặc quá giờ thì được khởi động lại.
+- Hàng đợi có giới hạn: đầy thì từ chối ngay (route trả 429) thay vì để request treo.
+- Giới hạn số job chạy đồng thời của mỗi user.
+- Chỉ hỗ trợ POSIX (fork, rlimit); trên Windows route quay về cách chạy subprocess cũ.
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+from .config import settings
+
+WORKER_SCRIPT = str(Path(__file__).resolve().parent / "sandbox_worker.py")
+LANGUAGES = ("python", "javascript", "cpp")
+# Dòng kết quả có thể chứa tới 2 x 64KB output đã escape JSON
+READ_LIMIT = 1024 * 1024
+# Thời gian chờ thêm ngoài timeout của job (fork, compile, ghi kết quả)
+GRACE_SECONDS = 10
+
+
+class SandboxBusy(Exception):
+    """Hàng đợi đầy hoặc user đã chạy quá số job cho phép"""
+
+
+def _error_result(error: str, execution_time: float = 0, **extra) -> dict:
+    return {"output": "", "error": error, "execution_time": execution_time, "exit_code": -1, **extra}
+
+
+class SandboxWorker:
+    def __init__(self, language: str):
+        self.language = language
+        self.proc: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self):
+        # Không truyền biến môi trường của app (DATABASE_URL, JWT_SECRET, ...) vào worker chạy code học viên
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "HOME": os.environ.get("HOME", "/tmp"),
+            "LANG": "C.UTF-8",
+            "SANDBOX_COMPILE_CACHE_DIR": settings.compile_cache_dir,
+            "SANDBOX_COMPILE_CACHE_MB": str(settings.compile_cache_max_mb),
+        }
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT, self.language,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=env,
+            limit=READ_LIMIT,
+        )
+
+    async def stop(self):
+        if self.proc and self.proc.returncode is None:
+            self.proc.kill()
+            await self.proc.wait()
+        self.proc = None
+
+    async def run(self, job: dict, on_event: Optional[Callable[[dict], None]] = None) -> dict:
+        """on_event nhận các sự kiện started/output khi job có "stream": true"""
+        if self.proc is None or self.proc.returncode is not None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + job["timeout"] + GRACE_SECONDS
+        try:
+            self.proc.stdin.write((json.dumps(job) + "\n").encode())
+            await self.proc.stdin.drain()
+            while True:
+                line = await asyncio.wait_for(self.proc.stdout.readline(), max(deadline - loop.time(), 0))
+                if not line:
+                    break
+                message = json.loads(line)
+                if "event" not in message:
+                    return message
+                if on_event:
+                    on_event(message)
+        except asyncio.TimeoutError:
+            await self.stop()
+            return _error_result(f"Code execution timeout after {job['timeout']} seconds", job["timeout"], timed_out=True)
+        except (ConnectionError, ValueError) as e:
+            # ValueError: dòng kết quả vượt READ_LIMIT
+            await self.stop()
+            return _error_result(f"Sandbox error: {e}")
+        await self.stop()
+        return _error_result("Sandbox worker stopped unexpectedly")
+
+
+class SandboxPool:
+    def __init__(self, language: str, size: int, queue_size: int):
+        self.language = language
+        self.workers = [SandboxWorker(language) for _ in range(size)]
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        await asyncio.gather(*(worker.start() for worker in self.workers))
+        self._tasks = [asyncio.create_task(self._serve(worker)) for worker in self.workers]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+    def is_full(self) -> bool:
+        return self.queue.full()
+
+    async def submit(self, job: dict, on_event: Optional[Callable[[dict], None]] = None) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((job, on_event, future))
+        except asyncio.QueueFull:
+            raise SandboxBusy("Hệ thống chạy code đang quá tải, vui lòng thử lại sau")
+        return await future
+
+    async def _serve(self, worker: SandboxWorker):
+        while True:
+            job, on_event, future = await self.queue.get()
+            if future.cancelled():
+                # Client đã ngắt kết nối (hoặc job bị hủy) trước khi tới lượt
+                continue
+            try:
+                result = await worker.run(job, on_event)
+            except Exception as e:
+                await worker.stop()
+                result = _error_result(f"Sandbox error: {e}")
+            if not future.done():
+                future.set_result(result)
+
+
+class SandboxManager:
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None, user_concurrency: Optional[int] = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        # 0 = không giới hạn theo user (chấm bài chạy nhiều test case của cùng một bài nộp)
+        self.user_concurrency = settings.sandbox_user_concurrency if user_concurrency is None else user_concurrency
+        self.pools: dict[str, SandboxPool] = {}
+        self._active: dict[int, int] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.pools)
+
+    async def start(self):
+        if not settings.sandbox_enabled or os.name != "posix" or self.pools:
+            return
+        for language in LANGUAGES:
+            pool = SandboxPool(
+                language,
+                self.workers or settings.sandbox_workers,
+                self.queue_size or settings.sandbox_queue_size,
+            )
+            await pool.start()
+            self.pools[language] = pool
+
+    async def stop(self):
+        pools, self.pools = self.pools, {}
+        await asyncio.gather(*(pool.stop() for pool in pools.values()))
+
+    def supports(self, language: str) -> bool:
+        return language in self.pools
+
+    def _user_limited(self, user_id: int) -> bool:
+        return bool(self.user_concurrency) and self._active.get(user_id, 0) >= self.user_concurrency
+
+    def is_busy(self, user_id: int, language: str) -> bool:
+        return self._user_limited(user_id) or self.pools[language].is_full()
+
+    async def execute(
+        self, user_id: int, language: str, code: str, stdin: Optional[str], timeout: int,
+        on_event: Optional[Callable[[dict], None]] = None, **extra,
+    ) -> dict:
+        if self._user_limited(user_id):
+            raise SandboxBusy("Bạn đang chạy quá nhiều chương trình cùng lúc, vui lòng đợi kết quả")
+        self._active[user_id] = self._active.get(user_id, 0) + 1
+        try:
+            job = {
+                "id": next(self._ids),
+                "code": code,
+                "stdin": stdin,
+                "timeout": timeout,
+                "memory_mb": settings.sandbox_memory_mb,
+                "cpu_seconds": timeout,
+                "stream": on_event is not None,
+                **extra,
+            }
+            return await self.pools[language].submit(job, on_event)
+        finally:
+            remaining = self._active[user_id] - 1
+            if remaining:
+                self._active[user_id] = remaining
+            else:
+                del self._active[user_id]
+
+
+sandbox = SandboxManager()
+# Pool riêng cho job bất đồng bộ (/api/code/jobs) để job dài không chiếm chỗ của /execute
+job_sandbox = SandboxManager(workers=settings.code_jobs_workers, queue_size=settings.code_jobs_queue_size)
@@ -0,0 +1,307 @@
+"""
+Tiến trình worker của sandbox chạy code (chỉ dùng thư viện chuẩn, chạy bằng đường dẫn file).
+
+Nhận job dạng JSON từng dòng qua stdin, trả kết quả JSON từng dòng qua stdout:
+    {"id", "code", "stdin", "timeout", "memory_mb", "cpu_seconds"}
+ -> {"id", "output", "error", "execution_time", "exit_code", "memory_kb"}
+    (+ "timed_out" / "compile_error" / "cache_hit" khi có)
+Job có "stream": true thì trước dòng kết quả còn có các dòng sự kiện:
+    {"id", "event": "started", "pid"}   (pid = nhóm tiến trình, dùng để hủy job)
+    {"id", "event": "output", "stream": "stdout" | "stderr", "data"}
+
+- python: worker đã khởi động sẵn interpreter, mỗi job fork một tiến trình con nên không tốn
+  thời gian khởi động Python.
+- javascript/cpp: mỗi job vẫn chạy node / file thực thi, nhưng được giới hạn tài nguyên
+  giống nhau và đi qua cùng hàng đợi; C++ dùng compile cache (core/compile_cache.py).
+
+Tiến trình con: rlimit CPU/bộ nhớ/số tiến trình/kích thước file, session riêng (kill cả nhóm),
+tách network namespace nếu kernel cho phép; nếu không, với Python thì chặn module socket.
+"""
+import codecs
+import ctypes
+import json
+import os
+import resource
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from compile_cache import CompileCache, CompileError
+
+MAX_OUTPUT = 64 * 1024
+CLONE_NEWNET = 0x40000000
+FILE_SIZE_LIMIT = 1024 * 1024
+
+# Module hay dùng được import trước để tiến trình con fork ra dùng luôn
+PREWARM_MODULES = ("math", "json", "re", "random", "itertools", "collections", "functools", "heapq", "bisect", "string")
+
+# Thư mục/dung lượng cache do SandboxWorker truyền qua biến môi trường
+compile_cache = CompileCache(
+    os.environ.get("SANDBOX_COMPILE_CACHE_DIR") or None,
+    int(os.environ.get("SANDBOX_COMPILE_CACHE_MB", "256")) * 1024 * 1024,
+)
+
+
+def _try_unshare_network() -> bool:
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.unshare(CLONE_NEWNET) == 0
+    except Exception:
+        return False
+
+
+def _block_python_sockets():
+    import socket
+
+    def _blocked(*args, **kwargs):
+        raise PermissionError("Network access is disabled in the sandbox")
+
+    socket.socket = _blocked
+    socket.create_connection = _blocked
+    socket.getaddrinfo = _blocked
+
+
+def apply_limits(cpu_seconds: int, memory_mb: int, limit_address_space: bool = True, no_fork: bool = True):
+    """Gọi trong tiến trình con trước khi chạy code của học viên"""
+    os.setsid()
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if limit_address_space:
+        memory = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (FILE_SIZE_LIMIT, FILE_SIZE_LIMIT))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if no_fork and os.getuid() != 0:
+        # RLIMIT_NPROC không có tác dụng với root
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+_out = None
+
+
+def _emit(message: dict):
+    _out.write(json.dumps(message) + "\n")
+
+
+def _communicate(pid: int, stdin_data: bytes, stdin_fd: int, stdout_fd: int, stderr_fd: int, timeout: float, job: dict = None):
+    """Ghi stdin, đọc stdout/stderr (có giới hạn) cho đến khi tiến trình con kết thúc hoặc hết giờ"""
+    sel = selectors.DefaultSelector()
+    buffers = {stdout_fd: bytearray(), stderr_fd: bytearray()}
+    streaming = bool(job and job.get("stream"))
+    if streaming:
+        _emit({"id": job["id"], "event": "started", "pid": pid})
+        names = {stdout_fd: "stdout", stderr_fd: "stderr"}
+        decoders = {fd: codecs.getincrementaldecoder("utf-8")("replace") for fd in buffers}
+    for fd in buffers:
+        os.set_blocking(fd, False)
+        sel.register(fd, selectors.EVENT_READ)
+    pending = memoryview(stdin_data)
+    if pending:
+        os.set_blocking(stdin_fd, False)
+        sel.register(stdin_fd, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_fd)
+
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    open_fds = set(buffers)
+    while open_fds:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        for key, _ in sel.select(remaining):
+            fd = key.fd
+            if fd == stdin_fd:
+                try:
+                    written = os.write(fd, pending[:65536])
+                    pending = pending[written:]
+                except BrokenPipeError:
+                    pending = pending[:0]
+                if not pending:
+                    sel.unregister(fd)
+                    os.close(fd)
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                sel.unregister(fd)
+                open_fds.discard(fd)
+                continue
+            if len(buffers[fd]) < MAX_OUTPUT:
+                chunk = chunk[:MAX_OUTPUT - len(buffers[fd])]
+                buffers[fd].extend(chunk)
+                if streaming:
+                    _emit({"id": job["id"], "event": "output", "stream": names[fd], "data": decoders[fd].decode(chunk)})
+
+    if timed_out:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    for key in list(sel.get_map().values()):
+        sel.unregister(key.fd)
+        os.close(key.fd)
+    for fd in open_fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    sel.close()
+
+    # wait4 trả thêm rusage: ru_maxrss (KB trên Linux) là bộ nhớ đỉnh của tiến trình con
+    _, status, rusage = os.wait4(pid, 0)
+    exit_code = os.waitstatus_to_exitcode(status)
+    output = buffers[stdout_fd].decode("utf-8", "replace")
+    error = buffers[stderr_fd].decode("utf-8", "replace")
+    return output, error, exit_code, timed_out, rusage.ru_maxrss
+
+
+def _result(job, output="", error=None, execution_time=0.0, exit_code=0, **extra):
+    result = {"id": job.get("id"), "output": output, "error": error, "execution_time": execution_time, "exit_code": exit_code}
+    result.update(extra)
+    return result
+
+
+def run_python(job: dict) -> dict:
+    r_in, w_in = os.pipe()
+    r_out, w_out = os.pipe()
+    r_err, w_err = os.pipe()
+    workdir = tempfile.mkdtemp(prefix="sandbox_")
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.dup2(r_in, 0)
+            os.dup2(w_out, 1)
+            os.dup2(w_err, 2)
+            os.closerange(3, 1024)
+            os.chdir(workdir)
+            # Cùng môi trường tối thiểu như tiến trình con của JavaScript/C++
+            path = os.environ.get("PATH", "/usr/bin:/bin")
+            os.environ.clear()
+            os.environ.update({"PATH": path, "HOME": workdir, "LANG": "C.UTF-8"})
+            if not _try_unshare_network():
+                _block_python_sockets()
+            apply_limits(job["cpu_seconds"], job["memory_mb"])
+            sys.stdin = open(0, "r", closefd=False)
+            # Line-buffered để output được stream ngay khi chương trình in ra
+            sys.stdout = open(1, "w", closefd=False, buffering=1)
+            sys.stderr = open(2, "w", closefd=False)
+            sys.argv = ["main.py"]
+            try:
+                exec(compile(job["code"], "main.py", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if e.code is not None and not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+            except BaseException as e:
+                # Bỏ frame của worker, chỉ hiện traceback trong code của học viên
+                traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+                exit_code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+    for fd in (r_in, w_out, w_err):
+        os.close(fd)
+    stdin_data = (job.get("stdin") or "").encode()
+    output, error, exit_code, timed_out, memory_kb = _communicate(pid, stdin_data, w_in, r_out, r_err, job["timeout"], job)
+    elapsed = time.monotonic() - start
+    shutil.rmtree(workdir, ignore_errors=True)
+    if timed_out:
+        return _result(job, output, f"Code execution timeout after {job['timeout']} seconds", job["timeout"], -1, timed_out=True)
+    return _result(job, output, error if exit_code != 0 else None, elapsed, exit_code, memory_kb=memory_kb)
+
+
+def _run_process(job: dict, args: list, cwd: str, **limit_kwargs) -> dict:
+    r_in, w_in = os.pipe()
+    r_out, w_out = os.pipe()
+    r_err, w_err = os.pipe()
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        args,
+        cwd=cwd,
+        stdin=r_in,
+        stdout=w_out,
+        stderr=w_err,
+        env={"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": cwd, "LANG": "C.UTF-8"},
+        preexec_fn=lambda: apply_limits(job["cpu_seconds"], job["memory_mb"], **limit_kwargs),
+    )
+    for fd in (r_in, w_out, w_err):
+        os.close(fd)
+    stdin_data = (job.get("stdin") or "").encode()
+    output, error, exit_code, timed_out, memory_kb = _communicate(proc.pid, stdin_data, w_in, r_out, r_err, job["timeout"], job)
+    # _communicate đã waitpid, báo cho Popen biết để không đợi lại
+    proc.returncode = exit_code
+    elapsed = time.monotonic() - start
+    if timed_out:
+        return _result(job, output, f"Code execution timeout after {job['timeout']} seconds", job["timeout"], -1, timed_out=True)
+    return _result(job, output, error if exit_code != 0 else None, elapsed, exit_code, memory_kb=memory_kb)
+
+
+def run_javascript(job: dict) -> dict:
+    with tempfile.TemporaryDirectory(prefix="sandbox_") as workdir:
+        path = os.path.join(workdir, "main.js")
+        with open(path, "w") as f:
+            f.write(job["code"])
+        # V8 cần nhiều địa chỉ ảo nên giới hạn heap bằng cờ của node thay cho RLIMIT_AS; node cần thread
+        args = ["node", f"--max-old-space-size={job['memory_mb']}", path]
+        return _run_process(job, args, workdir, limit_address_space=False, no_fork=False)
+
+
+def run_cpp(job: dict) -> dict:
+    """Biên dịch qua compile cache (source giống nhau chỉ biên dịch một lần) rồi chạy"""
+    try:
+        executable, cache_hit = compile_cache.get_or_compile(job["code"], job.get("compile_timeout") or 5)
+    except subprocess.TimeoutExpired:
+        return _result(job, error="Compilation timeout", exit_code=-1, compile_error=True)
+    except CompileError as e:
+        return _result(job, error=e.stderr[:MAX_OUTPUT], exit_code=e.returncode, compile_error=True)
+    # libc đệm cả khối khi stdout là pipe; stdbuf chuyển sang đệm theo dòng khi cần stream
+    prefix = ["stdbuf", "-oL"] if job.get("stream") and shutil.which("stdbuf") else []
+    with tempfile.TemporaryDirectory(prefix="sandbox_") as workdir:
+        try:
+            result = _run_process(job, prefix + [executable], workdir)
+        except FileNotFoundError:
+            # Worker khác vừa evict file này: biên dịch lại
+            executable, cache_hit = compile_cache.get_or_compile(job["code"], job.get("compile_timeout") or 5)
+            result = _run_process(job, prefix + [executable], workdir)
+    result["cache_hit"] = cache_hit
+    return result
+
+
+RUNNERS = {"python": run_python, "javascript": run_javascript, "cpp": run_cpp}
+
+
+def main():
+    language = sys.argv[1]
+    runner = RUNNERS[language]
+    if language == "python":
+        for name in PREWARM_MODULES:
+            __import__(name)
+
+    # stdout của worker là kênh kết quả; giữ fd riêng để code con không ghi nhầm vào
+    global _out
+    _out = os.fdopen(os.dup(1), "w", buffering=1)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = {}
+        try:
+            job = json.loads(line)
+            result = runner(job)
+        except Exception as e:
+            result = _result(job, error=f"Sandbox error: {e}", exit_code=-1)
+        _emit(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=True)
 # Keep OAuth2PasswordBearer for existing dependency imports
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Route cho cả khách lẫn người đã đăng nhập: thiếu token thì None thay vì 401
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
 def hash_password(password: str) -> str:
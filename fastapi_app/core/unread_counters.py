@@ -0,0 +1,97 @@
+"""
+Bộ đếm chưa đọc (bảng unread_counters) cho tin nhắn và thông báo.
+
+- Tăng: hook ORM after_insert của Message/Notification, chạy trong cùng transaction với lệnh insert.
+- Giảm: các route đánh dấu đã đọc gọi decrement_stmt/reset_stmt.
+- Đọc: get_unread_count là lookup theo khóa chính; dòng của user được tạo bằng COUNT ở lần đọc đầu.
+- reconcile_unread_counters tính lại toàn bộ để sửa sai lệch (chạy định kỳ).
+"""
+from sqlalchemy import case, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.message import Message
+from ..models.notification import Notification
+from ..models.unread_counter import UnreadCounter
+
+KINDS = ("messages", "notifications")
+
+
+def _unread_count_query(kind: str, user_id):
+    if kind == "messages":
+        return select(func.count(Message.id)).where(Message.receiver_id == user_id, Message.da_doc == False)
+    return select(func.count(Notification.id)).where(Notification.user_id == user_id, Notification.da_doc == False)
+
+
+def _insert(dialect_name: str):
+    # ON CONFLICT DO NOTHING: PostgreSQL (production) và SQLite (dev) đều hỗ trợ
+    if dialect_name == "sqlite":
+        return sqlite.insert(UnreadCounter)
+    return postgresql.insert(UnreadCounter)
+
+
+def increment_stmt(user_id: int, kind: str, n: int = 1):
+    """Chỉ cập nhật dòng đã có; nếu chưa có, lần đọc đầu tiên sẽ đếm lại từ đầu"""
+    column = getattr(UnreadCounter, kind)
+    return update(UnreadCounter).where(UnreadCounter.user_id == user_id).values({kind: column + n})
+
+
+def decrement_stmt(user_id: int, kind: str, n: int = 1):
+    column = getattr(UnreadCounter, kind)
+    return (
+        update(UnreadCounter)
+        .where(UnreadCounter.user_id == user_id)
+        .values({kind: case((column - n < 0, 0), else_=column - n)})
+    )
+
+
+def reset_stmt(user_id: int, kind: str):
+    return update(UnreadCounter).where(UnreadCounter.user_id == user_id).values({kind: 0})
+
+
+async def get_unread_count(db, user_id: int, kind: str) -> int:
+    """Lookup O(1); lần đầu (chưa có dòng) thì đếm cả hai loại và lưu lại"""
+    count = await db.scalar(select(getattr(UnreadCounter, kind)).where(UnreadCounter.user_id == user_id))
+    if count is not None:
+        return count
+
+    counts = {k: (await db.scalar(_unread_count_query(k, user_id))) or 0 for k in KINDS}
+    await db.execute(
+        _insert(db.bind.dialect.name)
+        .values(user_id=user_id, **counts)
+        .on_conflict_do_nothing(index_elements=[UnreadCounter.user_id])
+    )
+    await db.commit()
+    return counts[kind]
+
+
+def reconcile_unread_counters(db: Session) -> int:
+    """Tính lại mọi bộ đếm bằng một câu UPDATE; trả về số user bị lệch đã được sửa"""
+    messages_count = _unread_count_query("messages", UnreadCounter.user_id).scalar_subquery()
+    notifications_count = _unread_count_query("notifications", UnreadCounter.user_id).scalar_subquery()
+    result = db.execute(
+        update(UnreadCounter)
+        .where((UnreadCounter.messages != messages_count) | (UnreadCounter.notifications != notifications_count))
+        .values(messages=messages_count, notifications=notifications_count)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def _on_message_insert(mapper, connection, target):
+    if not inspect(target).dict.get("da_doc"):
+        connection.execute(increment_stmt(target.receiver_id, "messages"))
+
+
+def _on_notification_insert(mapper, connection, target):
+    if not inspect(target).dict.get("da_doc"):
+        connection.execute(increment_stmt(target.user_id, "notifications"))
+
+
+def register_counter_events():
+    """Tăng bộ đếm trong cùng transaction với insert (mọi nơi tạo Message/Notification)"""
+    if event.contains(Message, "after_insert", _on_message_insert):
+        return
+    event.listen(Message, "after_insert", _on_message_insert)
+    event.listen(Notification, "after_insert", _on_notification_insert)
@@ -0,0 +1,207 @@
+"""
+Lưu file upload theo luồng, dùng chung cho content.py, assignments.py và discussions.py.
+
+- UploadLimitMiddleware đếm byte của request body trên các route upload và trả 413 ngay khi vượt
+  giới hạn (hoặc ngay từ Content-Length), không chờ nhận hết file.
+- Starlette đã spool phần file của multipart ra đĩa (quá 1MB); store_upload copy sang file tạm local
+  theo từng khối CHUNK_SIZE, vừa copy vừa kiểm tra kích thước và tính sha256, rồi đưa vào kho theo
+  nội dung (core/blob_store.py, trên backend của core/storage.py) nên không có file dở dang và file
+  trùng chỉ lưu một lần. Không bao giờ đọc cả file vào RAM.
+- store_upload là hàm blocking: route sync gọi trực tiếp (đã chạy trong threadpool),
+  route async gọi qua run_in_threadpool.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import blob_store
+from .config import settings
+from .images import IMAGE_EXTENSIONS, sanitize_image
+from .mp4 import faststart_video
+from .storage import storage, url_for
+
+MB = 1024 * 1024
+CHUNK_SIZE = MB
+# Các field text của form multipart đi kèm file
+FORM_OVERHEAD = MB
+# Chunk lớn nhất của upload nối tiếp được (core/resumable_uploads.py)
+RESUMABLE_CHUNK_LIMIT = 64 * MB
+
+
+class UploadKind(NamedTuple):
+    label: str
+    prefix: str  # Key trong storage, vd "uploads/videos"
+    max_size: int
+    extensions: Optional[frozenset] = None  # None = không giới hạn đuôi file
+    default_ext: str = ""
+    # Xử lý file tạm trước khi đặt tên theo nội dung; trả về True nếu đã ghi lại file
+    prepare: Optional[Callable[[str], bool]] = None
+
+    @property
+    def url_prefix(self) -> str:
+        return url_for(self.prefix)
+
+
+class StoredFile(NamedTuple):
+    key: str  # Key trong storage
+    url: str  # /static/uploads/...
+    size: int
+    sha256: str
+
+
+VIDEO = UploadKind(
+    "Video", "uploads/videos", settings.upload_max_video_mb * MB,
+    frozenset({".mp4", ".webm", ".ogg", ".mov", ".avi"}), prepare=faststart_video,
+)
+PDF = UploadKind("File PDF", "uploads/pdfs", settings.upload_max_pdf_mb * MB, frozenset({".pdf"}))
+ASSIGNMENT_FILE = UploadKind("File", "uploads/assignment_files", settings.upload_max_file_mb * MB)
+SUBMISSION = UploadKind("File", "uploads/assignments", settings.upload_max_file_mb * MB)
+DISCUSSION_IMAGE = UploadKind(
+    "Hình ảnh", "uploads/discussions", settings.upload_max_image_mb * MB, default_ext=".jpg",
+    prepare=sanitize_image,
+)
+COURSE_IMAGE = UploadKind(
+    "Hình ảnh", "uploads/courses", settings.upload_max_image_mb * MB, IMAGE_EXTENSIONS, prepare=sanitize_image,
+)
+KINDS = [VIDEO, PDF, ASSIGNMENT_FILE, SUBMISSION, DISCUSSION_IMAGE, COURSE_IMAGE]
+
+# Giới hạn cả request body theo route upload: (method, path, số byte tối đa)
+ROUTE_LIMITS = [
+    ("POST", r"/api/courses/\d+/lessons", VIDEO.max_size + PDF.max_size + FORM_OVERHEAD),
+    ("PUT", r"/api/lessons/\d+", VIDEO.max_size + PDF.max_size + FORM_OVERHEAD),
+    ("POST", r"/api/courses/\d+/assignments", ASSIGNMENT_FILE.max_size + FORM_OVERHEAD),
+    ("POST", r"/api/assignments/\d+/submit", SUBMISSION.max_size + FORM_OVERHEAD),
+    ("POST", r"/api/courses/\d+/discussions", DISCUSSION_IMAGE.max_size + FORM_OVERHEAD),
+    ("POST", r"/api/course-images", COURSE_IMAGE.max_size + FORM_OVERHEAD),
+    ("PATCH", r"/api/video-uploads/[0-9a-f]+", RESUMABLE_CHUNK_LIMIT),
+]
+
+
+def too_large(label: str, max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"{label} quá lớn. Kích thước tối đa: {max_size / MB:g}MB",
+    )
+
+
+def check_extension(filename: Optional[str], kind: UploadKind) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if kind.extensions is not None and ext not in kind.extensions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chỉ chấp nhận {kind.label.lower()}: {', '.join(sorted(kind.extensions))}",
+        )
+    return ext
+
+
+def temp_file(kind: UploadKind, ext: str = "") -> tuple[int, str]:
+    """File tạm local; với storage local nằm cùng ổ đĩa với kho nên commit_file chỉ là rename"""
+    return tempfile.mkstemp(prefix=".upload-", suffix=ext, dir=storage.temp_dir(kind.prefix))
+
+
+def commit_file(tmp_path: str, kind: UploadKind, ext: str, digest: Optional[str] = None) -> StoredFile:
+    """Đưa file tạm đã nhận đủ vào kho theo sha256 (tính lại nếu chưa có hoặc prepare đã ghi lại file)"""
+    try:
+        if kind.prepare and kind.prepare(tmp_path):
+            digest = None
+        digest = digest or blob_store.hash_file(tmp_path)
+        size = os.path.getsize(tmp_path)
+        key = blob_store.put_blob(tmp_path, kind.prefix, digest, ext)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return StoredFile(key, url_for(key), size, digest)
+
+
+def store_upload(upload: UploadFile, kind: UploadKind) -> StoredFile:
+    """Copy file upload vào kho của kind theo từng khối, vượt kind.max_size thì 413"""
+    ext = check_extension(upload.filename, kind)
+    if not blob_store.EXTENSION.fullmatch(ext):
+        ext = kind.default_ext
+    if upload.size is not None and upload.size > kind.max_size:
+        raise too_large(kind.label, kind.max_size)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = temp_file(kind, ext)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            upload.file.seek(0)
+            while chunk := upload.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > kind.max_size:
+                    raise too_large(kind.label, kind.max_size)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return commit_file(tmp_path, kind, ext, digest.hexdigest())
+
+
+def collect_upload_garbage(db: Session, dry_run: bool = False, include_legacy: bool = False) -> blob_store.GcReport:
+    return blob_store.collect_garbage(db, [kind.prefix for kind in KINDS], dry_run, include_legacy)
+
+
+class UploadLimitMiddleware:
+    """Trả 413 sớm cho route upload: theo Content-Length, hoặc khi số byte đã nhận vượt giới hạn"""
+
+    def __init__(self, app: ASGIApp, limits: list[tuple[str, str, int]] = ROUTE_LIMITS):
+        self.app = app
+        self.limits = [(method, re.compile(pattern + "/?"), size) for method, pattern, size in limits]
+
+    def _limit(self, scope: Scope) -> Optional[int]:
+        for method, pattern, size in self.limits:
+            if scope["method"] == method and pattern.fullmatch(scope["path"]):
+                return size
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self._limit(scope) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        error = too_large("Dữ liệu upload", limit)
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+                return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Ngừng đọc body; FastAPI chuyển HTTPException thành response 413
+                    raise error
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            if e is not error or started:
+                raise
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
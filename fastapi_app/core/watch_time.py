@@ -0,0 +1,284 @@
+"""
+Thời gian xem video (bảng watch_progress) từ heartbeat của VideoPlayer.
+
+- POST /api/lessons/{id}/watch gửi các đoạn [bắt đầu, kết thúc] đã xem kể từ lần gửi trước;
+  route chỉ gộp vào bộ đệm trong bộ nhớ theo (user, bài học), không chạm DB.
+- Các đoạn chồng lấn/nối tiếp được gộp ngay khi nhận, nên mỗi (user, bài học) chỉ giữ vài đoạn
+  dù client gửi bao nhiêu heartbeat.
+- Bộ đệm được ghi mỗi watch_flush_interval_seconds giây hoặc sớm hơn khi số (user, bài học) đang chờ
+  vượt watch_buffer_max_entries: một query nạp bài học, một query nạp dòng cũ, một câu
+  INSERT ... ON CONFLICT DO UPDATE cho toàn bộ lô.
+- Bài học được tự đánh dấu hoàn thành (bảng progress, qua ORM để progress_summary được cập nhật)
+  khi tỉ lệ đã xem vượt watch_complete_fraction lần đầu.
+- heartbeat final (rời trang, hết video) ghi ngay key đó; khi tắt server bộ đệm được ghi nốt.
+- Lô ghi lỗi thì ghi lại từng key để một key hỏng không chặn cả lô; key lỗi quá MAX_FLUSH_ATTEMPTS
+  lần bị bỏ thay vì nằm mãi trong bộ đệm.
+"""
+import asyncio
+import threading
+from typing import Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import func
+
+from ..models.course_content import CourseContent
+from ..models.progress import Progress, WatchProgress
+from . import progress_summary
+from .config import settings
+
+# Hai đoạn cách nhau ít hơn GAP giây được coi là liền nhau (heartbeat timeupdate ~250ms)
+GAP = 1.0
+# Số lần ghi lỗi liên tiếp của một (user, bài học) trước khi bỏ heartbeat của nó
+MAX_FLUSH_ATTEMPTS = 5
+
+
+def merge_intervals(intervals: Iterable) -> list[list[float]]:
+    """Gộp các đoạn chồng lấn/liền nhau, trả về danh sách đã sắp xếp [[start, end], ...]"""
+    merged: list[list[float]] = []
+    for start, end in sorted((float(s), float(e)) for s, e in intervals if e > s):
+        if merged and start <= merged[-1][1] + GAP:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def clip_intervals(intervals: list[list[float]], duration: Optional[float]) -> list[list[float]]:
+    if not duration:
+        return intervals
+    return [[start, min(end, duration)] for start, end in intervals if start < duration]
+
+
+def watched_seconds(intervals: list[list[float]]) -> float:
+    return round(sum(end - start for start, end in intervals), 2)
+
+
+def watched_fraction(seconds: float, duration: Optional[float]) -> float:
+    return round(min(seconds / duration, 1.0), 4) if duration else 0.0
+
+
+def _insert(dialect_name: str):
+    # ON CONFLICT: PostgreSQL (production) và SQLite (dev) đều hỗ trợ
+    if dialect_name == "sqlite":
+        return sqlite.insert(WatchProgress)
+    return postgresql.insert(WatchProgress)
+
+
+class _Pending:
+    __slots__ = ("intervals", "position", "duration", "attempts")
+
+    def __init__(self):
+        self.intervals: list[list[float]] = []
+        self.position = 0.0
+        self.duration: Optional[float] = None
+        self.attempts = 0  # Số lần ghi lỗi
+
+    def absorb(self, other: "_Pending"):
+        self.intervals = merge_intervals(self.intervals + other.intervals)
+        self.position = other.position
+        self.duration = other.duration or self.duration
+
+
+class WatchTimeBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[int, int], _Pending] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._serve())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._wake = None
+        # Ghi nốt heartbeat còn trong bộ đệm
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception as e:
+            print(f"Error flushing watch progress: {e}")
+
+    async def _serve(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.watch_flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"Error flushing watch progress: {e}")
+
+    def add(self, user_id: int, lesson_id: int, intervals, position: float, duration: Optional[float]):
+        """Gộp heartbeat vào bộ đệm (gọi từ event loop); đầy thì đánh thức vòng ghi"""
+        update = _Pending()
+        update.intervals = merge_intervals(intervals)
+        update.position = position
+        update.duration = duration
+        with self._lock:
+            self._pending.setdefault((user_id, lesson_id), _Pending()).absorb(update)
+            full = len(self._pending) >= settings.watch_buffer_max_entries
+        if full and self._wake is not None:
+            self._wake.set()
+
+    def pending(self, user_id: int, lesson_id: int) -> Optional[_Pending]:
+        with self._lock:
+            entry = self._pending.get((user_id, lesson_id))
+            if entry is None:
+                return None
+            copy = _Pending()
+            copy.absorb(entry)
+            return copy
+
+    def _take(self, keys: Optional[list[tuple[int, int]]]) -> dict[tuple[int, int], _Pending]:
+        with self._lock:
+            if keys is None:
+                batch, self._pending = self._pending, {}
+                return batch
+            return {key: self._pending.pop(key) for key in keys if key in self._pending}
+
+    def _restore(self, batch: dict[tuple[int, int], _Pending], error: Exception):
+        # Ghi lỗi: trả lại bộ đệm, gộp với heartbeat mới đến trong lúc ghi; lỗi quá nhiều lần thì bỏ
+        with self._lock:
+            for key, entry in batch.items():
+                entry.attempts += 1
+                if entry.attempts >= MAX_FLUSH_ATTEMPTS:
+                    print(f"Dropping watch progress {key} after {entry.attempts} failed flushes: {error}")
+                    continue
+                newer = self._pending.get(key)
+                if newer is not None:
+                    entry.absorb(newer)
+                self._pending[key] = entry
+
+    def flush(self, keys: Optional[list[tuple[int, int]]] = None) -> dict[tuple[int, int], dict]:
+        """Ghi bộ đệm (hoặc chỉ keys) vào watch_progress; trả về trạng thái mới của từng key đã ghi"""
+        batch = self._take(keys)
+        if not batch:
+            return {}
+        try:
+            return self._commit(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._restore(batch, e)
+                raise
+            print(f"Error flushing watch progress batch, retrying per key: {e}")
+
+        result = {}
+        for key, entry in batch.items():
+            try:
+                result.update(self._commit({key: entry}))
+            except Exception as e:
+                self._restore({key: entry}, e)
+        return result
+
+    def _commit(self, batch: dict[tuple[int, int], _Pending]) -> dict[tuple[int, int], dict]:
+        from ..db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            result = self._write(db, batch)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write(self, db, batch: dict[tuple[int, int], _Pending]) -> dict[tuple[int, int], dict]:
+        dialect_name = db.bind.dialect.name
+        lessons = {
+            row.id: row
+            for row in db.execute(
+                select(CourseContent.id, CourseContent.khoa_hoc_id, CourseContent.video_duration)
+                .where(CourseContent.id.in_({lesson_id for _, lesson_id in batch}))
+            )
+        }
+        # Bài học đã bị xóa: bỏ heartbeat
+        batch = {key: entry for key, entry in batch.items() if key[1] in lessons}
+        if not batch:
+            return {}
+
+        query = select(WatchProgress).where(tuple_(WatchProgress.user_id, WatchProgress.lesson_id).in_(list(batch)))
+        if dialect_name == "postgresql":
+            # Nhiều worker cùng ghi một (user, bài học): gộp tuần tự trên dòng cũ
+            query = query.with_for_update()
+        existing = {(row.user_id, row.lesson_id): row for row in db.execute(query).scalars()}
+
+        rows, result, crossed = [], {}, []
+        threshold = settings.watch_complete_fraction
+        for (user_id, lesson_id), entry in batch.items():
+            lesson = lessons[lesson_id]
+            duration = lesson.video_duration or entry.duration
+            old = existing.get((user_id, lesson_id))
+            old_intervals = old.watched_intervals if old is not None else []
+            intervals = clip_intervals(merge_intervals(list(old_intervals) + entry.intervals), duration)
+            seconds = watched_seconds(intervals)
+            fraction = watched_fraction(seconds, duration)
+            previous = watched_fraction(old.watched_seconds, duration) if old is not None else 0.0
+            if previous < threshold <= fraction:
+                crossed.append((user_id, lesson_id, lesson.khoa_hoc_id))
+            rows.append({
+                "user_id": user_id,
+                "lesson_id": lesson_id,
+                "course_id": lesson.khoa_hoc_id,
+                "watched_intervals": intervals,
+                "watched_seconds": seconds,
+                "last_position": entry.position,
+            })
+            result[(user_id, lesson_id)] = {
+                "lesson_id": lesson_id,
+                "last_position": entry.position,
+                "watched_seconds": seconds,
+                "duration": duration or None,
+                "watched_fraction": fraction,
+                "completed": fraction >= threshold,
+            }
+
+        stmt = _insert(dialect_name).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[WatchProgress.user_id, WatchProgress.lesson_id],
+            set_={
+                "watched_intervals": stmt.excluded.watched_intervals,
+                "watched_seconds": stmt.excluded.watched_seconds,
+                "last_position": stmt.excluded.last_position,
+                "updated_at": func.now(),
+            },
+        ))
+        if crossed:
+            self._complete(db, crossed)
+        return result
+
+    def _complete(self, db, crossed: list[tuple[int, int, int]]):
+        """Đánh dấu hoàn thành bài học đã xem đủ (qua ORM để hook progress_summary chạy)"""
+        records = {
+            (p.user_id, p.lesson_id): p
+            for p in db.execute(
+                select(Progress).where(tuple_(Progress.user_id, Progress.lesson_id).in_(
+                    [(user_id, lesson_id) for user_id, lesson_id, _ in crossed]
+                ))
+            ).scalars()
+        }
+        changed = []
+        for user_id, lesson_id, course_id in crossed:
+            progress = records.get((user_id, lesson_id))
+            if progress is None:
+                progress = Progress(user_id=user_id, course_id=course_id, lesson_id=lesson_id, completed=True)
+                db.add(progress)
+            elif progress.completed:
+                continue
+            progress.completed = True
+            changed.append(progress)
+        db.flush()
+        for progress in changed:
+            completed_lessons, total_lessons = progress_summary.get_counts(db, progress.user_id, progress.course_id)
+            progress.progress_percentage = progress_summary.percentage(completed_lessons, total_lessons)
+
+
+watch_buffer = WatchTimeBuffer()
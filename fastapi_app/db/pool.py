@@ -0,0 +1,121 @@
+"""
+Pool kết nối có đo đạc: đếm checkout/checkin và histogram thời gian chờ lấy kết nối.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, NullPool
+
+# Mốc histogram thời gian chờ (ms)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histogram = {f"le_{bound}ms": n for bound, n in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            histogram["gt_10000ms"] = self.wait_buckets[-1]
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait": {
+                    "count": self.wait_count,
+                    "avg_ms": round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0,
+                    "max_ms": round(self.wait_max_ms, 3),
+                    "histogram": histogram,
+                },
+            }
+
+
+class _TimedPoolMixin:
+    """Đo thời gian chờ trong _do_get (bao gồm cả lúc chờ QueuePool và lúc mở kết nối mới)"""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.incr("timeouts")
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.record_wait((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        # engine.dispose() tạo pool mới, giữ nguyên bộ đếm
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+def instrument_pool(pool, metrics: PoolMetrics):
+    pool.metrics = metrics
+    event.listen(pool, "checkout", lambda *args: metrics.incr("checkouts"))
+    event.listen(pool, "checkin", lambda *args: metrics.incr("checkins"))
+    event.listen(pool, "connect", lambda *args: metrics.incr("connects"))
+    event.listen(pool, "invalidate", lambda *args: metrics.incr("invalidations"))
+
+
+def pool_status(pool, metrics: PoolMetrics) -> dict:
+    """Trạng thái hiện tại của pool + số liệu tích lũy"""
+    info = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        info.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    else:
+        info["checked_out"] = metrics.checkouts - metrics.checkins
+    info.update(metrics.snapshot())
+    return info
@@ -1,10 +1,103 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
 from ..core.config import settings
+from .pool import PoolMetrics, TimedQueuePool, TimedAsyncAdaptedQueuePool, TimedNullPool, instrument_pool
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def _async_database_url(url: str) -> str:
+    """psycopg 3 dùng chung một driver cho sync và async, chỉ cần đổi scheme"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+def _engine_kwargs(url: str, async_mode: bool = False) -> dict:
+    if settings.db_pgbouncer:
+        # PgBouncer giữ pool phía server; prepared statements không dùng được ở transaction pooling
+        kwargs = {"poolclass": TimedNullPool}
+        if make_url(url).get_driver_name() == "psycopg":
+            kwargs["connect_args"] = {"prepare_threshold": None}
+        return kwargs
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_mode else TimedQueuePool,
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
+pool_metrics = {"sync": PoolMetrics()}
+
+engine = create_engine(settings.database_url, **_engine_kwargs(settings.database_url))
+instrument_pool(engine.pool, pool_metrics["sync"])
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine async chỉ được tạo khi bật DB_ASYNC, tránh mở thêm một pool không dùng tới
+async_engine = None
+AsyncSessionLocal = None
+if settings.db_async:
+    _async_url = _async_database_url(settings.database_url)
+    async_engine = create_async_engine(_async_url, **_engine_kwargs(_async_url, async_mode=True))
+    pool_metrics["async"] = PoolMetrics()
+    instrument_pool(async_engine.sync_engine.pool, pool_metrics["async"])
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class ThreadedAsyncSession:
+    """
+    Bọc Session sync với cùng API như AsyncSession.
+    Mỗi lệnh DB chạy trong threadpool nên route async vẫn chạy được khi tắt DB_ASYNC.
+    """
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
 
 def get_db():
     db = SessionLocal()
@@ -13,3 +106,14 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedAsyncSession(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
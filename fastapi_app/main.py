@@ -3,15 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import json
+import math
 import os
 
 from .core.config import settings
 from .db.base import Base
 from .db.session import engine
-from .api.routes import auth, users, courses, content, progress, discussions, certificates, enrollments, assignments, quiz, stats, reviews, notifications, code_execution, payments, wallet, admin_wallet, assignment_notifications, teacher_dashboard, messages, video_streaming
+from .api.routes import auth, users, courses, content, progress, discussions, certificates, enrollments, assignments, quiz, stats, reviews, notifications, code_execution, payments, wallet, admin_wallet, assignment_notifications, teacher_dashboard, messages, video_streaming, admin_db, realtime, files, course_overview
 from .api.routes import class_schedule as class_schedule_router
 
 # Import models to register metadata with Base
@@ -28,6 +30,9 @@ from .models import payment  # noqa: F401
 from .models import deposit  # noqa: F401
 from .models import message  # noqa: F401
 from .models import class_schedule  # noqa: F401
+from .models import unread_counter  # noqa: F401
+from .models import course_rating  # noqa: F401
+from .models import upload_session  # noqa: F401
 
 
 def create_app() -> FastAPI:
@@ -50,6 +55,11 @@ def create_app() -> FastAPI:
         default_response_class=UTF8JSONResponse
     )
 
+    # Route upload: trả 413 ngay khi body vượt giới hạn, không chờ nhận hết file
+    # (thêm trước CORS để response 413 vẫn có header CORS)
+    from .core.uploads import UploadLimitMiddleware
+    app.add_middleware(UploadLimitMiddleware)
+
     # CORS: Cho phép tất cả origins để tránh lỗi CORS
     # Bao gồm Vercel, Render và localhost cho development
     app.add_middleware(
@@ -58,12 +68,14 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],  # Cho phép tất cả methods
         allow_headers=["*"],  # Cho phép tất cả headers
+        expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count"],  # Cursor phân trang, tổng số
     )
 
     # Routers
     app.include_router(auth.router, prefix="/api")
     app.include_router(users.router, prefix="/api")
     app.include_router(courses.router, prefix="/api")
+    app.include_router(course_overview.router, prefix="/api")
     app.include_router(content.router, prefix="/api")
     app.include_router(progress.router, prefix="/api")
     app.include_router(discussions.router, prefix="/api")
@@ -78,11 +90,15 @@ def create_app() -> FastAPI:
     app.include_router(payments.router, prefix="/api/payments")
     app.include_router(wallet.router, prefix="/api/wallet")
     app.include_router(admin_wallet.router, prefix="/api/admin")
+    app.include_router(admin_db.router, prefix="/api/admin")
     app.include_router(assignment_notifications.router, prefix="/api")
     app.include_router(teacher_dashboard.router, prefix="/api")
     app.include_router(messages.router, prefix="/api")
     app.include_router(video_streaming.router, prefix="/api")
     app.include_router(class_schedule_router.router, prefix="/api")
+    app.include_router(realtime.router, prefix="/api")
+    # File upload qua storage (local/S3); đăng ký trước mount /static nên được ưu tiên
+    app.include_router(files.router)
 
     # Mount static files để serve PDF, video, và các file upload
     static_dir = "static"
@@ -95,22 +111,132 @@ def create_app() -> FastAPI:
         import threading
         import time
         from .api.routes.assignment_notifications import check_and_notify_upcoming_deadlines
+        from .core.unread_counters import reconcile_unread_counters
+        from .core.progress_summary import reconcile_progress_summary
+        from .core.resumable_uploads import cleanup_expired_uploads
+        from .core.uploads import collect_upload_garbage
+        from .core.grading import grader
         from .db.session import SessionLocal
         
         def periodic_check():
+            hours = 0
             while True:
                 time.sleep(3600)  # Chờ 1 giờ
+                hours += 1
                 try:
                     db = SessionLocal()
                     check_and_notify_upcoming_deadlines(db)
                     db.close()
                 except Exception as e:
                     print(f"Error in periodic deadline check: {e}")
+                # Sửa sai lệch của bộ đếm chưa đọc
+                try:
+                    db = SessionLocal()
+                    fixed = reconcile_unread_counters(db)
+                    db.close()
+                    if fixed:
+                        print(f"Reconciled unread counters for {fixed} users")
+                except Exception as e:
+                    print(f"Error in unread counter reconciliation: {e}")
+                # Sửa sai lệch của bảng tóm tắt tiến độ
+                try:
+                    db = SessionLocal()
+                    fixed = reconcile_progress_summary(db)
+                    db.close()
+                    if fixed:
+                        print(f"Reconciled progress summary for {fixed} user/course pairs")
+                except Exception as e:
+                    print(f"Error in progress summary reconciliation: {e}")
+                # Dọn phiên upload video bị bỏ dở
+                try:
+                    db = SessionLocal()
+                    removed = cleanup_expired_uploads(db)
+                    db.close()
+                    if removed:
+                        print(f"Removed {removed} expired upload sessions")
+                except Exception as e:
+                    print(f"Error in upload session cleanup: {e}")
+                # Dọn file upload không còn được tham chiếu
+                if settings.blob_gc_interval_hours and hours % settings.blob_gc_interval_hours == 0:
+                    try:
+                        db = SessionLocal()
+                        report = collect_upload_garbage(db)
+                        db.close()
+                        print(
+                            f"Upload GC: removed {report.removed}/{report.scanned} files, "
+                            f"reclaimed {report.reclaimed_bytes} bytes"
+                        )
+                    except Exception as e:
+                        print(f"Error in upload garbage collection: {e}")
+                # Bài nộp kẹt ở hàng chờ chấm (chấm lỗi, worker chấm đã chết)
+                try:
+                    requeued = grader.requeue_pending()
+                    if requeued:
+                        print(f"Requeued {requeued} submissions for grading")
+                except Exception as e:
+                    print(f"Error requeueing submissions for grading: {e}")
         
         # Chạy task định kỳ trong background thread
         thread = threading.Thread(target=periodic_check, daemon=True)
         thread.start()
 
+    # Kênh realtime: phát sự kiện Message/Notification sau khi commit
+    from .core.realtime import hub, register_model_events
+    register_model_events()
+    # Bộ đếm chưa đọc tăng cùng transaction với insert Message/Notification
+    from .core.unread_counters import register_counter_events
+    register_counter_events()
+    # Cache danh sách khóa học: xóa khi Course thay đổi (sau commit), báo worker khác qua kênh realtime
+    from .core.catalog_cache import register_catalog_events
+    register_catalog_events()
+    # Thống kê đánh giá khóa học cập nhật cùng transaction với Review
+    from .core.course_ratings import register_rating_events
+    register_rating_events()
+    # Tóm tắt tiến độ (user, khóa học) cập nhật cùng transaction với Progress/CourseContent
+    from .core.progress_summary import register_progress_events
+    register_progress_events()
+
+    # Worker sandbox chạy code được khởi động sẵn
+    from .core.sandbox import job_sandbox, sandbox
+    from .core.grading import grader
+    from .core.hls import packager
+    from .core.watch_time import watch_buffer
+
+    @app.on_event("startup")
+    async def start_realtime():
+        await hub.start()
+        await sandbox.start()
+        await job_sandbox.start()
+        await grader.start()
+        await packager.start()
+        await watch_buffer.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        from .db.session import async_engine
+        await hub.stop()
+        await sandbox.stop()
+        await job_sandbox.stop()
+        await grader.stop()
+        await packager.stop()
+        await watch_buffer.stop()
+        if async_engine is not None:
+            await async_engine.dispose()
+
+    # 422 với input là Infinity/NaN (json.loads chấp nhận): trả input dạng chuỗi, không để render JSON lỗi thành 500
+    @app.exception_handler(RequestValidationError)
+    async def validation_exception_handler(request: Request, exc: RequestValidationError):
+        def finite(value):
+            if isinstance(value, float) and not math.isfinite(value):
+                return str(value)
+            if isinstance(value, (list, tuple)):
+                return [finite(v) for v in value]
+            if isinstance(value, dict):
+                return {k: finite(v) for k, v in value.items()}
+            return value
+
+        return JSONResponse(status_code=422, content={"detail": finite(jsonable_encoder(exc.errors()))})
+
     # Exception handler để đảm bảo /api/courses luôn trả về array
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Numeric, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db.base import Base
@@ -15,6 +15,7 @@ class Assignment(Base):
     is_required = Column(Boolean, default=False)
     diem_toi_da = Column(Numeric(5, 2), default=10.0)
     file_path = Column(String(500))  # File đính kèm bài tập
+    ngon_ngu = Column(String(20))  # Bài tập code tự chấm: python, javascript, cpp (NULL = chấm tay)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     course = relationship("Course", backref="assignments")
@@ -30,7 +31,7 @@ class Submission(Base):
     file_path = Column(String(500))
     diem = Column(Numeric(5, 2))
     nhan_xet = Column(Text)
-    trang_thai = Column(String(20), default="submitted")  # submitted, graded, done
+    trang_thai = Column(String(20), default="submitted")  # submitted, grading, grading_claimed (đang chấm), graded, done
     ngay_nop = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -38,5 +39,35 @@ class Submission(Base):
     user = relationship("User", backref="submissions")
 
 
+class TestCase(Base):
+    """Test case của bài tập code: chạy với du_lieu_vao, so sánh output với ket_qua_mong_doi"""
+    __tablename__ = "test_case_bai_tap"
 
+    id = Column(Integer, primary_key=True, index=True)
+    bai_tap_id = Column(Integer, ForeignKey("bai_tap.id", ondelete="CASCADE"), nullable=False, index=True)
+    du_lieu_vao = Column(Text, default="")
+    ket_qua_mong_doi = Column(Text, nullable=False)
+    che_do_so_sanh = Column(String(20), default="exact")  # exact, whitespace, float
+    sai_so = Column(Float, default=1e-6)  # Dùng cho che_do_so_sanh = float
+    trong_so = Column(Numeric(5, 2), default=1)
+    is_hidden = Column(Boolean, default=True)  # Ẩn input/output với học viên
+    thu_tu = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    assignment = relationship("Assignment", backref="test_cases")
+
+
+class TestCaseResult(Base):
+    """Kết quả chấm từng test case của một bài nộp (lần chấm gần nhất)"""
+    __tablename__ = "ket_qua_test_case"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nop_bai_id = Column(Integer, ForeignKey("nop_bai.id", ondelete="CASCADE"), nullable=False, index=True)
+    test_case_id = Column(Integer, ForeignKey("test_case_bai_tap.id", ondelete="CASCADE"), nullable=False)
+    ket_qua = Column(String(30), nullable=False)  # accepted, wrong_answer, runtime_error, time_limit_exceeded, compile_error
+    thoi_gian = Column(Float)  # giây
+    bo_nho_kb = Column(Integer)
+    output = Column(Text)  # Output thực tế (đã cắt ngắn)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    submission = relationship("Submission", backref="test_results")
@@ -1,9 +1,10 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, Numeric
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, Numeric, select
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 
 from ..db.base import Base
+from .course_rating import CourseRating
 
 
 class CourseStatus(str, enum.Enum):
@@ -36,6 +37,20 @@ class Course(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Thống kê đánh giá từ bảng course_ratings, chỉ nạp khi được yêu cầu (undefer_group("rating") / load_only)
+    total_reviews = column_property(
+        func.coalesce(select(CourseRating.total_reviews).where(CourseRating.khoa_hoc_id == id).scalar_subquery(), 0),
+        deferred=True, group="rating",
+    )
+    average_rating = column_property(
+        func.coalesce(
+            select(func.round(CourseRating.rating_sum * 1.0 / func.nullif(CourseRating.total_reviews, 0), 1))
+            .where(CourseRating.khoa_hoc_id == id).scalar_subquery(),
+            0,
+        ),
+        deferred=True, group="rating",
+    )
+
     teacher = relationship("User", backref="courses")
     contents = relationship("CourseContent", back_populates="course", cascade="all, delete-orphan")
     # reviews = relationship("Review", back_populates="course", cascade="all, delete-orphan")  # TODO: Uncomment khi Review model được import
@@ -15,7 +15,10 @@ class CourseContent(Base):
     noi_dung = Column(Text)
     hinh_anh = Column(String(255))
     video_path = Column(String(500))
-    video_duration = Column(Integer, default=0)
+    video_duration = Column(Integer, default=0)  # Giây, đọc từ file MP4 khi upload
+    video_width = Column(Integer, nullable=True)
+    video_height = Column(Integer, nullable=True)
+    video_bitrate = Column(Integer, nullable=True)  # kbps
     thu_tu = Column(Integer, default=0)
     is_unlocked = Column(Boolean, default=True)
     unlock_date = Column(DateTime(timezone=True))
@@ -23,6 +26,11 @@ class CourseContent(Base):
     tai_lieu_pdf = Column(String(500), nullable=True)  # Đường dẫn file PDF
     tai_lieu_links = Column(JSONB, nullable=True)  # Danh sách links: [{"title": "...", "url": "..."}, ...]
     resources = Column(JSONB, nullable=True)  # Tài nguyên khác: [{"type": "pdf|link|code", "title": "...", "url": "...", "description": "..."}, ...]
+    # HLS nhiều mức bitrate (core/hls.py); chưa ready thì phát video_path (MP4)
+    hls_status = Column(String(20), nullable=True)  # pending, processing, ready, failed
+    hls_path = Column(String(500), nullable=True)  # Master playlist: /api/hls/<id>/<version>/master.m3u8
+    hls_renditions = Column(JSONB, nullable=True)  # [{"height": 720, "bitrate": 2800}, ...]
+    hls_claimed_at = Column(DateTime(timezone=True), nullable=True)  # Lúc worker nhận đóng gói (hls_status = processing)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
     course = relationship("Course", back_populates="contents")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+STARS = (1, 2, 3, 4, 5)
+
+
+class CourseRating(Base):
+    """Thống kê đánh giá của mỗi khóa học (thay cho đọc toàn bộ danh_gia_khoa_hoc mỗi lần hiển thị)"""
+    __tablename__ = "course_ratings"
+
+    khoa_hoc_id = Column(Integer, ForeignKey("khoa_hoc.id", ondelete="CASCADE"), primary_key=True)
+    total_reviews = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    star_1 = Column(Integer, default=0, nullable=False)
+    star_2 = Column(Integer, default=0, nullable=False)
+    star_3 = Column(Integer, default=0, nullable=False)
+    star_4 = Column(Integer, default=0, nullable=False)
+    star_5 = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Text, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..db.base import Base
@@ -6,6 +6,12 @@ from ..db.base import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Danh sách cuộc trò chuyện + lịch sử tin nhắn giữa 2 người
+        Index("idx_messages_sender_receiver_created", "sender_id", "receiver_id", "created_at"),
+        # Đếm tin nhắn chưa đọc
+        Index("idx_messages_receiver_da_doc", "receiver_id", "da_doc"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, Boolean, ForeignKey, Float, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from ..db.base import Base
 
@@ -15,4 +16,25 @@ class Progress(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+class ProgressSummary(Base):
+    """Số bài đã hoàn thành / tổng số bài của mỗi (user, khóa học) (thay cho COUNT trên progress và chi_tiet_khoa_hoc)"""
+    __tablename__ = "progress_summary"
 
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("khoa_hoc.id", ondelete="CASCADE"), primary_key=True)
+    completed_lessons = Column(Integer, default=0, nullable=False)
+    total_lessons = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class WatchProgress(Base):
+    """Thời gian xem video của mỗi (user, bài học): các đoạn đã xem (đã gộp) và vị trí xem tiếp"""
+    __tablename__ = "watch_progress"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("chi_tiet_khoa_hoc.id", ondelete="CASCADE"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("khoa_hoc.id", ondelete="CASCADE"), nullable=False)
+    watched_intervals = Column(JSONB, nullable=False, default=list)  # [[start, end], ...] giây, không chồng lấn
+    watched_seconds = Column(Float, default=0.0, nullable=False)
+    last_position = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class UnreadCounter(Base):
+    """Bộ đếm tin nhắn/thông báo chưa đọc của mỗi user (thay cho COUNT(*) mỗi lần poll)"""
+    __tablename__ = "unread_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    messages = Column(Integer, default=0, nullable=False)
+    notifications = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class UploadSession(Base):
+    """Phiên upload video nối tiếp được (core/resumable_uploads.py); xóa khi hoàn tất hoặc hết hạn"""
+    __tablename__ = "phien_upload"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    chi_tiet_id = Column(Integer, ForeignKey("chi_tiet_khoa_hoc.id", ondelete="CASCADE"), nullable=False)
+    ten_file = Column(String(255), nullable=False)
+    kich_thuoc = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
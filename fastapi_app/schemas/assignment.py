@@ -11,6 +11,7 @@ class AssignmentBase(BaseModel):
     is_required: bool = False
     diem_toi_da: Optional[Decimal] = 10.0
     file_path: Optional[str] = None
+    ngon_ngu: Optional[str] = None  # Bài tập code tự chấm
 
     @field_validator('han_nop', mode='before')
     @classmethod
@@ -98,5 +99,48 @@ class SubmissionOut(SubmissionBase):
         from_attributes = True
 
 
+class TestCaseBase(BaseModel):
+    du_lieu_vao: str = ""
+    ket_qua_mong_doi: str
+    che_do_so_sanh: str = "exact"  # exact, whitespace, float
+    sai_so: float = 1e-6
+    trong_so: float = 1
+    is_hidden: bool = True
+    thu_tu: int = 0
 
+    @field_validator('che_do_so_sanh')
+    @classmethod
+    def validate_mode(cls, v):
+        if v not in ("exact", "whitespace", "float"):
+            raise ValueError("che_do_so_sanh phải là exact, whitespace hoặc float")
+        return v
+
+
+class TestCaseCreate(TestCaseBase):
+    pass
+
+
+class TestCaseOut(TestCaseBase):
+    id: int
+    bai_tap_id: int
+    # Ẩn với học viên nếu is_hidden
+    du_lieu_vao: Optional[str] = None
+    ket_qua_mong_doi: Optional[str] = None
 
+    class Config:
+        from_attributes = True
+
+
+class AutoGradingUpdate(BaseModel):
+    ngon_ngu: Optional[str] = None  # None = tắt tự chấm
+
+
+class TestCaseResultOut(BaseModel):
+    test_case_id: int
+    ket_qua: str
+    thoi_gian: Optional[float] = None
+    bo_nho_kb: Optional[int] = None
+    output: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 
 class CodeExecutionRequest(BaseModel):
@@ -13,4 +14,19 @@ class CodeExecutionResponse(BaseModel):
     error: Optional[str] = None
     execution_time: Optional[float] = None
     exit_code: Optional[int] = None
+    cache_hit: Optional[bool] = None  # C++: bỏ qua biên dịch nhờ compile cache
 
+
+
+class CodeJobResponse(BaseModel):
+    id: str
+    language: str
+    status: str  # queued, running, completed, failed, cancelled
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    output: str = ""
+    error: Optional[str] = None
+    execution_time: Optional[float] = None
+    exit_code: Optional[int] = None
+    cache_hit: Optional[bool] = None
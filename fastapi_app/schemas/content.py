@@ -9,6 +9,9 @@ class ContentBase(BaseModel):
     hinh_anh: Optional[str] = None
     video_path: Optional[str] = None
     video_duration: Optional[int] = 0
+    video_width: Optional[int] = None
+    video_height: Optional[int] = None
+    video_bitrate: Optional[int] = None
     thu_tu: Optional[int] = 0
     is_unlocked: Optional[bool] = True
     unlock_date: Optional[datetime] = None
@@ -26,9 +29,30 @@ class ContentOut(ContentBase):
     id: int
     khoa_hoc_id: int
     created_at: Optional[datetime] = None
+    # HLS: chỉ dùng hls_path khi hls_status == "ready", ngược lại phát video_path
+    hls_status: Optional[str] = None
+    hls_path: Optional[str] = None
+    hls_renditions: Optional[List[Dict[str, Any]]] = None
 
     class Config:
         from_attributes = True
 
 
 
+
+class ResumableUploadCreate(BaseModel):
+    ten_file: str
+    kich_thuoc: int  # byte
+    chunk_size: Optional[int] = None  # Mặc định 8MB, giới hạn 1MB - 64MB
+
+
+class ResumableUploadOut(BaseModel):
+    id: str
+    chi_tiet_id: int
+    ten_file: str
+    kich_thuoc: int
+    chunk_size: int
+    total_chunks: int
+    offset: int  # Phần đầu liên tục đã nhận (Upload-Offset)
+    missing_chunks: List[int]
+    expires_at: datetime
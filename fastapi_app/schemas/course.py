@@ -22,6 +22,9 @@ class CourseCreate(CourseBase):
 
 class CourseOut(CourseBase):
     id: int
+    # Từ bảng course_ratings
+    average_rating: float = 0
+    total_reviews: int = 0
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, List, Optional, Tuple
 from datetime import datetime
 
 
@@ -23,4 +23,30 @@ class ProgressOut(ProgressBase):
         from_attributes = True
 
 
+# Giây trong video: số hữu hạn (JSONB của PostgreSQL không nhận Infinity/NaN), tối đa 24 giờ
+Seconds = Annotated[float, Field(ge=0, le=86400, allow_inf_nan=False)]
 
+
+class WatchHeartbeat(BaseModel):
+    # Các đoạn [bắt đầu, kết thúc] (giây) đã xem từ lần gửi trước
+    intervals: List[Tuple[Seconds, Seconds]] = Field(default_factory=list, max_length=200)
+    position: Seconds = 0  # Vị trí đang xem, dùng để xem tiếp
+    duration: Optional[Seconds] = None  # Chỉ dùng khi bài học chưa có video_duration
+    final: bool = False  # Rời trang/dừng xem: ghi ngay thay vì chờ gộp
+
+    @field_validator('intervals')
+    @classmethod
+    def check_intervals(cls, v):
+        for start, end in v:
+            if end < start:
+                raise ValueError("Đoạn xem không hợp lệ")
+        return v
+
+
+class WatchProgressOut(BaseModel):
+    lesson_id: int
+    last_position: float = 0
+    watched_seconds: float = 0
+    duration: Optional[float] = None
+    watched_fraction: float = 0
+    completed: bool = False
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
 import { useAuth } from '../context/AuthContext'
+import { subscribeRealtime, isRealtimeSupported } from '../config/realtime'
 import './ChatWidget.css'
 
 function ChatWidget() {
@@ -34,12 +35,30 @@ function ChatWidget() {
     }
   }, [messages])
 
+  const selectedRef = useRef(null)
   useEffect(() => {
-    // Poll for unread count
+    selectedRef.current = selectedConversation
+  }, [selectedConversation])
+
+  useEffect(() => {
+    // Nhận tin nhắn mới qua kênh realtime; chỉ poll thưa để phòng mất kết nối
     if (user) {
       fetchUnreadCount()
-      const interval = setInterval(fetchUnreadCount, 5000) // Check every 5 seconds
-      return () => clearInterval(interval)
+      const unsubscribe = subscribeRealtime((type, data) => {
+        if (type !== 'message' || data.receiver_id !== user.id) return
+        const current = selectedRef.current
+        if (current && current.user_id === data.sender_id) {
+          fetchMessages(current.user_id)
+        } else {
+          setUnreadCount((count) => count + 1)
+          fetchConversations()
+        }
+      })
+      const interval = setInterval(fetchUnreadCount, isRealtimeSupported() ? 60000 : 5000)
+      return () => {
+        unsubscribe()
+        clearInterval(interval)
+      }
     }
   }, [user])
 
@@ -1,5 +1,6 @@
 import { useState } from 'react'
 import axios from 'axios'
+import { uploadVideoResumable } from '../config/resumableUpload'
 
 export default function LessonResourcesEditor({ lesson, onUpdate }) {
   const [isEditing, setIsEditing] = useState(false)
@@ -11,6 +12,7 @@ export default function LessonResourcesEditor({ lesson, onUpdate }) {
   const [newLink, setNewLink] = useState({ title: '', url: '' })
   const [newResource, setNewResource] = useState({ type: 'link', title: '', url: '', description: '' })
   const [videoLink, setVideoLink] = useState(lesson.video_path || '')
+  const [uploadProgress, setUploadProgress] = useState(null)
 
   const handleAddLink = () => {
     if (newLink.title && newLink.url) {
@@ -80,14 +82,8 @@ export default function LessonResourcesEditor({ lesson, onUpdate }) {
 
     try {
       setLoading(true)
-      const formDataToSend = new FormData()
-      formDataToSend.append('video_file', file)
-
-      await axios.put(`/api/lessons/${lesson.id}`, formDataToSend, {
-        headers: {
-          'Content-Type': 'multipart/form-data'
-        }
-      })
+      // Upload từng chunk, lỗi mạng thì chọn lại đúng file để tiếp tục từ chỗ đang dở
+      await uploadVideoResumable(lesson.id, file, setUploadProgress)
 
       alert('Upload video thành công!')
       if (onUpdate) onUpdate()
@@ -95,6 +91,7 @@ export default function LessonResourcesEditor({ lesson, onUpdate }) {
       alert('Upload thất bại: ' + (error.response?.data?.detail || error.message))
     } finally {
       setLoading(false)
+      setUploadProgress(null)
     }
   }
 
@@ -227,6 +224,15 @@ export default function LessonResourcesEditor({ lesson, onUpdate }) {
                   className="form-control"
                   disabled={loading}
                 />
+                {uploadProgress !== null && (
+                  <div className="progress mt-2" style={{ height: '6px' }}>
+                    <div
+                      className="progress-bar"
+                      role="progressbar"
+                      style={{ width: `${Math.round(uploadProgress * 100)}%` }}
+                    ></div>
+                  </div>
+                )}
               </div>
               <div className="col-md-6">
                 <label className="form-label small text-muted">Hoặc nhập link</label>
@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import axios from 'axios'
 import { useAuth } from '../context/AuthContext'
+import { subscribeRealtime, isRealtimeSupported } from '../config/realtime'
 
 export default function NotificationBell() {
   const { user } = useAuth()
@@ -14,11 +15,19 @@ export default function NotificationBell() {
     if (user) {
       fetchNotifications()
       fetchUnreadCount()
-      // Poll mỗi 30 giây
+      // Thông báo mới được đẩy qua kênh realtime; poll thưa để phòng mất kết nối
+      const unsubscribe = subscribeRealtime((type) => {
+        if (type !== 'notification') return
+        setUnreadCount((count) => count + 1)
+        fetchNotifications()
+      })
       const interval = setInterval(() => {
         fetchUnreadCount()
-      }, 30000)
-      return () => clearInterval(interval)
+      }, isRealtimeSupported() ? 120000 : 30000)
+      return () => {
+        unsubscribe()
+        clearInterval(interval)
+      }
     }
   }, [user])
 
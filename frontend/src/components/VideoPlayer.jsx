@@ -1,7 +1,12 @@
 import { useState, useRef, useEffect } from 'react'
+import axios from 'axios'
+import { createWatchTracker } from '../config/watchTracker'
 
-export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duration: initialDuration, lazy = false }) {
+export default function VideoPlayer({ videoUrl, videoPath, hlsPath, onTimeUpdate, duration: initialDuration, lazy = false, watchUrl, onWatchFlushed }) {
   const videoRef = useRef(null)
+  const trackerRef = useRef(null)
+  const onWatchFlushedRef = useRef(onWatchFlushed)
+  onWatchFlushedRef.current = onWatchFlushed
   const containerRef = useRef(null)
   const [playbackRate, setPlaybackRate] = useState(1)
   const [showControls, setShowControls] = useState(true)
@@ -42,12 +47,43 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
     return () => observer.disconnect()
   }, [lazy, isLoaded])
 
+  // Heartbeat thời gian xem (watchUrl = /api/lessons/{id}/watch) và xem tiếp từ vị trí cũ
+  useEffect(() => {
+    if (!watchUrl || !isLoaded) return
+    const tracker = createWatchTracker(watchUrl, {
+      onFlushed: (data) => onWatchFlushedRef.current && onWatchFlushedRef.current(data)
+    })
+    trackerRef.current = tracker
+
+    let cancelled = false
+    axios.get(watchUrl)
+      .then((response) => {
+        const video = videoRef.current
+        const { last_position: lastPosition, duration: total } = response.data
+        if (cancelled || !video || !lastPosition) return
+        // Gần hết video thì xem lại từ đầu
+        if (!total || lastPosition < total - 5) {
+          video.currentTime = lastPosition
+        }
+      })
+      .catch(() => {})
+
+    return () => {
+      cancelled = true
+      trackerRef.current = null
+      tracker.destroy()
+    }
+  }, [watchUrl, isLoaded])
+
   useEffect(() => {
     const video = videoRef.current
     if (!video || !isLoaded) return
 
     const handleTimeUpdate = () => {
       setCurrentTime(video.currentTime)
+      if (trackerRef.current && !video.paused && !video.seeking) {
+        trackerRef.current.update(video.currentTime, video.duration)
+      }
       if (onTimeUpdate) {
         const videoDuration = video.duration || duration || initialDuration || 0
         onTimeUpdate(video.currentTime, videoDuration)
@@ -60,7 +96,13 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
     }
 
     const handlePlay = () => setIsPlaying(true)
-    const handlePause = () => setIsPlaying(false)
+    const handlePause = () => {
+      setIsPlaying(false)
+      if (trackerRef.current) trackerRef.current.pause()
+    }
+    const handleEnded = () => {
+      if (trackerRef.current) trackerRef.current.ended()
+    }
     
     const handleWaiting = () => setIsBuffering(true)
     const handleCanPlay = () => setIsBuffering(false)
@@ -74,6 +116,7 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
     video.addEventListener('loadedmetadata', handleLoadedMetadata)
     video.addEventListener('play', handlePlay)
     video.addEventListener('pause', handlePause)
+    video.addEventListener('ended', handleEnded)
     video.addEventListener('waiting', handleWaiting)
     video.addEventListener('canplay', handleCanPlay)
     video.addEventListener('error', handleError)
@@ -83,6 +126,7 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
       video.removeEventListener('loadedmetadata', handleLoadedMetadata)
       video.removeEventListener('play', handlePlay)
       video.removeEventListener('pause', handlePause)
+      video.removeEventListener('ended', handleEnded)
       video.removeEventListener('waiting', handleWaiting)
       video.removeEventListener('canplay', handleCanPlay)
       video.removeEventListener('error', handleError)
@@ -187,6 +231,9 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
   }
 
   const optimizedUrl = getOptimizedVideoUrl()
+  // HLS nhiều mức bitrate (Safari/iOS/Android phát native); trình duyệt khác bỏ qua và dùng MP4
+  const hlsSupported = typeof document !== 'undefined' &&
+    document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== ''
 
   // Nếu lazy loading và chưa load, hiển thị placeholder
   if (lazy && !isLoaded) {
@@ -237,6 +284,9 @@ export default function VideoPlayer({ videoUrl, videoPath, onTimeUpdate, duratio
         preload="metadata"  // Chỉ preload metadata, không tải toàn bộ video
         playsInline  // Tối ưu cho mobile
       >
+        {hlsPath && hlsSupported && (
+          <source src={hlsPath} type="application/vnd.apple.mpegurl" />
+        )}
         <source src={optimizedUrl} type="video/mp4" />
         {subtitleTrack && (
           <track
@@ -0,0 +1,17 @@
+// Ảnh upload (/static/uploads/...) có bản thu nhỏ qua ?w= (fastapi_app/core/images.py):
+// trả src/srcSet/sizes để trình duyệt tự chọn độ rộng; server trả WebP nếu trình duyệt hỗ trợ
+const WIDTHS = [160, 320, 640, 960, 1280]
+const IMAGE_EXTENSIONS = /\.(jpe?g|png|gif|webp)$/i
+
+export function responsiveImage(url, sizes, width = 640) {
+  if (!url || !url.includes('/static/uploads/') || !IMAGE_EXTENSIONS.test(url.split('?')[0])) {
+    // Ảnh ngoài (link nhập tay) hoặc định dạng khác: dùng nguyên URL
+    return { src: url }
+  }
+  const sep = url.includes('?') ? '&' : '?'
+  return {
+    src: `${url}${sep}w=${width}`,
+    srcSet: WIDTHS.map((w) => `${url}${sep}w=${w} ${w}w`).join(', '),
+    sizes
+  }
+}
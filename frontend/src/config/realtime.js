@@ -0,0 +1,51 @@
+// Kênh realtime dùng chung (SSE) cho ChatWidget và NotificationBell
+// Một EventSource cho cả ứng dụng; các component đăng ký listener theo loại sự kiện
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || ''
+
+const listeners = new Set()
+let source = null
+let currentToken = null
+
+function connect() {
+  const token = localStorage.getItem('token')
+  if (!token || typeof EventSource === 'undefined') return
+  if (source && token === currentToken) return
+
+  if (source) source.close()
+  currentToken = token
+  source = new EventSource(`${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(token)}`)
+
+  const forward = (type) => (e) => {
+    let data = {}
+    try {
+      data = JSON.parse(e.data)
+    } catch (err) {
+      return
+    }
+    listeners.forEach((listener) => listener(type, data))
+  }
+  source.addEventListener('message', forward('message'))
+  source.addEventListener('notification', forward('notification'))
+}
+
+function disconnect() {
+  if (source) {
+    source.close()
+    source = null
+    currentToken = null
+  }
+}
+
+// Trả về hàm hủy đăng ký; tự đóng kết nối khi không còn listener
+export function subscribeRealtime(listener) {
+  listeners.add(listener)
+  connect()
+  return () => {
+    listeners.delete(listener)
+    if (listeners.size === 0) disconnect()
+  }
+}
+
+export function isRealtimeSupported() {
+  return typeof EventSource !== 'undefined'
+}
@@ -0,0 +1,74 @@
+// Upload video bài học nối tiếp được (/api/lessons/{id}/video-uploads)
+// Gửi nhiều chunk song song, tự thử lại chunk lỗi; mất mạng hoặc tải lại trang thì tiếp tục từ chunk còn thiếu
+import axios from './axios'
+
+const CHUNK_SIZE = 8 * 1024 * 1024
+const PARALLEL = 3
+const RETRIES = 5
+
+const storageKey = (lessonId, file) =>
+  `video-upload:${lessonId}:${file.name}:${file.size}:${file.lastModified}`
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+async function getSession(lessonId, file) {
+  const key = storageKey(lessonId, file)
+  const savedId = localStorage.getItem(key)
+  if (savedId) {
+    try {
+      const res = await axios.get(`/api/video-uploads/${savedId}`)
+      return res.data
+    } catch (err) {
+      // Phiên đã hết hạn hoặc bị hủy: tạo phiên mới
+      localStorage.removeItem(key)
+    }
+  }
+  const res = await axios.post(`/api/lessons/${lessonId}/video-uploads`, {
+    ten_file: file.name,
+    kich_thuoc: file.size,
+    chunk_size: CHUNK_SIZE
+  })
+  localStorage.setItem(key, res.data.id)
+  return res.data
+}
+
+async function sendChunk(session, file, index) {
+  const start = index * session.chunk_size
+  const blob = file.slice(start, Math.min(start + session.chunk_size, file.size))
+  for (let attempt = 0; ; attempt++) {
+    try {
+      await axios.patch(`/api/video-uploads/${session.id}`, blob, {
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(start)
+        }
+      })
+      return blob.size
+    } catch (err) {
+      const status = err.response?.status
+      // Lỗi mạng / 5xx thì thử lại, lỗi 4xx (hết hạn, sai offset) thì dừng
+      if (attempt >= RETRIES || (status && status < 500)) throw err
+      await sleep(1000 * 2 ** attempt)
+    }
+  }
+}
+
+export async function uploadVideoResumable(lessonId, file, onProgress) {
+  const session = await getSession(lessonId, file)
+  const queue = [...session.missing_chunks]
+  let uploaded = file.size - queue.reduce((sum, i) => sum + Math.min(session.chunk_size, file.size - i * session.chunk_size), 0)
+  if (onProgress) onProgress(uploaded / file.size)
+
+  const worker = async () => {
+    while (queue.length) {
+      const index = queue.shift()
+      uploaded += await sendChunk(session, file, index)
+      if (onProgress) onProgress(uploaded / file.size)
+    }
+  }
+  await Promise.all(Array.from({ length: PARALLEL }, worker))
+
+  const res = await axios.post(`/api/video-uploads/${session.id}/complete`)
+  localStorage.removeItem(storageKey(lessonId, file))
+  return res.data
+}
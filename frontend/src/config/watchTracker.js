@@ -0,0 +1,78 @@
+// Heartbeat thời gian xem video: gom các đoạn đã xem rồi gửi theo lô tới POST /api/lessons/{id}/watch
+// Server gộp thêm trong bộ nhớ và ghi DB theo chu kỳ, nên client chỉ gửi mỗi FLUSH_INTERVAL_MS
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || ''
+
+const FLUSH_INTERVAL_MS = 15000
+// Nhảy xa hơn SEEK_GAP giây giữa hai timeupdate là tua, không tính là đã xem
+const SEEK_GAP = 2
+
+export function createWatchTracker(url, { onFlushed } = {}) {
+  let intervals = []
+  let current = null  // Đoạn đang xem [start, end]
+  let position = 0
+  let duration = null
+  let timer = null
+  let touched = false  // Chưa phát thì không gửi gì
+
+  const closeInterval = () => {
+    if (current && current[1] > current[0]) intervals.push(current)
+    current = null
+  }
+
+  const send = (final) => {
+    closeInterval()
+    if (!touched || (intervals.length === 0 && !final)) return
+    const body = JSON.stringify({ intervals, position, duration, final })
+    intervals = []
+    const token = localStorage.getItem('token')
+    // keepalive: vẫn gửi được khi trang đang đóng/chuyển route
+    fetch(`${API_BASE_URL}${url}`, {
+      method: 'POST',
+      keepalive: true,
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {})
+      },
+      body
+    })
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (data && onFlushed) onFlushed(data)
+      })
+      .catch(() => {})
+  }
+
+  const handleVisibility = () => {
+    if (document.visibilityState === 'hidden') send(true)
+  }
+  document.addEventListener('visibilitychange', handleVisibility)
+
+  return {
+    // Gọi từ timeupdate
+    update(time, videoDuration) {
+      if (videoDuration && isFinite(videoDuration)) duration = videoDuration
+      if (current && (time < current[1] || time - current[1] > SEEK_GAP)) {
+        closeInterval()
+      }
+      if (!current) current = [time, time]
+      current[1] = time
+      position = time
+      touched = true
+      if (!timer) timer = setInterval(() => send(false), FLUSH_INTERVAL_MS)
+    },
+    // Tạm dừng: đóng đoạn đang xem
+    pause() {
+      closeInterval()
+    },
+    // Hết video: ghi ngay để server cập nhật hoàn thành
+    ended() {
+      send(true)
+    },
+    destroy() {
+      clearInterval(timer)
+      timer = null
+      document.removeEventListener('visibilitychange', handleVisibility)
+      send(true)
+    }
+  }
+}
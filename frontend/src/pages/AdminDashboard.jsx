@@ -176,6 +176,23 @@ export default function AdminDashboard() {
     }
   }
 
+  const handleCourseImageUpload = async (e) => {
+    const file = e.target.files?.[0]
+    if (!file) return
+    setActionLoading({ ...actionLoading, image: true })
+    try {
+      const formData = new FormData()
+      formData.append('file', file)
+      const res = await axios.post('/api/course-images', formData)
+      setNewCourse((prev) => ({ ...prev, hinh_anh: res.data.url }))
+    } catch (error) {
+      alert('Tải ảnh thất bại: ' + (error.response?.data?.detail || error.message))
+    } finally {
+      setActionLoading({ ...actionLoading, image: false })
+      e.target.value = ''
+    }
+  }
+
   const handleEditCourse = (course) => {
     setEditingCourse(course)
     setNewCourse({
@@ -536,6 +553,14 @@ export default function AdminDashboard() {
                           value={newCourse.hinh_anh}
                           onChange={(e) => setNewCourse({ ...newCourse, hinh_anh: e.target.value })}
                         />
+                        <input
+                          type="file"
+                          className="form-control mt-2"
+                          accept="image/jpeg,image/png,image/gif,image/webp"
+                          onChange={handleCourseImageUpload}
+                          disabled={actionLoading.image}
+                        />
+                        <small className="text-muted">Hoặc tải ảnh lên (tự tạo ảnh thu nhỏ cho từng kích thước màn hình)</small>
                       </div>
                     </div>
                     <div className="mt-3 d-flex justify-content-end gap-2">
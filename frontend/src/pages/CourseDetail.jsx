@@ -19,46 +19,28 @@ export default function CourseDetail() {
   const [showPaymentModal, setShowPaymentModal] = useState(false)
 
   useEffect(() => {
-    fetchCourse()
-    fetchLessons()
-    checkEnrollment()
+    fetchOverview()
   }, [id, user])
 
-  const fetchCourse = async () => {
+  // Khóa học, bài học và trạng thái đăng ký trong một request
+  const fetchOverview = async () => {
     try {
-      const response = await axios.get(`/api/courses/${id}`)
-      setCourse(response.data)
-    } catch (error) {
-      console.error('Failed to fetch course:', error)
-    }
-  }
-
-  const fetchLessons = async () => {
-    try {
-      const response = await axios.get(`/api/courses/${id}/lessons`)
-      const sortedLessons = response.data.sort((a, b) => a.thu_tu - b.thu_tu)
-      setLessons(sortedLessons)
-      if (sortedLessons.length > 0) {
-        setSelectedLesson(sortedLessons[0])
+      const include = user ? 'lessons,enrollment' : 'lessons'
+      const response = await axios.get(`/api/courses/${id}/overview`, { params: { include } })
+      const { course, lessons, enrollment } = response.data
+      setCourse(course)
+      setLessons(lessons)
+      if (lessons.length > 0) {
+        setSelectedLesson(lessons[0])
       }
+      setIsEnrolled(Boolean(enrollment?.is_enrolled))
     } catch (error) {
-      console.error('Failed to fetch lessons:', error)
+      console.error('Failed to fetch course:', error)
     } finally {
       setLoading(false)
     }
   }
 
-  const checkEnrollment = async () => {
-    if (!user) return
-    try {
-      const response = await axios.get(`/api/courses/${id}/enrollment`)
-      setIsEnrolled(response.data.is_enrolled)
-    } catch (error) {
-      console.error('Failed to check enrollment:', error)
-      setIsEnrolled(false)
-    }
-  }
-
   const handleEnroll = async () => {
     if (!user) {
       setEnrollError('Vui lòng đăng nhập để đăng ký khóa học')
@@ -2,6 +2,14 @@ import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import axios from 'axios'
 import { useAuth } from '../context/AuthContext'
+import { responsiveImage } from '../config/images'
+
+// Thẻ khóa học: 3 cột trên desktop (col-md-4), 1 cột trên mobile
+const COURSE_CARD_SIZES = '(min-width: 768px) 33vw, 100vw'
+const SEARCH_PAGE_SIZE = 24
+const PAGE_SIZE = 24
+// Chỉ lấy các trường thẻ khóa học hiển thị (fields= của /api/courses)
+const CARD_FIELDS = 'id,tieu_de,mo_ta,cap_do,hinh_anh,gia,so_buoi,hinh_thuc,average_rating,total_reviews'
 
 export default function Courses() {
   const { user } = useAuth()
@@ -19,7 +27,10 @@ export default function Courses() {
   const [search, setSearch] = useState('')
   const [level, setLevel] = useState('')
   const [mode, setMode] = useState('')
-  const [sort, setSort] = useState('newest')
+  const [sort, setSort] = useState('')  // '' = liên quan nhất khi tìm kiếm, mới nhất khi không
+  const [searchTotal, setSearchTotal] = useState(null)  // Tổng kết quả tìm kiếm (null khi không tìm)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)  // Cursor trang kế của danh sách (header X-Next-Cursor)
 
   useEffect(() => {
     fetchCourses()
@@ -50,13 +61,13 @@ export default function Courses() {
   const fetchStats = async () => {
     try {
       const [coursesRes] = await Promise.all([
-        axios.get('/api/courses')
+        axios.get(`/api/courses?limit=3&fields=${CARD_FIELDS}`)
       ])
       // Đảm bảo coursesRes.data là array
       const coursesData = Array.isArray(coursesRes.data) ? coursesRes.data : []
       
       setStats({
-        totalCourses: coursesData.length || 0,
+        totalCourses: Number(coursesRes.headers['x-total-count']) || coursesData.length || 0,
         totalStudents: 150, // Placeholder
         totalTeachers: 25 // Placeholder
       })
@@ -70,19 +81,46 @@ export default function Courses() {
     }
   }
 
+  // Tìm kiếm theo độ liên quan, có đoạn trích tô sáng và phân trang (/api/courses/search)
+  const fetchSearchPage = async (offset) => {
+    const params = new URLSearchParams({ q: search.trim(), limit: SEARCH_PAGE_SIZE, offset })
+    if (level) params.append('cap_do', level)
+    if (mode) params.append('hinh_thuc', mode)
+    const response = await axios.get(`/api/courses/search?${params.toString()}`)
+    setSearchTotal(response.data.total || 0)
+    return Array.isArray(response.data.items) ? response.data.items : []
+  }
+
+  // Danh sách theo bộ lọc, phân trang keyset: trang kế lấy bằng cursor
+  const fetchCatalogPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: PAGE_SIZE, fields: CARD_FIELDS })
+    if (search) params.append('q', search)
+    if (level) params.append('cap_do', level)
+    if (mode) params.append('hinh_thuc', mode)
+    if (sort) params.append('sort', sort)
+    if (cursor) params.append('cursor', cursor)
+
+    const response = await axios.get(`/api/courses?${params.toString()}`)
+    // Đảm bảo response.data là array trước khi set
+    return {
+      items: Array.isArray(response.data) ? response.data : [],
+      cursor: response.headers['x-next-cursor'] || null
+    }
+  }
+
   const fetchCourses = async () => {
     try {
       setLoading(true)
-      const params = new URLSearchParams()
-      if (search) params.append('q', search)
-      if (level) params.append('cap_do', level)
-      if (mode) params.append('hinh_thuc', mode)
-      if (sort) params.append('sort', sort)
-
-      const response = await axios.get(`/api/courses?${params.toString()}`)
-      // Đảm bảo response.data là array trước khi set
-      const coursesData = Array.isArray(response.data) ? response.data : []
-      setCourses(coursesData)
+      if (search.trim() && !sort) {
+        setNextCursor(null)
+        setCourses(await fetchSearchPage(0))
+        setError('')
+        return
+      }
+      setSearchTotal(null)
+      const { items, cursor } = await fetchCatalogPage(null)
+      setCourses(items)
+      setNextCursor(cursor)
       setError('')
     } catch (error) {
       setError('Không thể tải danh sách khóa học')
@@ -94,6 +132,24 @@ export default function Courses() {
     }
   }
 
+  const loadMoreResults = async () => {
+    try {
+      setLoadingMore(true)
+      if (searchTotal !== null) {
+        const items = await fetchSearchPage(courses.length)
+        setCourses((prev) => [...prev, ...items])
+      } else {
+        const { items, cursor } = await fetchCatalogPage(nextCursor)
+        setCourses((prev) => [...prev, ...items])
+        setNextCursor(cursor)
+      }
+    } catch (error) {
+      console.error(error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleSearch = (e) => {
     e.preventDefault()
     fetchCourses()
@@ -293,7 +349,8 @@ export default function Courses() {
                   <div className="course-card h-100 featured-course">
                     {course.hinh_anh ? (
                       <img
-                        src={course.hinh_anh}
+                        {...responsiveImage(course.hinh_anh, COURSE_CARD_SIZES)}
+                        loading="lazy"
                         className="course-card-img"
                         alt={course.tieu_de}
                       />
@@ -430,6 +487,7 @@ export default function Courses() {
                 handleFilterChange()
               }}
             >
+              <option value="">Phù hợp nhất</option>
               <option value="newest">Mới nhất</option>
               <option value="price_asc">Giá tăng dần</option>
               <option value="price_desc">Giá giảm dần</option>
@@ -453,7 +511,8 @@ export default function Courses() {
                 <div className="course-card h-100">
                   {course.hinh_anh ? (
                     <img
-                      src={course.hinh_anh}
+                      {...responsiveImage(course.hinh_anh, COURSE_CARD_SIZES)}
+                      loading="lazy"
                       className="course-card-img"
                       alt={course.tieu_de}
                     />
@@ -463,14 +522,24 @@ export default function Courses() {
                     </div>
                   )}
                   <div className="course-card-body">
-                    <h5 className="course-card-title">{course.tieu_de}</h5>
-                    <p className="course-card-text">
-                      {course.mo_ta
-                        ? course.mo_ta.length > 120
-                          ? course.mo_ta.substring(0, 120) + '...'
-                          : course.mo_ta
-                        : 'Không có mô tả'}
-                    </p>
+                    {course.snippet !== undefined ? (
+                      <>
+                        {/* HTML từ server đã escape, chỉ có thẻ <mark> quanh từ khớp */}
+                        <h5 className="course-card-title" dangerouslySetInnerHTML={{ __html: course.tieu_de_highlight }} />
+                        <p className="course-card-text" dangerouslySetInnerHTML={{ __html: course.snippet || 'Không có mô tả' }} />
+                      </>
+                    ) : (
+                      <>
+                        <h5 className="course-card-title">{course.tieu_de}</h5>
+                        <p className="course-card-text">
+                          {course.mo_ta
+                            ? course.mo_ta.length > 120
+                              ? course.mo_ta.substring(0, 120) + '...'
+                              : course.mo_ta
+                            : 'Không có mô tả'}
+                        </p>
+                      </>
+                    )}
                     <div className="d-flex align-items-center gap-2 mb-2">
                       <span className="badge-custom badge-info">
                         {course.cap_do || 'N/A'}
@@ -482,6 +551,12 @@ export default function Courses() {
                     <div className="d-flex align-items-center text-muted small mb-2">
                       <i className="bi bi-calendar-check me-1"></i>
                       {course.so_buoi || 0} buổi
+                      {course.total_reviews > 0 && (
+                        <span className="ms-3">
+                          <i className="bi bi-star-fill text-warning me-1"></i>
+                          {course.average_rating.toFixed(1)} ({course.total_reviews})
+                        </span>
+                      )}
                     </div>
                     <div className="mt-auto">
                       <p className="course-card-price mb-3">
@@ -500,6 +575,15 @@ export default function Courses() {
             ))}
           </div>
         )}
+        {((searchTotal !== null && courses.length < searchTotal) || (searchTotal === null && nextCursor)) && (
+          <div className="text-center mt-4">
+            <button className="btn btn-outline-primary" onClick={loadMoreResults} disabled={loadingMore}>
+              {loadingMore
+                ? 'Đang tải...'
+                : searchTotal !== null ? `Xem thêm (${courses.length}/${searchTotal})` : 'Xem thêm'}
+            </button>
+          </div>
+        )}
       </div>
     </>
   )
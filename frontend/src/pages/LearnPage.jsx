@@ -7,6 +7,7 @@ import QuizCreator from '../components/QuizCreator'
 import CodingPlayground from '../components/CodingPlayground'
 import LessonResourcesEditor from '../components/LessonResourcesEditor'
 import VideoPlayer from '../components/VideoPlayer'
+import { responsiveImage } from '../config/images'
 
 // Discussion Section Component
 function DiscussionSection({ courseId, teacher }) {
@@ -225,7 +226,8 @@ function DiscussionSection({ courseId, teacher }) {
                 {discussion.hinh_anh && (
                   <div className="mb-3">
                     <img 
-                      src={discussion.hinh_anh} 
+                      {...responsiveImage(discussion.hinh_anh, '500px')}
+                      loading="lazy"
                       alt="Hình ảnh đính kèm" 
                       className="img-fluid rounded"
                       style={{ maxWidth: '500px', maxHeight: '400px', objectFit: 'contain' }}
@@ -328,7 +330,8 @@ function DiscussionSection({ courseId, teacher }) {
                           {reply.hinh_anh && (
                             <div className="mt-2">
                               <img 
-                                src={reply.hinh_anh} 
+                                {...responsiveImage(reply.hinh_anh, '500px')}
+                                loading="lazy"
                                 alt="Hình ảnh đính kèm" 
                                 className="img-fluid rounded"
                                 style={{ maxWidth: '500px', maxHeight: '400px', objectFit: 'contain' }}
@@ -943,12 +946,7 @@ export default function LearnPage() {
   const fetchData = async () => {
     try {
       setLoading(true)
-      await Promise.all([
-        fetchCourse(),
-        fetchLessons(),
-        fetchProgress(),
-        fetchTeacher()
-      ])
+      await fetchOverview()
     } catch (error) {
       console.error('Failed to fetch data:', error)
     } finally {
@@ -977,50 +975,35 @@ export default function LearnPage() {
     return isTeacherRole && isCourseOwner
   }, [user, course])
 
-  const fetchCourse = async () => {
-    const response = await axios.get(`/api/courses/${courseId}`)
-    setCourse(response.data)
+  // Khóa học, bài học, giáo viên và tiến độ trong một request
+  const fetchOverview = async () => {
+    const response = await axios.get(`/api/courses/${courseId}/overview`, {
+      params: { include: 'lessons,teacher,progress' }
+    })
+    const { course, lessons, teacher, progress } = response.data
+    setCourse(course)
+    setLessons(lessons)
+    if (lessons.length > 0 && !selectedLesson) {
+      setSelectedLesson(lessons[0])
+    }
+    setTeacher(teacher)
+    applyProgress(progress)
   }
 
-  const fetchLessons = async () => {
-    const response = await axios.get(`/api/courses/${courseId}/lessons`)
-    const sortedLessons = response.data.sort((a, b) => a.thu_tu - b.thu_tu)
-    setLessons(sortedLessons)
-    if (sortedLessons.length > 0 && !selectedLesson) {
-      setSelectedLesson(sortedLessons[0])
-    }
+  const applyProgress = (progress) => {
+    setProgress(progress)
+    setCompletedLessons(new Set(progress?.completed_lesson_ids || []))
   }
 
   const fetchProgress = async () => {
     try {
-      const response = await axios.get(`/api/courses/${courseId}/progress`)
-      setProgress(response.data)
-      
-      // Fetch tất cả progress của user để biết bài nào đã completed
-      const allProgressResponse = await axios.get('/api/users/me/progress')
-      const completedSet = new Set()
-      allProgressResponse.data.forEach(p => {
-        if (p.course_id === parseInt(courseId) && p.completed && p.lesson_id) {
-          completedSet.add(p.lesson_id)
-        }
-      })
-      setCompletedLessons(completedSet)
+      const response = await axios.get(`/api/courses/${courseId}/overview`, { params: { include: 'progress' } })
+      applyProgress(response.data.progress)
     } catch (error) {
       console.error('Failed to fetch progress:', error)
     }
   }
 
-  const fetchTeacher = async () => {
-    if (course?.teacher_id) {
-      try {
-        const response = await axios.get(`/api/users/${course.teacher_id}`)
-        setTeacher(response.data)
-      } catch (error) {
-        console.error('Failed to fetch teacher:', error)
-      }
-    }
-  }
-
   const markLessonComplete = async (lessonId, completed = true) => {
     try {
       await axios.post(`/api/courses/${courseId}/progress`, {
@@ -1050,10 +1033,12 @@ export default function LearnPage() {
       ...prev,
       [lessonId]: watchedPercentage
     }))
-    
-    // Tự động đánh dấu completed nếu xem >80% video
-    if (watchedPercentage >= 80 && !completedLessons.has(lessonId)) {
-      markLessonComplete(lessonId, true)
+  }
+
+  // Server tự đánh dấu hoàn thành khi thời gian xem thực tế đủ tỉ lệ (không dựa vào vị trí tua tới)
+  const handleWatchFlushed = (lessonId, data) => {
+    if (data.completed && !completedLessons.has(lessonId)) {
+      fetchProgress()
     }
   }
 
@@ -1404,11 +1389,14 @@ export default function LearnPage() {
                                     <VideoPlayer 
                                       videoUrl={videoUrl}
                                       videoPath={lesson.video_path}
+                                      hlsPath={lesson.hls_status === 'ready' ? lesson.hls_path : null}
                                       duration={lesson.video_duration}
                                       lazy={true}  // Lazy load video để tối ưu performance
                                       onTimeUpdate={(time, duration) => {
                                         handleVideoTimeUpdate(lesson.id, time, duration)
                                       }}
+                                      watchUrl={`/api/lessons/${lesson.id}/watch`}
+                                      onWatchFlushed={(data) => handleWatchFlushed(lesson.id, data)}
                                     />
                                     <div className="mt-3 d-flex justify-content-between align-items-center">
                                       <div>
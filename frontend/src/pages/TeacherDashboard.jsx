@@ -26,7 +26,8 @@ export default function TeacherDashboard() {
       // Lấy stats và courses cùng lúc
       const [statsRes, coursesRes, studentsRes, submissionsRes] = await Promise.all([
         axios.get('/api/teachers/me/stats'),
-        axios.get('/api/teachers/me/courses/with-stats'),
+        // Chỉ các cột bảng khóa học hiển thị (không kèm mô tả)
+        axios.get('/api/teachers/me/courses/with-stats?fields=id,tieu_de,cap_do,hinh_thuc,gia,student_count'),
         axios.get('/api/teachers/me/students'),
         axios.get('/api/teachers/me/pending-submissions')
       ])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark tải cho các route đọc nhiều (requests/sec, p50/p99).
+
+Chạy server 2 lần, một lần DB_ASYNC=false (trước) và một lần DB_ASYNC=true (sau), rồi so sánh:
+    uvicorn fastapi_app.main:app --port 8000
+    python scripts/bench_api_load.py --base-url http://localhost:8000 --token <JWT> --course-id 1
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _request(url: str, token: str | None) -> tuple[float, int]:
+    req = urllib.request.Request(url)
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            code = resp.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    except Exception:
+        code = 0
+    return time.perf_counter() - start, code
+
+
+def bench(url: str, token: str | None, total: int, concurrency: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: _request(url, token), range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if r[1] != 200)
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark requests/sec cho các route đọc nhiều")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", help="JWT cho các route cần đăng nhập")
+    parser.add_argument("--course-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    paths = [
+        ("/api/courses", False),
+        (f"/api/courses/{args.course_id}/lessons", False),
+        ("/api/notifications", True),
+        ("/api/notifications/unread-count", True),
+        ("/api/messages/conversations", True),
+        ("/api/messages/unread-count", True),
+    ]
+
+    print(f"{'path':45} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for path, needs_auth in paths:
+        if needs_auth and not args.token:
+            print(f"{path:45} {'(bỏ qua: cần --token)':>40}")
+            continue
+        r = bench(args.base_url + path, args.token if needs_auth else None, args.requests, args.concurrency)
+        print(f"{path:45} {r['rps']:10.1f} {r['p50_ms']:10.1f} {r['p99_ms']:10.1f} {r['errors']:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark chạy code Python đồng thời: subprocess mỗi request (cũ) so với pool worker sandbox.
+
+Đo latency p50/p99 của N lần chạy gửi cùng lúc (mặc định 100), không qua HTTP.
+    python scripts/bench_code_execution.py --runs 100 --workers 4
+(cần DATABASE_URL/JWT_SECRET trong môi trường hoặc .env như khi chạy server)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi_app.api.routes.code_execution import execute_python  # noqa: E402
+from fastapi_app.core.config import settings  # noqa: E402
+from fastapi_app.core.sandbox import SandboxManager  # noqa: E402
+
+CODE = "import math\nprint(sum(math.isqrt(i) for i in range(20000)))"
+
+
+def _summary(latencies: list[float], elapsed: float) -> str:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+    return f"p50={p50:8.1f}ms  p99={p99:8.1f}ms  total={elapsed:6.2f}s"
+
+
+def bench_legacy(runs: int, threads: int) -> str:
+    def one(_):
+        start = time.perf_counter()
+        execute_python(CODE)
+        return time.perf_counter() - start
+
+    # anyio mặc định 40 thread cho route sync
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(one, range(runs)))
+        return _summary(latencies, time.perf_counter() - start)
+
+
+async def bench_pool(runs: int) -> str:
+    manager = SandboxManager()
+    await manager.start()
+    try:
+        async def one(user_id):
+            start = time.perf_counter()
+            await manager.execute(user_id, "python", CODE, None, timeout=10)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(runs)))
+        return _summary(list(latencies), time.perf_counter() - start)
+    finally:
+        await manager.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh latency chạy code: subprocess vs pool sandbox")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=settings.sandbox_workers)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+
+    settings.sandbox_workers = args.workers
+    settings.sandbox_queue_size = max(settings.sandbox_queue_size, args.runs)
+
+    print(f"{args.runs} lần chạy Python đồng thời")
+    print(f"  subprocess ({args.threads} thread): {bench_legacy(args.runs, args.threads)}")
+    print(f"  sandbox pool ({args.workers} worker):  {asyncio.run(bench_pool(args.runs))}")
+
+
+if __name__ == "__main__":
+    main()
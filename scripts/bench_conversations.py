@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark danh sách cuộc trò chuyện: cách cũ (N+1) so với query window function.
+
+Dữ liệu giả được tạo trong một transaction và rollback khi xong, không ghi lại vào DB.
+    DATABASE_URL=... python scripts/bench_conversations.py --messages 10000 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, or_, and_, func
+
+from fastapi_app.db.session import SessionLocal
+from fastapi_app.models.message import Message
+from fastapi_app.models.user import User, UserRole
+from fastapi_app.api.routes.messages import conversation_summaries_query
+
+
+def legacy_conversations(db, user_id: int) -> int:
+    """Thuật toán cũ: load toàn bộ tin nhắn rồi 3 query cho mỗi người"""
+    all_messages = db.query(Message).filter(
+        or_(Message.sender_id == user_id, Message.receiver_id == user_id)
+    ).all()
+    other_ids = {m.receiver_id if m.sender_id == user_id else m.sender_id for m in all_messages}
+    for other_id in other_ids:
+        db.query(User).filter(User.id == other_id).first()
+        db.query(Message).filter(
+            or_(
+                and_(Message.sender_id == user_id, Message.receiver_id == other_id),
+                and_(Message.sender_id == other_id, Message.receiver_id == user_id),
+            )
+        ).order_by(Message.created_at.desc()).first()
+        db.query(func.count(Message.id)).filter(
+            Message.sender_id == other_id, Message.receiver_id == user_id, Message.da_doc == False
+        ).scalar()
+    return len(other_ids)
+
+
+def seed(db, total_messages: int, partners: int) -> int:
+    teacher = User(ho_ten="bench teacher", email=f"bench_t_{time.time_ns()}@bench.local",
+                   password_hash="x", role=UserRole.teacher)
+    students = [
+        User(ho_ten=f"bench student {i}", email=f"bench_s_{i}_{time.time_ns()}@bench.local",
+             password_hash="x", role=UserRole.student)
+        for i in range(partners)
+    ]
+    db.add(teacher)
+    db.add_all(students)
+    db.flush()
+
+    rows = []
+    for _ in range(total_messages):
+        student = random.choice(students)
+        if random.random() < 0.5:
+            rows.append({"sender_id": teacher.id, "receiver_id": student.id, "noi_dung": "bench", "da_doc": True})
+        else:
+            rows.append({"sender_id": student.id, "receiver_id": teacher.id, "noi_dung": "bench",
+                         "da_doc": random.random() < 0.8})
+    for i in range(0, len(rows), 5000):
+        db.execute(insert(Message), rows[i:i + 5000])
+    db.flush()
+    return teacher.id
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--partners", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'partners':>9} {'legacy ms':>11} {'window ms':>11}")
+    for n in args.messages:
+        db = SessionLocal()
+        try:
+            user_id = seed(db, n, args.partners)
+            legacy_ms = timed(lambda: legacy_conversations(db, user_id), args.repeat)
+            new_ms = timed(lambda: db.execute(conversation_summaries_query(user_id)).all(), args.repeat)
+            print(f"{n:>10} {args.partners:>9} {legacy_ms:>11.1f} {new_ms:>11.1f}")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark thời gian dựng trang CourseDetail/LearnPage: các request riêng lẻ như frontend cũ
+so với một request GET /api/courses/{id}/overview.
+
+Request riêng lẻ được gửi song song như Promise.all ở frontend; /users/me/progress gửi sau
+/courses/{id}/progress như LearnPage cũ. Mỗi lượt là thời gian đến khi có đủ dữ liệu cho trang.
+    uvicorn fastapi_app.main:app --port 8000
+    python scripts/bench_course_overview.py --base-url http://localhost:8000 --token <JWT> --course-id 1
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _get(url: str, token: str | None) -> int:
+    req = urllib.request.Request(url)
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _parallel(pool, base_url: str, token: str | None, chains: list[list[str]]) -> list[int]:
+    """Mỗi chain chạy tuần tự (request sau cần kết quả request trước), các chain chạy song song"""
+    def run(chain):
+        return [_get(base_url + path, token) for path in chain]
+    return [code for codes in pool.map(run, chains) for code in codes]
+
+
+def bench(fn, iterations: int) -> dict:
+    latencies, errors = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        codes = fn()
+        latencies.append(time.perf_counter() - start)
+        errors += sum(1 for code in codes if code != 200)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dựng trang khóa học: nhiều request so với /overview")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", help="JWT học viên đã đăng ký khóa học")
+    parser.add_argument("--course-id", type=int, default=1)
+    parser.add_argument("--teacher-id", type=int, help="teacher_id của khóa học (LearnPage cũ gọi /users/{id})")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    cid = args.course_id
+    teacher = [[f"/api/users/{args.teacher_id}"]] if args.teacher_id else []
+    pages = [
+        (
+            "CourseDetail",
+            [[f"/api/courses/{cid}"], [f"/api/courses/{cid}/lessons"]]
+            + ([[f"/api/courses/{cid}/enrollment"]] if args.token else []),
+            f"/api/courses/{cid}/overview?include=lessons,enrollment",
+        ),
+        (
+            "LearnPage",
+            [[f"/api/courses/{cid}"], [f"/api/courses/{cid}/lessons"], *teacher]
+            + ([[f"/api/courses/{cid}/progress", "/api/users/me/progress"]] if args.token else []),
+            f"/api/courses/{cid}/overview?include=lessons,teacher,progress",
+        ),
+    ]
+
+    print(f"{'trang':14} {'cách':12} {'requests':>9} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for name, chains, overview in pages:
+            count = sum(len(chain) for chain in chains)
+            legacy = bench(lambda: _parallel(pool, args.base_url, args.token, chains), args.iterations)
+            single = bench(lambda: [_get(args.base_url + overview, args.token)], args.iterations)
+            for label, n, r in (("riêng lẻ", count, legacy), ("overview", 1, single)):
+                print(f"{name:14} {label:12} {n:9d} {r['p50_ms']:10.1f} {r['p99_ms']:10.1f} {r['errors']:8d}")
+
+
+if __name__ == "__main__":
+    main()
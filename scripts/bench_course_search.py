@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark tìm kiếm khóa học: ILIKE '%q%' (cách cũ, quét tuần tự) so với full-text search qua GIN index
+(core/course_search.py). Cần PostgreSQL đã chạy database/add_course_search.sql.
+
+Dữ liệu giả được tạo trong một transaction và rollback khi xong, không ghi lại vào DB.
+    DATABASE_URL=... python scripts/bench_course_search.py --courses 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, or_, select, text
+
+from fastapi_app.core.course_search import search_statement
+from fastapi_app.db.session import SessionLocal
+from fastapi_app.models.course import Course, CourseStatus
+
+TOPICS = ["Lập trình Python", "Java nâng cao", "Cấu trúc dữ liệu", "Giải thuật", "Phát triển web",
+          "Cơ sở dữ liệu", "Học máy", "Đồ họa máy tính", "Mạng máy tính", "An toàn thông tin",
+          "Tiếng Anh giao tiếp", "Thiết kế giao diện", "Kiểm thử phần mềm", "Điện toán đám mây"]
+WORDS = ["cơ bản", "thực hành", "dự án", "người mới", "chuyên sâu", "tối ưu", "hiệu năng", "ứng dụng",
+         "đồ án", "bài tập", "kiểm tra", "phỏng vấn", "thuật toán", "hệ thống", "triển khai", "bảo mật"]
+QUERIES = ["python", "lập trình", "lap trinh", "do hoa may", "cấu trúc dữ liệu", "bao mat he thong", "zzzz"]
+
+
+def seed(db, total: int):
+    rows = []
+    for i in range(total):
+        title = f"{random.choice(TOPICS)} {random.choice(WORDS)} {i}"
+        description = " ".join(random.choice(WORDS) for _ in range(40))
+        rows.append({"tieu_de": title, "mo_ta": description, "trang_thai": CourseStatus.active})
+    for i in range(0, len(rows), 5000):
+        db.execute(insert(Course), rows[i:i + 5000])
+    db.flush()
+    db.execute(text("ANALYZE khoa_hoc"))
+
+
+def legacy_search(db, q: str) -> int:
+    like_q = f"%{q}%"
+    query = (
+        select(Course)
+        .where(Course.trang_thai == CourseStatus.active, or_(Course.tieu_de.ilike(like_q), Course.mo_ta.ilike(like_q)))
+        .order_by(Course.created_at.desc())
+    )
+    return len(db.execute(query).scalars().all())
+
+
+def fts_search(db, q: str) -> int:
+    rows = db.execute(search_statement(q, "postgresql", [Course.trang_thai == CourseStatus.active], 20, 0)).all()
+    return rows[0].total if rows else 0
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        seed(db, args.courses)
+        print(f"{args.courses} khóa học giả")
+        print(f"{'query':<20} {'ILIKE ms':>9} {'khớp':>7} {'FTS ms':>9} {'khớp':>7}")
+        for q in QUERIES:
+            legacy_ms = timed(lambda: legacy_search(db, q), args.repeat)
+            fts_ms = timed(lambda: fts_search(db, q), args.repeat)
+            print(f"{q:<20} {legacy_ms:>9.1f} {legacy_search(db, q):>7} {fts_ms:>9.1f} {fts_search(db, q):>7}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark phát video: generator 8KB cũ (StreamingResponse) so với RangeFileResponse.
+
+Gọi thẳng ASGI response (không qua mạng) với N luồng xem đồng thời, đo throughput,
+CPU trên mỗi GB và số lần gọi send() (số vòng lặp event loop).
+    python scripts/bench_video_streaming.py --size-mb 200 --streams 8
+Lưu ý: uvicorn không có extension zerocopysend nên RangeFileResponse chạy nhánh pread;
+sau nginx (VIDEO_ACCEL_REDIRECT) thì app không gửi byte video nào.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.datastructures import Headers  # noqa: E402
+from starlette.responses import StreamingResponse  # noqa: E402
+
+from fastapi_app.core.file_response import RangeFileResponse  # noqa: E402
+
+
+def legacy_response(path: str, size: int):
+    """Bản cũ của video_streaming.stream_video cho Range: bytes=0-"""
+    def generate():
+        with open(path, "rb") as f:
+            remaining = size
+            while remaining > 0:
+                chunk = f.read(min(8192, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return StreamingResponse(generate(), status_code=206, media_type="video/mp4")
+
+
+def new_response(path: str, size: int):
+    return RangeFileResponse(path, Headers({"range": "bytes=0-"}), media_type="video/mp4")
+
+
+async def _drive(response) -> tuple[int, int]:
+    received = 0
+    calls = 0
+    never = asyncio.Event()
+
+    async def receive():
+        await never.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received, calls
+        calls += 1
+        received += len(message.get("body", b""))
+
+    await response({"type": "http", "extensions": {}}, receive, send)
+    return received, calls
+
+
+async def bench(factory, path: str, size: int, streams: int) -> str:
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_drive(factory(path, size)) for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    total = sum(r[0] for r in results)
+    assert total == size * streams, f"thiếu dữ liệu: {total} != {size * streams}"
+    gb = total / 1024 ** 3
+    calls = sum(r[1] for r in results) // streams
+    return f"{total / elapsed / 1024 ** 2:8.1f} MB/s  CPU {cpu / gb:6.2f}s/GB  {calls:7d} send()/luồng"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh throughput/CPU khi phát video")
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--streams", type=int, default=8)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+        f.write(os.urandom(1024 * 1024) * args.size_mb)
+        f.flush()
+        print(f"{args.streams} luồng x {args.size_mb} MB")
+        print(f"  generator 8KB:      {asyncio.run(bench(legacy_response, f.name, size, args.streams))}")
+        print(f"  RangeFileResponse:  {asyncio.run(bench(new_response, f.name, size, args.streams))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra phân trang keyset của /api/courses khi sort=relevance có nhiều khóa học cùng rank.
+
+Tạo tạm các khóa học cùng tiêu đề (cùng ts_rank) trong một transaction, đọc lần lượt từng trang
+theo cursor như route list_courses rồi so với thứ tự mong đợi (id giảm dần): không được bỏ sót
+hay lặp dòng nào. Transaction luôn được rollback nên không để lại dữ liệu. Chỉ chạy trên PostgreSQL
+(đã chạy database/add_course_search.sql).
+    DATABASE_URL=postgresql://... python scripts/check_catalog_paging.py --courses 6 --limit 3
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from fastapi_app.api.catalog import NEXT_CURSOR_HEADER, keyset_page, page_headers, relevance_key
+from fastapi_app.core.course_search import search_condition
+from fastapi_app.db.session import SessionLocal
+from fastapi_app.models.course import Course
+
+QUERY = "zzpagingtiecheck"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra phân trang keyset theo relevance khi rank bằng nhau")
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--limit", type=int, default=3)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        dialect_name = db.bind.dialect.name
+        key = relevance_key(QUERY, dialect_name)
+        if key is None:
+            print(f"[SKIP] Cần PostgreSQL với full-text search (đang dùng {dialect_name})")
+            return
+
+        courses = [Course(tieu_de=f"{QUERY} khoa hoc", mo_ta="") for _ in range(args.courses)]
+        db.add_all(courses)
+        db.flush()
+        expected = sorted((c.id for c in courses), reverse=True)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            query = select(Course).where(search_condition(QUERY, dialect_name), Course.id.in_(expected))
+            query, limit = keyset_page(query, "relevance", key, cursor, args.limit)
+            rows, headers = page_headers(db.execute(query).all(), "relevance", limit)
+            seen += [row.Course.id for row in rows]
+            pages += 1
+            cursor = headers.get(NEXT_CURSOR_HEADER)
+            if not cursor or pages > args.courses:
+                break
+
+        if seen != expected:
+            print(f"[FAIL] Mong đợi {expected}, nhận {seen} sau {pages} trang")
+            sys.exit(1)
+        print(f"[OK] {len(seen)} khóa học cùng rank, {pages} trang, không bỏ sót/lặp")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Bảo trì bảng progress_summary (core/progress_summary.py).
+
+    DATABASE_URL=... python scripts/progress_summary.py backfill     # tính lại toàn bộ từ progress
+    DATABASE_URL=... python scripts/progress_summary.py check        # chỉ báo sai lệch
+    DATABASE_URL=... python scripts/progress_summary.py check --fix  # sửa dòng lệch, tạo dòng còn thiếu
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi_app.core.progress_summary import backfill_progress_summary, check_progress_summary, reconcile_progress_summary
+from fastapi_app.db.session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill / kiểm tra nhất quán progress_summary")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--fix", action="store_true", help="check: sửa sai lệch tìm được")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            print(f"[OK] Đã tính lại {backfill_progress_summary(db)} dòng tóm tắt tiến độ")
+            return
+
+        report = check_progress_summary(db)
+        print(f"[INFO] Dòng lệch: {report['drifted']}, (user, khóa học) chưa có dòng: {report['missing']}")
+        if args.fix and (report["drifted"] or report["missing"]):
+            fixed = reconcile_progress_summary(db)
+            if report["missing"]:
+                backfill_progress_summary(db)
+            print(f"[OK] Đã sửa {fixed} dòng lệch" + (", đã tạo dòng còn thiếu" if report["missing"] else ""))
+        elif report["drifted"] or report["missing"]:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
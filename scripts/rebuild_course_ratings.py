@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Tính lại bảng course_ratings từ danh_gia_khoa_hoc (một câu GROUP BY cho mọi khóa học).
+Dùng khi nghi ngờ sai lệch, ví dụ sau khi xóa/sửa đánh giá trực tiếp bằng SQL.
+    DATABASE_URL=... python scripts/rebuild_course_ratings.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi_app.core.course_ratings import rebuild_course_ratings
+from fastapi_app.db.session import SessionLocal
+
+
+def main():
+    db = SessionLocal()
+    try:
+        count = rebuild_course_ratings(db)
+        print(f"[OK] Đã tính lại thống kê đánh giá cho {count} khóa học")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,16 @@ try:
         "database/create_deposit_transactions.sql",
         "database/add_deposit_fields.sql",
         "database/add_user_balance.sql",
+        "database/add_messages_indexes.sql",
+        "database/create_unread_counters_table.sql",
+        "database/add_auto_grading.sql",
+        "database/add_lesson_hls.sql",
+        "database/add_video_metadata.sql",
+        "database/create_upload_sessions_table.sql",
+        "database/add_course_search.sql",
+        "database/create_course_ratings_table.sql",
+        "database/create_progress_summary_table.sql",
+        "database/create_watch_progress_table.sql",
     ]
 
     success_count = 0
@@ -60,13 +70,9 @@ try:
             with open(full_path, "r", encoding="utf-8") as f:
                 sql = f.read()
                 
-            # Chạy SQL (chia nhỏ nếu có nhiều câu lệnh)
-            statements = [s.strip() for s in sql.split(';') if s.strip() and not s.strip().startswith('--')]
-            
-            for statement in statements:
-                if statement:
-                    cur.execute(statement)
-            
+            # Chạy cả file một lần (psycopg 3 cho phép nhiều câu lệnh khi không có tham số):
+            # tách theo ';' sẽ bỏ mất câu lệnh nằm sau dòng comment đầu file và cắt sai khối DO $$ ... $$
+            cur.execute(sql)
             conn.commit()
             print(f"   ✅ Completed: {file_path}")
             success_count += 1
@@ -76,6 +82,7 @@ try:
             if "already exists" in error_msg or "duplicate" in error_msg:
                 print(f"   ⚠️  Skipped (already exists): {file_path}")
                 success_count += 1
+                conn.rollback()
             else:
                 print(f"   ❌ ERROR in {file_path}: {e}")
                 failed_count += 1